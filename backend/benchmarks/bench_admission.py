@@ -0,0 +1,64 @@
+"""
+admission control 在超過飽和點時的效果
+
+    python -m benchmarks.bench_admission --duration 20 --overload 2
+
+1. 以 closed loop（大量並行 worker）量出飽和吞吐量
+2. 以 open loop 用 overload 倍的到達率分別在關閉 / 開啟 admission control 時執行 load_test，
+   比較被接受請求的 p99 延遲與 shed 數量
+
+每次執行都在獨立的 process（ADMISSION_ENABLED 在 import main 時讀取），其他 ADMISSION_* 環境變數照常生效。
+load_test 的 client 與 app 在同一個事件迴圈，被拒絕的請求在 client 端仍要花費時間，
+開啟 admission control 時被接受請求的吞吐量會低於實際部署（client 在另一台機器）。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def run_load_test(env: dict, *arguments) -> dict:
+    with tempfile.NamedTemporaryFile(suffix=".json") as output:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.load_test", "--output", output.name, *arguments],
+            env={**os.environ, **env}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True,
+        )
+        return json.load(open(output.name))
+
+
+def describe(label: str, report: dict):
+    total = report["total"]
+    offered = total["requests"] + total["shed"]
+    print(f"{label:<28} {total['throughput_rps']:>8.1f} rps  p50 {total['p50_ms']:>9.1f}ms"
+          f"  p99 {total['p99_ms']:>9.1f}ms  max {total['max_ms']:>9.1f}ms"
+          f"  shed {total['shed']:>6} ({total['shed'] / offered if offered else 0:.0%})")
+
+
+def main(args):
+    data = ["--users", str(args.users), "--lists", "2", "--products", "50", "--mix", args.mix]
+
+    saturated = run_load_test(
+        {"ADMISSION_ENABLED": "false"},
+        *data, "--concurrency", str(args.concurrency), "--duration", str(args.duration),
+    )
+    describe(f"closed loop x{args.concurrency}", saturated)
+    rate = saturated["total"]["throughput_rps"] * args.overload
+    print(f"open loop at {rate:.0f} rps ({args.overload}x saturation)")
+
+    for enabled in ("false", "true"):
+        report = run_load_test(
+            {"ADMISSION_ENABLED": enabled}, *data, "--rate", str(rate), "--duration", str(args.duration)
+        )
+        describe(f"admission {'on' if enabled == 'true' else 'off'}", report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=64, help="closed-loop workers used to find saturation")
+    parser.add_argument("--overload", type=float, default=2.0, help="offered load as a multiple of saturation")
+    parser.add_argument("--duration", type=float, default=20, help="seconds per run")
+    parser.add_argument("--mix", default="get_product=40,get_lists=30,create_product=15,delete_product=15")
+    main(parser.parse_args())
@@ -0,0 +1,96 @@
+"""
+change feed 的 fan-out：大量閒置訂閱者時的記憶體、發布成本與送達延遲
+
+    python -m benchmarks.bench_change_feed --subscribers 5000 --events 400
+
+- 每個訂閱者有一個等待事件的 task（和 /api/changes 的連線相同）
+- 一半的事件只送給單一使用者，另一半送給訂閱同一個清單的所有人（fan-out）
+- --stalled 個訂閱者從不讀取，佇列溢出後只會收到 resync，不影響 publisher
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import tracemalloc
+
+from utils.changeFeed import InProcessHub, RESYNC, user_topic, list_topic
+
+
+SHARED_LIST = "shared"
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0.0
+
+
+async def consumer(subscription, latencies, received):
+    while True:
+        event = await subscription.get(timeout=15)
+        if event is None:
+            if subscription.closed:
+                return
+            continue
+        if event is RESYNC:
+            received["resync"] += 1
+            continue
+        sent_at = float(event.data.split(b'"sent_at":', 1)[1].rstrip(b"}"))
+        latencies.append(time.perf_counter() - sent_at)
+        received["events"] += 1
+
+
+async def main(args):
+    hub = InProcessHub(queue_size=args.queue_size)
+    latencies = []
+    received = {"events": 0, "resync": 0}
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    subscriptions = [
+        hub.subscribe([user_topic(str(index)), list_topic(SHARED_LIST)])
+        for index in range(args.subscribers)
+    ]
+    tasks = [
+        asyncio.create_task(consumer(subscription, latencies, received))
+        for subscription in subscriptions[args.stalled:]
+    ]
+    await asyncio.sleep(0.1)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    single, fanout = [], []
+    for index in range(args.events):
+        started = time.perf_counter()
+        if index % 2:
+            await hub.publish_event([list_topic(SHARED_LIST)], "products_created", sent_at=started)
+            fanout.append(time.perf_counter() - started)
+        else:
+            topic = user_topic(str(args.stalled + index % (args.subscribers - args.stalled)))
+            await hub.publish_event([topic], "products_created", sent_at=started)
+            single.append(time.perf_counter() - started)
+        # 讓訂閱者有機會讀取，模擬事件之間的間隔
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.5)
+
+    for subscription in subscriptions:
+        subscription.close()
+    await asyncio.gather(*tasks)
+
+    print(f"subscribers {args.subscribers} (stalled {args.stalled}), queue size {args.queue_size}")
+    print(f"memory per idle subscriber  {(after - before) / args.subscribers:>10.0f} bytes")
+    print(f"publish to one user         median {statistics.median(single) * 1e6:>8.1f}us")
+    print(f"publish to shared list      median {statistics.median(fanout) * 1e3:>8.2f}ms"
+          f"  ({statistics.median(fanout) / args.subscribers * 1e6:.2f}us per subscriber)")
+    print(f"delivery latency            p50 {percentile(latencies, 0.5) * 1e3:.2f}ms"
+          f"  p99 {percentile(latencies, 0.99) * 1e3:.2f}ms  max {max(latencies) * 1e3:.2f}ms")
+    print(f"events delivered {received['events']}, resyncs {received['resync']}, "
+          f"stalled queues overflowed {sum(1 for s in subscriptions[:args.stalled] if s.overflowed)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--stalled", type=int, default=100)
+    parser.add_argument("--events", type=int, default=400)
+    parser.add_argument("--queue-size", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
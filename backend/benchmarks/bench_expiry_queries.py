@@ -0,0 +1,66 @@
+"""
+記錄清單 / 產品查詢的 EXPLAIN 計畫與耗時
+
+    python -m benchmarks.bench_expiry_queries --products 100000 --output plans.json
+"""
+import argparse
+import json
+import statistics
+from datetime import date
+
+from tortoise import connections, run_async
+
+from benchmarks.common import init_db, close_db, Timer
+from benchmarks.bench_list_reader import seed
+from utils import listReader
+
+
+async def explain(sql: str, values: list) -> list:
+    conn = connections.get("default")
+    prefix = "EXPLAIN ANALYZE " if conn.capabilities.dialect == "postgres" else "EXPLAIN QUERY PLAN "
+    _, rows = await conn.execute_query(prefix + listReader._prepare(conn, sql), values)
+    return [" ".join(str(column) for column in tuple(row)) for row in rows]
+
+
+async def timing(sql: str, values: list, rounds: int) -> dict:
+    latencies = []
+    for _ in range(rounds):
+        with Timer() as timer:
+            await listReader.fetch_rows(sql, values)
+        latencies.append(timer.elapsed * 1000)
+    latencies.sort()
+    return {"mean_ms": statistics.mean(latencies), "p95_ms": latencies[int(rounds * 0.95) - 1]}
+
+
+async def main(args):
+    await init_db()
+    user = await seed(args.products, args.lists)
+    cases = {
+        "products_page": (listReader.PRODUCTS_PAGE, [user.user_uid, "list-1", 50]),
+        "products_page_after": (
+            listReader.PRODUCTS_PAGE_AFTER, [user.user_uid, "list-1", date(2025, 6, 1), "0", 50]
+        ),
+        "lists_page": (listReader.LISTS_PAGE, [user.user_uid, 50]),
+        "expiring_between": (
+            listReader.EXPIRING_BETWEEN, [user.user_uid, date(2025, 3, 1), date(2025, 3, 7), 100]
+        ),
+    }
+    report = {}
+    for name, (sql, values) in cases.items():
+        report[name] = {"plan": await explain(sql, values), **await timing(sql, values, args.rounds)}
+        print(f"{name:<20} mean {report[name]['mean_ms']:>7.2f}ms  p95 {report[name]['p95_ms']:>7.2f}ms")
+        for line in report[name]["plan"]:
+            print(f"    {line}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--lists", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--output")
+    run_async(main(parser.parse_args()))
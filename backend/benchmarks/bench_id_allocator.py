@@ -0,0 +1,82 @@
+"""
+比較新增資料時的主鍵分配方式（每秒併發新增筆數）
+
+    python -m benchmarks.bench_id_allocator --inserts 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from tortoise import run_async
+
+from benchmarks.common import init_db, close_db, Timer
+from models.userModel import UserModel
+from models.listModel import ListModel
+from utils.idAllocator import BlockSequenceAllocator, TimeOrderedAllocator
+
+
+CREATED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+async def legacy_insert(user, index):
+    """
+    原本的作法：order_by('-id').first() 再加一
+    """
+    last_list = await ListModel.all().order_by('-id').first()
+    table_id = 1
+    if last_list:
+        table_id = int(last_list.id) + 1
+    await ListModel.create(
+        id=str(table_id), f_user_uid=user, list_name=f"legacy-{index}", created_at=CREATED_AT
+    )
+
+
+def allocator_insert(allocator):
+    async def insert(user, index):
+        await ListModel.create(
+            id=await allocator.next_id(ListModel),
+            f_user_uid=user,
+            list_name=f"alloc-{index}",
+            created_at=CREATED_AT,
+        )
+    return insert
+
+
+async def run_case(name, insert, user, inserts, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def worker(index):
+        nonlocal failures
+        async with semaphore:
+            try:
+                await insert(user, index)
+            except Exception:
+                failures += 1
+
+    await ListModel.all().delete()
+    with Timer() as timer:
+        await asyncio.gather(*(worker(index) for index in range(inserts)))
+    succeeded = inserts - failures
+    print(f"{name:<10} {succeeded / timer.elapsed:>10.0f} inserts/s   failed {failures}/{inserts}")
+
+
+async def main(args):
+    await init_db()
+    user = await UserModel.create(
+        id="1", user_uid="100000", username="bench", email="bench@example.com",
+        password="bench", username_key="bench", email_key="bench@example.com", created_at="", updated_at="",
+    )
+    await run_case("legacy", legacy_insert, user, args.inserts, args.concurrency)
+    await run_case("block", allocator_insert(BlockSequenceAllocator(args.block_size)),
+                   user, args.inserts, args.concurrency)
+    await run_case("time", allocator_insert(TimeOrderedAllocator()), user, args.inserts, args.concurrency)
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--inserts", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--block-size", type=int, default=100)
+    run_async(main(parser.parse_args()))
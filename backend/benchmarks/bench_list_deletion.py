@@ -0,0 +1,105 @@
+"""
+刪除清單的延遲：直接 cascade delete 與標記刪除 + 背景分批清除
+
+    python -m benchmarks.bench_list_deletion --sizes 1000,10000,100000
+
+每個大小建立兩個產品數相同的清單：
+1. 直接刪除：以一個 DELETE 刪除清單，由 ON DELETE CASCADE 連帶刪除產品（舊的做法）
+2. POST /api/delete_list：只標記刪除並建立工作，產品由 utils.deletionPurger 在背景分批刪除
+
+兩種做法執行期間都有一個 client 持續讀取 /api/visible_lists，比較刪除對其他請求造成的最大延遲。
+"""
+import argparse
+import asyncio
+import time
+from datetime import date
+
+from tortoise import run_async
+
+from benchmarks.common import app_client, Timer
+from models.listModel import ListModel, ProductModel
+from models.userModel import UserModel
+
+
+async def seed_products(user_uid: str, list_id: str, count: int, prefix: str):
+    await ProductModel.bulk_create([
+        ProductModel(
+            id=f"{prefix}-{index}", f_user_uid_id=user_uid, f_list_uid_id=list_id,
+            product_name=f"product {index}", product_barcode=str(index), expiry_date=date(2030, 1, 1),
+            product_image_url="",
+        )
+        for index in range(count)
+    ], batch_size=10000)
+
+
+async def read_while(client, headers: dict, done: asyncio.Event) -> list:
+    latencies = []
+    while not done.is_set():
+        started = time.perf_counter()
+        await client.get("/api/visible_lists", headers=headers)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def measure(client, headers: dict, delete) -> tuple:
+    """
+    執行 delete（回傳刪除 API 的延遲），回傳 (API 延遲, 完全清除的時間, 讀取的最大延遲)
+    """
+    done = asyncio.Event()
+    reader = asyncio.create_task(read_while(client, headers, done))
+    started = time.perf_counter()
+    api_ms = await delete()
+    purged_s = time.perf_counter() - started
+    done.set()
+    latencies = await reader
+    return api_ms, purged_s, max(latencies, default=0.0)
+
+
+async def main(args):
+    async with app_client() as client:
+        await client.post("/api/create_user", json={
+            "username": "bench", "email": "bench@example.com", "password": "bench-password"
+        })
+        response = await client.post("/api/login_user", json={
+            "username_or_email": "bench", "password": "bench-password"
+        })
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        user_uid = (await UserModel.get(username="bench")).user_uid
+
+        print(f"{'products':>10} {'method':<20} {'API':>10} {'purged after':>14} {'max read latency':>18}")
+        for size in args.sizes:
+            list_ids = {}
+            for name in ("cascade", "purge"):
+                response = await client.post(
+                    "/api/create_list", json={"list_name": f"{name}-{size}"}, headers=headers
+                )
+                list_ids[name] = response.json()["id"]
+                await seed_products(user_uid, list_ids[name], size, f"{name}-{size}")
+
+            async def cascade():
+                with Timer() as timer:
+                    await ListModel.filter(id=list_ids["cascade"]).delete()
+                return timer.elapsed * 1000
+
+            async def purge():
+                with Timer() as timer:
+                    response = await client.post(
+                        "/api/delete_list", json={"list_name": f"purge-{size}"}, headers=headers
+                    )
+                job_path = f"/api/deletion_jobs/{response.json()['job_id']}"
+                while (await client.get(job_path, headers=headers)).json()["job"]["status"] != "done":
+                    await asyncio.sleep(0.05)
+                return timer.elapsed * 1000
+
+            for label, delete in (("cascade delete", cascade), ("soft delete + purge", purge)):
+                api_ms, purged_s, read_ms = await measure(client, headers, delete)
+                print(f"{size:>10} {label:<20} {api_ms:>8.1f}ms {purged_s:>13.2f}s {read_ms:>16.1f}ms")
+            remaining = await ProductModel.filter(f_list_uid_id__in=list(list_ids.values())).count()
+            assert remaining == 0, f"{remaining} products left"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")],
+                        default=[1000, 10000, 100000])
+    run_async(main(parser.parse_args()))
@@ -0,0 +1,95 @@
+"""
+比較 get_product / get_lists 的 ORM 寫法與 utils.listReader
+
+預設的記憶體內 SQLite 沒有網路往返成本，要看到少掉的 round trip 請以 BENCH_DB_URL
+指向 PostgreSQL 執行。
+
+    python -m benchmarks.bench_list_reader --products 100000 --lists 100
+"""
+import argparse
+import statistics
+from datetime import date, datetime, timezone
+
+from tortoise import run_async
+
+from benchmarks.common import init_db, close_db, Timer
+from models.userModel import UserModel
+from models.listModel import ListModel, ProductModel
+from utils.listReader import fetch_products_page, fetch_list_names_page
+
+
+async def seed(products: int, lists: int):
+    user = await UserModel.create(
+        id="1", user_uid="100000", username="bench", email="bench@example.com",
+        password="bench", username_key="bench", email_key="bench@example.com", created_at="", updated_at="",
+    )
+    await ListModel.bulk_create([
+        ListModel(id=str(index), f_user_uid=user, list_name=f"list-{index}",
+                  created_at=datetime.now(timezone.utc))
+        for index in range(lists)
+    ])
+    await ProductModel.bulk_create([
+        ProductModel(
+            id=str(index), f_user_uid_id=user.user_uid, f_list_uid_id=str(index % lists),
+            product_name=f"product-{index}", product_barcode=str(index),
+            product_image_url="", expiry_date=date(2025, index % 12 + 1, index % 28 + 1),
+        )
+        for index in range(products)
+    ], batch_size=10000)
+    return user
+
+
+async def orm_products(user_uid, list_name):
+    user_instance = await UserModel.get_or_none(user_uid=user_uid)
+    list_instance = await ListModel.get_or_none(f_user_uid=user_instance, list_name=list_name)
+    return await ProductModel\
+        .filter(f_user_uid=user_instance, f_list_uid=list_instance)\
+        .order_by("expiry_date")\
+        .values_list("id", "product_name", "expiry_date", "product_image_url")
+
+
+async def orm_lists(user_uid):
+    user_instance = await UserModel.get_or_none(user_uid=user_uid)
+    return await ListModel.filter(f_user_uid=user_instance).values_list("list_name", flat=True)
+
+
+async def measure(name, call, rounds):
+    latencies = []
+    for _ in range(rounds):
+        with Timer() as timer:
+            await call()
+        latencies.append(timer.elapsed * 1000)
+    latencies.sort()
+    print(f"{name:<16} mean {statistics.mean(latencies):>8.2f}ms  p95 {latencies[int(rounds * 0.95) - 1]:>8.2f}ms")
+
+
+async def main(args):
+    await init_db()
+    user = await seed(args.products, args.lists)
+    list_name = "list-1"
+    orm_rows = await orm_products(user.user_uid, list_name)
+    assert sorted((row[0], row[1], row[2].isoformat(), row[3]) for row in orm_rows) == \
+        sorted((await fetch_products_page(user.user_uid, list_name, args.products))[0])
+
+    await measure("orm get_product", lambda: orm_products(user.user_uid, list_name), args.rounds)
+    await measure("reader products", lambda: fetch_products_page(user.user_uid, list_name, args.products), args.rounds)
+
+    # keyset 分頁：第一頁與深層分頁的成本應該相同
+    cursor = None
+    for _ in range(args.products // args.lists // args.page_size - 1):
+        _, cursor = await fetch_products_page(user.user_uid, list_name, args.page_size, cursor)
+    await measure("first page", lambda: fetch_products_page(user.user_uid, list_name, args.page_size), args.rounds)
+    await measure("last page", lambda: fetch_products_page(user.user_uid, list_name, args.page_size, cursor),
+                  args.rounds)
+    await measure("orm get_lists", lambda: orm_lists(user.user_uid), args.rounds)
+    await measure("reader lists", lambda: fetch_list_names_page(user.user_uid, args.lists), args.rounds)
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--lists", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--page-size", type=int, default=50)
+    run_async(main(parser.parse_args()))
@@ -0,0 +1,62 @@
+"""
+登入帳號解析的吞吐量：存在與不存在的帳號
+
+    python -m benchmarks.bench_login_lookup --users 50000 --attempts 5000
+"""
+import argparse
+import random
+
+from tortoise import run_async
+from tortoise.expressions import Q
+
+from benchmarks.common import init_db, close_db, Timer
+from models.userModel import UserModel
+from utils.loginResolver import LoginResolver, normalize
+
+
+async def legacy_resolve(identifier):
+    return await UserModel.get_or_none(Q(username=identifier) | Q(email=identifier))
+
+
+async def seed(users: int):
+    await UserModel.bulk_create([
+        UserModel(
+            id=str(index), user_uid=str(100000 + index), username=f"user{index}",
+            email=f"user{index}@example.com", username_key=normalize(f"user{index}"),
+            email_key=normalize(f"user{index}@example.com"), password="", created_at="", updated_at="",
+        )
+        for index in range(users)
+    ], batch_size=10000)
+
+
+async def measure(name, resolve, identifiers):
+    with Timer() as timer:
+        for identifier in identifiers:
+            await resolve(identifier)
+    print(f"{name:<28} {len(identifiers) / timer.elapsed:>9.0f} lookups/s")
+
+
+async def main(args):
+    await init_db()
+    await seed(args.users)
+    existing = [
+        random.choice((f"user{index}", f"User{index}@Example.com"))
+        for index in random.choices(range(args.users), k=args.attempts)
+    ]
+    # 撞庫流量：少量不存在的帳號反覆嘗試
+    unknown_pool = [f"ghost{index}@example.com" for index in range(args.attempts // 10)]
+    unknown = random.choices(unknown_pool, k=args.attempts)
+
+    resolver = LoginResolver(negative_cache_size=100000, negative_ttl=60)
+    await measure("legacy existing", legacy_resolve, existing)
+    await measure("resolver existing", resolver.resolve, existing)
+    await measure("legacy nonexistent", legacy_resolve, unknown)
+    await measure("resolver nonexistent", resolver.resolve, unknown)
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--attempts", type=int, default=5000)
+    run_async(main(parser.parse_args()))
@@ -0,0 +1,74 @@
+"""
+登入風暴期間 get_product 讀取路徑的延遲
+
+比較直接在 event loop 上驗證密碼（inline）與使用 utils.passwordHasher 的 worker pool。
+
+    python -m benchmarks.bench_password_hashing --duration 5 --logins 32
+"""
+import argparse
+import asyncio
+import time
+
+from tortoise import run_async
+
+from benchmarks.common import init_db, close_db
+from benchmarks.bench_list_reader import seed
+from utils.listReader import fetch_products_page
+from utils.passwordHasher import PasswordHasher, hash_password, verify_password
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def reader(user_uid, deadline, latencies):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await fetch_products_page(user_uid, "list-1", 50)
+        latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.001)
+
+
+async def login_storm(verify, stored, deadline, logins):
+    async def client():
+        while time.perf_counter() < deadline:
+            await verify("secret", stored)
+
+    await asyncio.gather(*(client() for _ in range(logins)))
+
+
+async def run_case(name, verify, stored, user_uid, args):
+    latencies = []
+    deadline = time.perf_counter() + args.duration
+    tasks = [reader(user_uid, deadline, latencies)]
+    if verify is not None:
+        tasks.append(login_storm(verify, stored, deadline, args.logins))
+    await asyncio.gather(*tasks)
+    print(f"{name:<10} get_product p50 {percentile(latencies, 0.5):>7.2f}ms  "
+          f"p99 {percentile(latencies, 0.99):>7.2f}ms  ({len(latencies)} reads)")
+
+
+async def main(args):
+    await init_db()
+    user = await seed(10000, 100)
+    stored = hash_password("secret", args.n, 8, 1)
+
+    async def inline(password, hashed):
+        return verify_password(password, hashed)
+
+    hasher = PasswordHasher(n=args.n, r=8, p=1, workers=args.workers, max_pending=64)
+    await run_case("idle", None, stored, user.user_uid, args)
+    await run_case("inline", inline, stored, user.user_uid, args)
+    await run_case("pool", hasher.verify, stored, user.user_uid, args)
+    hasher.shutdown()
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--n", type=int, default=2 ** 14)
+    run_async(main(parser.parse_args()))
@@ -0,0 +1,70 @@
+"""
+批次匯入的吞吐量（rows/s）與記憶體峰值
+
+    python -m benchmarks.bench_product_import --rows 10000 50000 --chunk-size 500
+"""
+import argparse
+import json
+import os
+import tracemalloc
+from datetime import datetime, timezone
+
+from tortoise import run_async
+
+from benchmarks.common import init_db, close_db, Timer
+from models.userModel import UserModel
+from models.listModel import ListModel, ProductModel
+from utils.productImporter import ProductImporter
+
+
+async def ndjson_stream(rows: int, offset: int, chunk_bytes: int = 64 * 1024):
+    """
+    模擬分段抵達的上傳內容
+    """
+    buffer = b""
+    for index in range(offset, offset + rows):
+        buffer += json.dumps({
+            "list_name": f"list-{index % 10}",
+            "product_name": f"product-{index}",
+            "product_barcode": str(index),
+            "expiry_date": "2025-06-01",
+        }).encode() + b"\n"
+        if len(buffer) >= chunk_bytes:
+            yield buffer
+            buffer = b""
+    if buffer:
+        yield buffer
+
+
+async def main(args):
+    await init_db()
+    user = await UserModel.create(
+        id="1", user_uid="100000", username="bench", email="bench@example.com",
+        password="bench", username_key="bench", email_key="bench@example.com", created_at="", updated_at="",
+    )
+    for index in range(10):
+        await ListModel.create(
+            id=str(index), f_user_uid=user, list_name=f"list-{index}", created_at=datetime.now(timezone.utc)
+        )
+
+    offset = 0
+    for rows in args.rows:
+        with open(os.devnull, "wb") as sink:
+            importer = ProductImporter(user, args.chunk_size, sink)
+            tracemalloc.start()
+            with Timer() as timer:
+                inserted, failed = await importer.run(ndjson_stream(rows, offset), "ndjson")
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        offset += rows
+        print(f"{rows:>8} rows  {inserted / timer.elapsed:>8.0f} rows/s  "
+              f"failed {failed}  peak {peak / 1024 / 1024:.1f} MiB")
+    assert await ProductModel.all().count() == offset
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--chunk-size", type=int, default=500)
+    run_async(main(parser.parse_args()))
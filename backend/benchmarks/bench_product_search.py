@@ -0,0 +1,143 @@
+"""
+產品搜尋索引：建立時間、記憶體、增量更新與查詢延遲
+
+    python -m benchmarks.bench_product_search --products 50000
+
+以一個擁有 --products 個產品的使用者建立索引（從資料庫讀取），再以前 1k / 10k / 全部產品
+各建一份索引比較查詢延遲：延遲應該取決於符合的產品數，而不是使用者的產品總數。
+對照組是前端現在的做法：逐筆比對所有產品名稱的子字串。
+"""
+import argparse
+import random
+import statistics
+import tracemalloc
+from datetime import date, datetime, timezone
+
+from tortoise import run_async
+
+from benchmarks.common import init_db, close_db, Timer
+from models.userModel import UserModel
+from models.listModel import ListModel, ProductModel
+from utils.productSearch import ProductSearch, UserIndex, MAX_CANDIDATES, normalize
+
+
+SYLLABLES = ["ba", "ko", "ri", "men", "sa", "lo", "ti", "vor", "nu", "ge", "pa", "zil", "do", "ra", "che", "fin"]
+CJK_WORDS = ["牛奶", "鮮奶油", "蛋糕", "巧克力", "豆腐", "醬油", "優格", "起司", "雞蛋", "麵包", "果汁", "泡麵"]
+
+
+def make_rows(products: int, lists: int, rng: random.Random) -> list:
+    """
+    名稱由兩個英文詞與一個中文詞組成；詞頻有高有低，才有常見詞與罕見詞可以查詢
+    """
+    words = sorted({rng.choice(SYLLABLES) + rng.choice(SYLLABLES) + rng.choice(SYLLABLES) for _ in range(3000)})
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    rows = []
+    for index in range(products):
+        first, second = rng.choices(words, weights, k=2)
+        rows.append((
+            str(index), str(index % lists), f"{first} {second} {rng.choice(CJK_WORDS)}",
+            f"471{index:010d}", f"{rng.choice(words)} {rng.choice(CJK_WORDS)}" if index % 3 == 0 else None,
+            date(2025, index % 12 + 1, index % 28 + 1), "",
+        ))
+    return rows, words
+
+
+async def seed(rows: list, lists: int):
+    user = await UserModel.create(
+        id="1", user_uid="100000", username="bench", email="bench@example.com",
+        password="bench", username_key="bench", email_key="bench@example.com", created_at="", updated_at="",
+    )
+    await ListModel.bulk_create([
+        ListModel(id=str(index), f_user_uid=user, list_name=f"list-{index}",
+                  created_at=datetime.now(timezone.utc))
+        for index in range(lists)
+    ])
+    await ProductModel.bulk_create([
+        ProductModel(
+            id=row[0], f_user_uid_id=user.user_uid, f_list_uid_id=row[1], product_name=row[2],
+            product_barcode=row[3], description=row[4], expiry_date=row[5], product_image_url=row[6],
+        )
+        for row in rows
+    ], batch_size=10000)
+    return user
+
+
+def scan(rows: list, text: str, limit: int) -> list:
+    text = normalize(text)
+    return [row for row in rows if text in normalize(row[2])][:limit]
+
+
+def median_ms(call, rounds: int) -> float:
+    latencies = []
+    for _ in range(rounds):
+        with Timer() as timer:
+            call()
+        latencies.append(timer.elapsed * 1000)
+    return statistics.median(latencies)
+
+
+async def main(args):
+    rng = random.Random(1)
+    rows, words = make_rows(args.products, args.lists, rng)
+    await init_db()
+    user = await seed(rows, args.lists)
+
+    search = ProductSearch(maxsize=1, ttl=None)
+    tracemalloc.start()
+    with Timer() as timer:
+        index = await search.index(user.user_uid)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"build from database   {timer.elapsed:>8.2f}s  {len(index)} products  "
+          f"{memory / 2 ** 20:.1f} MiB ({memory / len(index):.0f} bytes per product)")
+
+    list_names = {str(index): f"list-{index}" for index in range(args.lists)}
+    added = [(f"new-{n}", "0", f"{rng.choice(words)} {rng.choice(CJK_WORDS)}", f"999{n:010d}", None, date.today(), "")
+             for n in range(args.rounds)]
+    with Timer() as timer:
+        for row in added:
+            index.add([row])
+    print(f"incremental add       {timer.elapsed / len(added) * 1e6:>8.1f}us per product")
+    with Timer() as timer:
+        for row in added:
+            index.remove([row[0]])
+    print(f"incremental remove    {timer.elapsed / len(added) * 1e6:>8.1f}us per product")
+
+    common, rare = words[0], words[-1]
+    queries = {
+        "rare word": rare,
+        "common word": common,
+        "prefix (3 chars)": rare[:3],
+        "typo": rare[:2] + rare[3:] if len(rare) > 4 else rare + "x",
+        "two words": f"{rare} {words[len(words) // 2]}",
+        "barcode prefix": "4710000001",
+        "CJK": "巧克力",
+    }
+    sizes = sorted({size for size in (1000, 10000, args.products) if size <= args.products})
+    indexes = {size: UserIndex(list_names, rows[:size]) for size in sizes}
+
+    header = "".join(f"{f'{size} products':>18}" for size in sizes)
+    print(f"\nmedian latency (top {args.limit}){header}")
+    for label, text in queries.items():
+        cells = "".join(
+            f"{median_ms(lambda: indexes[size].search(text, args.limit), args.rounds):>12.3f}ms"
+            f" {len(indexes[size].search(text, 10 ** 9)):>4}" for size in sizes
+        )
+        print(f"{label:<24}{cells}")
+    cells = "".join(
+        f"{median_ms(lambda: scan(rows[:size], rare, args.limit), max(args.rounds // 10, 3)):>12.3f}ms     "
+        for size in sizes
+    )
+    print(f"{'scan (client side)':<24}{cells}")
+    print(f"(number after each latency: products ranked, at most {MAX_CANDIDATES})")
+
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--lists", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=200)
+    run_async(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+"""
+10k 筆產品回應的序列化成本：CPU 時間與記憶體峰值
+
+    python -m benchmarks.bench_serialization --rows 10000
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+from schemas.responseSchema import ProductPageResponse
+from utils.responses import ORJSONResponse, JSONArrayStreamingResponse
+
+
+def make_rows(count: int) -> list:
+    start = date(2025, 1, 1)
+    return [
+        (str(index), f"product-{index}", start + timedelta(days=index % 365),
+         f"http://domainaname/image/product/{index}")
+        for index in range(count)
+    ]
+
+
+def payload(rows):
+    return {"success": True, "message": "ok", "product": rows, "next_cursor": None}
+
+
+def stdlib_json(rows):
+    """
+    原本的作法：日期先轉字串，再以 JSONResponse（標準函式庫 json）編碼
+    """
+    rows = [(row[0], row[1], row[2].isoformat(), row[3]) for row in rows]
+    return len(JSONResponse(payload(rows)).body)
+
+
+_adapter = TypeAdapter(ProductPageResponse)
+
+
+def pydantic_validate(rows):
+    """
+    回傳 dict 並設定 response_model 時，FastAPI 會先驗證再編碼
+    """
+    return len(_adapter.dump_json(_adapter.validate_python(payload(rows))))
+
+
+def orjson_response(rows):
+    return len(ORJSONResponse(payload(rows)).body)
+
+
+def streaming(rows, page_size=1000):
+    async def pages():
+        for start in range(0, len(rows), page_size):
+            yield rows[start:start + page_size]
+
+    async def consume():
+        size = 0
+        async for chunk in JSONArrayStreamingResponse(pages()).body_iterator:
+            size += len(chunk)
+        return size
+
+    return asyncio.run(consume())
+
+
+def main(args):
+    rows = make_rows(args.rows)
+    for name, encode in (("stdlib json", stdlib_json), ("pydantic", pydantic_validate),
+                         ("orjson", orjson_response), ("streaming", streaming)):
+        encode(rows)
+        started = time.process_time()
+        for _ in range(args.repeat):
+            size = encode(rows)
+        cpu = (time.process_time() - started) / args.repeat
+
+        tracemalloc.start()
+        encode(rows)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:<12} cpu {cpu * 1000:>7.2f}ms  peak {peak / 1024 / 1024:>6.2f} MiB  body {size} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
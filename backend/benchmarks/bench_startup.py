@@ -0,0 +1,105 @@
+"""
+dev / prod 兩種 APP_MODE 的啟動時間
+
+每次都啟動新的 Python process：import main、執行 lifespan，再送出第一個需要 JWT 與資料庫的請求，
+分別記錄各階段與整體的 time-to-first-request。資料庫是預先建好 schema 的 SQLite 檔案，
+模擬重新啟動或擴展時資料表早已存在的情況。
+
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def child(mode: str, db_url: str, user_uid: str):
+    started = time.perf_counter()
+    from benchmarks.common import app_client, set_app_env
+
+    os.environ['APP_MODE'] = mode
+    set_app_env()
+    import main
+
+    imported = time.perf_counter()
+    async with app_client(db_url) as client:
+        ready = time.perf_counter()
+        token = main.create_access_token({"sub": user_uid})
+        response = await client.post("/api/get_lists", json={}, headers={"Authorization": f"Bearer {token}"})
+        done = time.perf_counter()
+    assert response.status_code == 200, response.text
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "lifespan_ms": (ready - imported) * 1000,
+        "first_request_ms": (done - ready) * 1000,
+        "time_to_first_request_ms": (done - started) * 1000,
+    }))
+
+
+async def prepare(db_url: str) -> str:
+    """
+    建立 schema、一位使用者，以及記錄最新 migration 的 aerich 表
+    """
+    from tortoise import connections
+
+    from benchmarks.common import init_db, close_db
+    from models.userModel import UserModel
+    from utils.startup import latest_migration
+
+    await init_db(db_url)
+    await UserModel.create(
+        id="1", user_uid="100000", username="startup", email="startup@example.com", username_key="startup",
+        email_key="startup@example.com", password="", created_at="", updated_at="",
+    )
+    conn = connections.get("default")
+    await conn.execute_script(
+        'CREATE TABLE "aerich" ("id" INTEGER PRIMARY KEY AUTOINCREMENT, "version" VARCHAR(255) NOT NULL, '
+        '"app" VARCHAR(100) NOT NULL, "content" JSON NOT NULL)'
+    )
+    await conn.execute_query(
+        'INSERT INTO "aerich" ("version", "app", "content") VALUES (?, ?, ?)',
+        [latest_migration() + ".py", "models", "{}"]
+    )
+    await close_db()
+    return "100000"
+
+
+def run_child(mode: str, db_url: str, user_uid: str) -> dict:
+    env = dict(os.environ, EXPIRY_SCAN_ENABLED="false")
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", mode, db_url, user_uid],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings["process_wall_ms"] = (time.perf_counter() - started) * 1000
+    return timings
+
+
+def main(args):
+    db_url = f"sqlite://{tempfile.mkdtemp(prefix='startup-')}/db.sqlite3"
+    user_uid = asyncio.run(prepare(db_url))
+    runs = {"dev": [], "prod": []}
+    # 兩種模式交替執行，避免檔案快取等因素只影響其中一種
+    for _ in range(args.runs):
+        for mode, results in runs.items():
+            results.append(run_child(mode, db_url, user_uid))
+    report = {
+        mode: {key: round(statistics.median(run[key] for run in results), 1) for key in results[0]}
+        for mode, results in runs.items()
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        asyncio.run(child(*sys.argv[2:5]))
+    else:
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--runs", type=int, default=5)
+        main(parser.parse_args())
@@ -0,0 +1,86 @@
+"""
+比較 user_uid 產生方式在不同使用率下的延遲
+
+舊作法每次隨機抽一個 UID 並以 exists() 確認，新作法使用 utils.uidGenerator。
+
+    python -m benchmarks.bench_uid_generator --samples 200
+"""
+import argparse
+import random
+import statistics
+
+from tortoise import run_async
+
+from benchmarks.common import init_db, close_db, Timer
+from models.userModel import UserModel
+from utils.idAllocator import BlockSequenceAllocator
+from utils.uidGenerator import UidGenerator
+
+
+async def legacy_uid():
+    """
+    原本的 generate_unique_uid，回傳 UID 與查詢次數
+    """
+    queries = 0
+    while True:
+        user_uid = str(random.randint(100000, 999999))
+        queries += 1
+        if not await UserModel.filter(user_uid=user_uid).exists():
+            return user_uid, queries
+
+
+async def fill_to(utilisation: float, filled: int) -> int:
+    """
+    以舊版的隨機 UID 把使用者表填到指定使用率
+    """
+    target = int(UidGenerator.SPACE * utilisation)
+    existing = set(await UserModel.all().values_list("user_uid", flat=True))
+    candidates = [str(uid) for uid in range(100000, 1000000) if str(uid) not in existing]
+    rows = [
+        UserModel(id=str(filled + index), user_uid=uid, username=f"u{filled + index}",
+                  email=f"u{filled + index}@example.com", username_key=f"u{filled + index}",
+                  email_key=f"u{filled + index}@example.com", password="", created_at="", updated_at="")
+        for index, uid in enumerate(random.sample(candidates, target - filled))
+    ]
+    await UserModel.bulk_create(rows, batch_size=10000)
+    return target
+
+
+async def measure(name, generate, samples):
+    latencies = []
+    for _ in range(samples):
+        with Timer() as timer:
+            await generate()
+        latencies.append(timer.elapsed * 1e6)
+    latencies.sort()
+    print(f"  {name:<8} mean {statistics.mean(latencies):>9.1f}us"
+          f"  p99 {latencies[int(len(latencies) * 0.99) - 1]:>9.1f}us")
+
+
+async def main(args):
+    await init_db()
+    filled = 0
+    for utilisation in (0.1, 0.5, 0.9):
+        filled = await fill_to(utilisation, filled)
+        print(f"utilisation {utilisation:.0%} ({filled} users)")
+
+        probes = []
+
+        async def legacy():
+            probes.append((await legacy_uid())[1])
+
+        await measure("legacy", legacy, args.samples)
+        print(f"  {'':<8} avg {statistics.mean(probes):.2f} queries per registration")
+
+        generator = UidGenerator(b"bench", BlockSequenceAllocator())
+        with Timer() as timer:
+            await generator._load_taken()
+        print(f"  {'':<8} bitmap load {timer.elapsed * 1000:.1f}ms (once per process)")
+        await measure("permute", generator.next_uid, args.samples)
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--samples", type=int, default=200)
+    run_async(main(parser.parse_args()))
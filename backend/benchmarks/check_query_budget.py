@@ -0,0 +1,95 @@
+"""
+每個 endpoint 的 SQL 次數上限，超過時以非零狀態碼結束（可放在 CI 中執行）
+
+    python -m benchmarks.check_query_budget
+"""
+import sys
+
+from benchmarks.common import app_client, run_check
+from utils.queryStats import assert_max_queries
+
+
+# (名稱, method, path, body, 上限)；前面的請求會先建立後面需要的資料
+# 同一個 GET path 第二次請求時帶上前一次的 ETag，應該回傳 304
+BUDGETS = [
+    ("create_user", "POST", "/api/create_user",
+     {"username": "budget", "email": "budget@example.com", "password": "budget-password"}, 2),
+    ("login_user", "POST", "/api/login_user",
+     {"username_or_email": "budget", "password": "budget-password"}, 1),
+    # 寫入的 endpoint 每次都向資料庫確認帳號未被刪除（不使用快取的使用者），多一次查詢
+    ("create_list", "POST", "/api/create_list", {"list_name": "fridge"}, 3),
+    ("create_product", "POST", "/api/create_product",
+     {"list_name": "fridge", "product_name": "milk", "product_barcode": "4710000000001",
+      "expiry_date": "2030-01-01"}, 4),
+    ("get_lists", "POST", "/api/get_lists", {}, 1),
+    ("get_product", "POST", "/api/get_product", {"list_name": "fridge"}, 1),
+    ("get_lists_etag", "GET", "/api/lists", None, 2),
+    ("get_lists_not_modified", "GET", "/api/lists", None, 1),
+    ("get_list_products_etag", "GET", "/api/lists/fridge/products", None, 2),
+    ("get_list_products_not_modified", "GET", "/api/lists/fridge/products", None, 1),
+    ("get_visible_lists", "GET", "/api/visible_lists", None, 1),
+    ("get_expiring_products", "POST", "/api/get_expiring_products",
+     {"start": "2029-12-01", "end": "2030-02-01"}, 1),
+    # 第一次搜尋建立索引，之後只查記憶體內的索引
+    ("search_products_build", "GET", "/api/search?q=milk", None, 2),
+    ("search_products", "GET", "/api/search?q=mil", None, 0),
+    ("move_products", "POST", "/api/move_products", {"ids": ["2"], "list_name": "fridge"}, 5),
+    ("get_notifications", "POST", "/api/get_notifications", {}, 1),
+    ("delete_products", "POST", "/api/delete_products", {"ids": ["2"]}, 4),
+    # 只標記刪除並建立背景工作，次數與清單中的產品數無關
+    ("delete_list", "POST", "/api/delete_list", {"list_name": "fridge"}, 5),
+]
+
+
+async def warm_up(client):
+    """
+    第一次分配 id 會建立序列、載入 UID bitmap，先各執行一次，不列入預算
+    """
+    await client.post("/api/create_user", json={
+        "username": "warmup", "email": "warmup@example.com", "password": "warmup-password"
+    })
+    response = await client.post("/api/login_user", json={
+        "username_or_email": "warmup", "password": "warmup-password"
+    })
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    await client.post("/api/create_list", json={"list_name": "warmup"}, headers=headers)
+    await client.post("/api/create_product", headers=headers, json={
+        "list_name": "warmup", "product_name": "warmup", "product_barcode": "4710000000000",
+        "expiry_date": "2030-01-01"
+    })
+    await client.post("/api/delete_list", json={"list_name": "warmup"}, headers=headers)
+
+
+async def main():
+    failures = []
+    headers = {}
+    etags = {}
+    async with app_client() as client:
+        await warm_up(client)
+        for name, method, path, body, limit in BUDGETS:
+            request_headers = headers
+            if method == "GET" and path in etags:
+                request_headers = {**headers, "If-None-Match": etags[path]}
+            try:
+                with assert_max_queries(limit) as stats:
+                    response = await client.request(method, path, json=body, headers=request_headers)
+            except AssertionError as e:
+                failures.append(f"{name}: {e}")
+                print(f"{name:<32} FAIL")
+                continue
+            if response.status_code >= 400:
+                failures.append(f"{name}: HTTP {response.status_code} {response.text}")
+            if method == "GET":
+                if path in etags and response.status_code != 304:
+                    failures.append(f"{name}: expected 304, got HTTP {response.status_code}")
+                etags[path] = response.headers.get("etag")
+            if name == "login_user" and response.status_code == 200:
+                headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            print(f"{name:<32} {stats.count:>3} / {limit} queries  {stats.duration * 1000:7.2f} ms")
+    for failure in failures:
+        print(failure, file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_check(main()))
@@ -0,0 +1,66 @@
+"""
+以兩個 SQLite 檔案模擬主資料庫與 replica，檢查讀寫分離與 read-your-writes
+
+replica 只建立資料表、不做複寫，因此：
+- 寫入後 DB_READ_STICKY_SECONDS 內的讀取走主資料庫，看得到剛建立的清單
+- 視窗過後的讀取走 replica，看不到主資料庫的資料
+
+    python -m benchmarks.check_read_routing
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# config 在 import 時讀取連線設定，必須在 import benchmarks.common 之前設定
+DATA_DIR = tempfile.mkdtemp(prefix="read-routing-")
+os.environ['DB_URL'] = f"sqlite://{DATA_DIR}/primary.sqlite3"
+os.environ['DB_READ_URL'] = f"sqlite://{DATA_DIR}/replica.sqlite3"
+os.environ.setdefault('DB_READ_STICKY_SECONDS', '0.5')
+
+from tortoise import connections
+from tortoise.utils import get_schema_sql
+
+from benchmarks.common import app_client, run_check
+from utils.readRouter import read_router
+
+
+def check(condition: bool, message: str, failures: list):
+    print(f"{'ok  ' if condition else 'FAIL'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+async def main():
+    failures = []
+    async with app_client(os.environ['DB_URL']) as client:
+        await connections.get("read").execute_script(get_schema_sql(connections.get("default"), safe=True))
+
+        await client.post("/api/create_user", json={
+            "username": "replica", "email": "replica@example.com", "password": "replica-password"
+        })
+        response = await client.post("/api/login_user", json={
+            "username_or_email": "replica", "password": "replica-password"
+        })
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        # 清單建立前：沒有寫入紀錄，讀取走 replica
+        response = await client.post("/api/get_lists", json={}, headers=headers)
+        check(response.json()["list"] == [], "read before any write uses the replica", failures)
+
+        await client.post("/api/create_list", json={"list_name": "fridge"}, headers=headers)
+        response = await client.post("/api/get_lists", json={}, headers=headers)
+        check(response.json()["list"] == ["fridge"], "read right after a write uses the primary", failures)
+
+        await asyncio.sleep(read_router._recent_writes.ttl + 0.1)
+        response = await client.post("/api/get_lists", json={}, headers=headers)
+        check(response.json()["list"] == [], "read after the sticky window uses the replica", failures)
+
+        metrics = (await client.get("/metrics")).text
+        routed = [line for line in metrics.splitlines() if line.startswith("db_read_routing_total")]
+        print("\n".join(routed))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_check(main()))
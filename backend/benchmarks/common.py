@@ -0,0 +1,95 @@
+"""
+benchmark 共用工具
+"""
+import os
+import time
+from contextlib import asynccontextmanager
+
+from tortoise import Tortoise, run_async
+
+import config
+
+
+MODEL_MODULES = [
+    module for module in config.TORTOISE_ORM["apps"]["models"]["models"]
+    if module != "aerich.models"
+]
+
+
+async def init_db(db_url: str = None):
+    """
+    初始化 benchmark 用資料庫，預設為記憶體內的 SQLite
+    """
+    await Tortoise.init(
+        db_url=db_url or os.getenv('BENCH_DB_URL', 'sqlite://:memory:'),
+        modules={"models": MODEL_MODULES},
+    )
+    await Tortoise.generate_schemas()
+
+
+async def close_db():
+    """
+    關閉資料庫連線
+    """
+    await Tortoise.close_connections()
+
+
+def set_app_env():
+    """
+    未設定的 JWT 參數與 USER_UID_KEY 使用測試值，背景掃描與登入頻率限制預設關閉（必須在 import main 之前呼叫）
+    """
+    os.environ.setdefault('JWT_SECRET_KEY', 'benchmark-secret-key')
+    os.environ.setdefault('JWT_ALGORITHM', 'HS256')
+    os.environ.setdefault('JWT_ACCESS_TOKEN_EXPIRE_MINUTES', '30')
+    os.environ.setdefault('USER_UID_KEY', 'benchmark-uid-key')
+    os.environ.setdefault('EXPIRY_SCAN_ENABLED', 'false')
+    # 所有請求都來自同一個 client，預設不限制登入 / 註冊頻率
+    os.environ.setdefault('AUTH_RATE_IP_PER_MINUTE', '0')
+    os.environ.setdefault('AUTH_RATE_USER_PER_MINUTE', '0')
+
+
+@asynccontextmanager
+async def app_client(db_url: str = None):
+    """
+    以 in-process ASGI 啟動整個 app（含 lifespan），回傳 httpx client
+    """
+    import httpx
+
+    set_app_env()
+    config.TORTOISE_ORM["connections"]["default"] = db_url or os.getenv('BENCH_DB_URL', 'sqlite://:memory:')
+    config.TORTOISE_ORM["apps"]["models"]["models"] = MODEL_MODULES
+
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            yield client
+
+
+def run_check(coro) -> int:
+    """
+    以 run_async 執行檢查（結束時關閉資料庫連線）並回傳 coro 的結果作為結束狀態碼
+
+    tortoise 的 run_async 不會回傳 coro 的結果，直接 sys.exit(run_async(...)) 永遠以 0 結束
+    """
+    result = []
+
+    async def runner():
+        result.append(await coro)
+
+    run_async(runner())
+    return result[0]
+
+
+class Timer:
+    """
+    計時用 context manager
+    """
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
@@ -0,0 +1,346 @@
+"""
+API 負載測試
+
+以 ASGI transport 在同一個 process 內驅動整個 FastAPI app（不經過網路），先建立測試資料，
+再以多個並行 worker 依比例執行各情境，最後以 JSON 輸出每個情境的吞吐量與 p50/p95/p99 延遲，
+可保存下來比較不同 commit 的結果。
+
+    python -m benchmarks.load_test --users 200 --lists 5 --products 200 --duration 30 --output result.json
+    python -m benchmarks.load_test --smoke
+    python -m benchmarks.load_test --rate 400 --duration 30
+
+預設為 closed loop（--concurrency 個 worker 收到回應後才送下一個請求）；指定 --rate 時改為 open loop，
+每秒固定送出 rate 個請求（Poisson 到達），不管之前的請求是否完成，延遲從預定的送出時間起算，
+用來觀察超過飽和點時的排隊行為。admission control 拒絕的請求（503 / 429）計為 shed，不算錯誤。
+
+--smoke 使用很小的資料量與 5 秒的執行時間，一分鐘內完成，出現 5xx 或其他錯誤回應（不含 shed 與 404）時以非零狀態碼結束。
+預設使用記憶體內的 SQLite，可以 BENCH_DB_URL 改用其他資料庫。
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from benchmarks.common import app_client, run_check
+
+
+DEFAULT_MIX = "get_product=30,get_lists=20,create_product=15,delete_product=15,login=10,create_list=5,register=5"
+PASSWORD = "load-test-password"
+SHED_STATUS = (429, 503)
+
+
+def parse_mix(text: str) -> dict:
+    mix = {}
+    for item in text.split(","):
+        name, weight = item.split("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario '{name}', choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """
+    nearest-rank 百分位數
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(fraction * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(latencies: list, errors: int, server_errors: int, shed: int, elapsed: float) -> dict:
+    """
+    延遲只統計沒有被 shed 的請求
+    """
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "server_errors": server_errors,
+        "shed": shed,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+    }
+
+
+class LoadState:
+    """
+    測試資料與各 worker 共用的狀態
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.users = []  # [(username, headers)]
+        self.lists = {}  # username -> [list_name]
+        self.products = {}  # username -> [product_id]
+        self.counter = itertools.count()
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+    def barcode(self) -> str:
+        return f"9{next(self.counter):012d}"
+
+
+async def seed(state: LoadState, users: int, lists: int, products: int):
+    """
+    直接以 ORM 建立測試資料（id 仍由 id_allocator 分配，之後 API 新增的資料不會衝突）
+    """
+    from main import create_access_token
+    from models.listModel import ListModel, ProductModel
+    from models.userModel import UserModel, UserProfileModel
+    from utils.idAllocator import id_allocator
+    from utils.loginResolver import normalize
+    from utils.passwordHasher import password_hasher
+    from utils.uidGenerator import uid_generator
+
+    password = await password_hasher.hash(PASSWORD)
+    now = datetime.now(timezone.utc)
+    user_ids = await id_allocator.reserve(UserModel, users)
+    user_rows = []
+    for index, table_id in enumerate(user_ids):
+        username = f"load{index}"
+        user_rows.append(UserModel(
+            id=table_id, user_uid=await uid_generator.next_uid(), username=username,
+            email=f"{username}@example.com", username_key=username, email_key=normalize(f"{username}@example.com"),
+            password=password, name="user", created_at=now.isoformat(timespec='seconds'),
+            updated_at=now.isoformat(timespec='seconds'),
+        ))
+    await UserModel.bulk_create(user_rows, batch_size=1000)
+    await UserProfileModel.bulk_create(
+        [UserProfileModel(id=user.id, f_user_uid_id=user.user_uid) for user in user_rows], batch_size=1000
+    )
+
+    list_ids = iter(await id_allocator.reserve(ListModel, users * lists))
+    list_rows = []
+    for user in user_rows:
+        names = [f"list-{index}" for index in range(lists)]
+        state.lists[user.username] = names
+        list_rows.extend(
+            ListModel(id=next(list_ids), f_user_uid_id=user.user_uid, list_name=name, created_at=now)
+            for name in names
+        )
+    await ListModel.bulk_create(list_rows, batch_size=1000)
+
+    product_ids = iter(await id_allocator.reserve(ProductModel, len(list_rows) * products))
+    owners = {user.user_uid: user.username for user in user_rows}
+    batch = []
+    for list_row in list_rows:
+        for index in range(products):
+            product_id = next(product_ids)
+            batch.append(ProductModel(
+                id=product_id, f_user_uid_id=list_row.f_user_uid_id, f_list_uid_id=list_row.id,
+                product_name=f"product-{index}", product_barcode=state.barcode(),
+                expiry_date=date.today() + timedelta(days=index % 90),
+                product_image_url=f'http://domainaname/image/product/{product_id}',
+            ))
+            state.products.setdefault(owners[list_row.f_user_uid_id], []).append(product_id)
+        if len(batch) >= 10000:
+            await ProductModel.bulk_create(batch)
+            batch = []
+    if batch:
+        await ProductModel.bulk_create(batch)
+
+    for user in user_rows:
+        token = create_access_token({"sub": user.user_uid}, expires_delta=timedelta(hours=1))
+        state.users.append((user.username, {"Authorization": f"Bearer {token}"}))
+
+
+async def scenario_register(client, state: LoadState):
+    name = f"new{next(state.counter)}"
+    return await client.post("/api/create_user", json={
+        "username": name, "email": f"{name}@example.com", "password": PASSWORD
+    })
+
+
+async def scenario_login(client, state: LoadState):
+    username, _ = state.user()
+    return await client.post("/api/login_user", json={"username_or_email": username, "password": PASSWORD})
+
+
+async def scenario_create_list(client, state: LoadState):
+    username, headers = state.user()
+    name = f"extra-{next(state.counter)}"
+    response = await client.post("/api/create_list", json={"list_name": name}, headers=headers)
+    if response.status_code == 200:
+        state.lists[username].append(name)
+    return response
+
+
+async def scenario_create_product(client, state: LoadState):
+    username, headers = state.user()
+    return await client.post("/api/create_product", headers=headers, json={
+        "list_name": state.rng.choice(state.lists[username]), "product_name": "load",
+        "product_barcode": state.barcode(), "expiry_date": date.today().isoformat(),
+    })
+
+
+async def scenario_get_lists(client, state: LoadState):
+    _, headers = state.user()
+    return await client.post("/api/get_lists", json={}, headers=headers)
+
+
+async def scenario_get_product(client, state: LoadState):
+    username, headers = state.user()
+    return await client.post(
+        "/api/get_product", json={"list_name": state.rng.choice(state.lists[username])}, headers=headers
+    )
+
+
+async def scenario_delete_product(client, state: LoadState):
+    username, headers = state.user()
+    owned = state.products.get(username)
+    # 已經刪光時刪除不存在的 id，仍會走完整個查詢路徑（回應 404）
+    product_id = owned.pop(state.rng.randrange(len(owned))) if owned else "0"
+    return await client.post("/api/delete_product", json={"id": product_id}, headers=headers)
+
+
+SCENARIOS = {
+    "register": scenario_register,
+    "login": scenario_login,
+    "create_list": scenario_create_list,
+    "create_product": scenario_create_product,
+    "get_lists": scenario_get_lists,
+    "get_product": scenario_get_product,
+    "delete_product": scenario_delete_product,
+}
+
+
+def new_results(mix: dict) -> dict:
+    return {name: {"latencies": [], "errors": 0, "server_errors": 0, "shed": 0} for name in mix}
+
+
+async def timed_request(client, state: LoadState, name: str, result: dict, started: float):
+    response = await SCENARIOS[name](client, state)
+    if response.status_code in SHED_STATUS:
+        result["shed"] += 1
+        return
+    result["latencies"].append(time.perf_counter() - started)
+    if response.status_code >= 400 and response.status_code != 404:
+        result["errors"] += 1
+    if response.status_code >= 500:
+        result["server_errors"] += 1
+
+
+async def run_load(client, state: LoadState, mix: dict, concurrency: int, duration: float):
+    """
+    closed loop：concurrency 個 worker 各自依序送出請求
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = new_results(mix)
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = state.rng.choices(names, weights)[0]
+            await timed_request(client, state, name, results[name], time.perf_counter())
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+async def run_open_load(client, state: LoadState, mix: dict, rate: float, duration: float):
+    """
+    open loop：依 Poisson 到達時間送出請求，延遲包含請求在 client 端排隊的時間
+    """
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = new_results(mix)
+    tasks = []
+    started = time.perf_counter()
+    scheduled = started
+    while scheduled < started + duration:
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = state.rng.choices(names, weights)[0]
+        tasks.append(asyncio.create_task(timed_request(client, state, name, results[name], scheduled)))
+        scheduled += state.rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - started
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args):
+    mix = parse_mix(args.mix)
+    state = LoadState(random.Random(args.seed))
+    async with app_client() as client:
+        seed_started = time.perf_counter()
+        await seed(state, args.users, args.lists, args.products)
+        seed_elapsed = time.perf_counter() - seed_started
+        if args.rate:
+            results, elapsed = await run_open_load(client, state, mix, args.rate, args.duration)
+        else:
+            results, elapsed = await run_load(client, state, mix, args.concurrency, args.duration)
+
+    all_latencies = [value for result in results.values() for value in result["latencies"]]
+    report = {
+        "revision": git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "config": {
+            "users": args.users, "lists_per_user": args.lists, "products_per_list": args.products,
+            "concurrency": None if args.rate else args.concurrency, "rate_rps": args.rate,
+            "duration_s": args.duration, "mix": mix, "seed": args.seed,
+        },
+        "seed_seconds": round(seed_elapsed, 3),
+        "total": summarize(
+            all_latencies,
+            sum(result["errors"] for result in results.values()),
+            sum(result["server_errors"] for result in results.values()),
+            sum(result["shed"] for result in results.values()),
+            elapsed,
+        ),
+        "scenarios": {
+            name: summarize(
+                result["latencies"], result["errors"], result["server_errors"], result["shed"], elapsed
+            )
+            for name, result in results.items()
+        },
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    print(output)
+    return 1 if args.smoke and report["total"]["errors"] else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--lists", type=int, default=5, help="lists per user")
+    parser.add_argument("--products", type=int, default=200, help="products per list")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, help="open loop: requests per second (ignores --concurrency)")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight,...")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--smoke", action="store_true", help="tiny data set, 5 s run")
+    args = parser.parse_args(argv)
+    if args.smoke:
+        args.users, args.lists, args.products, args.duration = 20, 2, 50, 5
+    return args
+
+
+if __name__ == "__main__":
+    sys.exit(run_check(main(parse_args())))
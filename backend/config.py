@@ -13,15 +13,63 @@ DB_IP=os.getenv('DB_IP')
 DB_PORT=os.getenv('DB_PORT')
 DB_NAME=os.getenv('DB_NAME')
 
+# 唯讀 replica，未設定 DB_READ_IP 時所有讀取都走主資料庫
+DB_READ_IP=os.getenv('DB_READ_IP')
+DB_READ_PORT=os.getenv('DB_READ_PORT') or DB_PORT
+
+# 連線池設定（asyncpg）
+DB_POOL_MIN_SIZE=int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE=int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_STATEMENT_CACHE_SIZE=int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
+DB_CONNECTION_LIFETIME=float(os.getenv('DB_CONNECTION_LIFETIME', '300'))
+DB_MAX_QUERIES=int(os.getenv('DB_MAX_QUERIES', '50000'))
+
+# 直接指定連線字串（例如本機以兩個 SQLite 檔案模擬主資料庫與 replica），會覆蓋上面的設定
+DB_URL=os.getenv('DB_URL')
+DB_READ_URL=os.getenv('DB_READ_URL')
+
+
+def postgres_connection(host: str, port: str) -> dict:
+    """
+    依連線池設定產生 asyncpg 連線
+    """
+    return {
+        "engine": "tortoise.backends.asyncpg",
+        "credentials": {
+            "host": host,
+            "port": port,
+            "user": DB_USERNAME,
+            "password": DB_PWD,
+            "database": DB_NAME,
+            "minsize": DB_POOL_MIN_SIZE,
+            "maxsize": DB_POOL_MAX_SIZE,
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            # 閒置超過此秒數的連線會被關閉，避免長時間持有失效連線
+            "max_inactive_connection_lifetime": DB_CONNECTION_LIFETIME,
+            # 連線執行超過此次數後重建，釋放 statement cache 與 server 端資源
+            "max_queries": DB_MAX_QUERIES,
+        },
+    }
+
+
+CONNECTIONS = {"default": DB_URL or postgres_connection(DB_IP, DB_PORT)}
+if DB_READ_URL or DB_READ_IP:
+    CONNECTIONS["read"] = DB_READ_URL or postgres_connection(DB_READ_IP, DB_READ_PORT)
+
+# 唯讀查詢使用的連線名稱，沒有 replica 時為 None
+READ_CONNECTION = "read" if "read" in CONNECTIONS else None
+
 TORTOISE_ORM = {
-    "connections": {
-        "default": f"postgres://{DB_USERNAME}:{DB_PWD}@{DB_IP}:{DB_PORT}/{DB_NAME}",
-    },
+    "connections": CONNECTIONS,
     "apps": {
         "models": {
             "models": [
                 "models.userModel",
                 "models.listModel",
+                "models.sequenceModel",
+                "models.notificationModel",
+                "models.catalogModel",
+                "models.deletionJobModel",
                 "aerich.models"
             ],
             "default_connection": "default",
@@ -1,25 +1,20 @@
 import os
 import re
+import tempfile
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timezone, timedelta
 from typing import Optional
-import random
 
-
-async def generate_unique_uid():
-    while True:
-        user_uid = str(random.randint(100000, 999999))
-        exists = await UserModel.filter(user_uid=user_uid).exists()
-        if not exists:
-            return user_uid  # 找到唯一的 UID
-
-        
-from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi import FastAPI, HTTPException, Depends, Request, Query, Path, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from tortoise.contrib.fastapi import register_tortoise
-from tortoise.expressions import Q
+from jose import JWTError, jwk, jwt
+from tortoise import connections
+from tortoise.contrib.fastapi import RegisterTortoise
+from tortoise.expressions import Q, Subquery
+from tortoise.transactions import in_transaction
 from tortoise.exceptions import IntegrityError
 
 from dotenv import load_dotenv
@@ -27,11 +22,47 @@ from dotenv import load_dotenv
 # 自定義模組
 import config
 from schemas.registerSchema import UserRegisterFormData, UserProfileFormData
-from schemas.loginSchema import UserLoginFormData
-from schemas.listSchema import UserListCreate, UserListDelete
-from schemas.productSchema import ProductFormData, getProductFormData, deleteProductFormData
+from schemas.loginSchema import UserLoginFormData, UserDeleteFormData
+from schemas.listSchema import UserListCreate, UserListDelete, UserListPage, UserListShare, UserListRevoke
+from schemas.responseSchema import MessageResponse, RegisterResponse, LoginResponse, \
+    CreateListResponse, ListPageResponse, VisibleListResponse, CreateProductResponse, ProductPageResponse, \
+    ExpiringProductResponse, SearchResponse, UploadImageResponse, BarcodeResponse, DeleteProductResponse, DeletedCountResponse, MovedCountResponse, \
+    NotificationPageResponse, DeletionJobResponse, DeletionJobStatusResponse
+from schemas.notificationSchema import getNotificationFormData
+from schemas.productSchema import ProductFormData, getProductFormData, deleteProductFormData, \
+    expiringProductFormData, deleteProductsFormData, deleteExpiredFormData, moveProductsFormData, \
+    streamProductFormData
 from models.userModel import UserModel, UserProfileModel
 from models.listModel import ProductModel, ListModel, ListPermissionModel
+from models.notificationModel import NotificationModel
+from models.deletionJobModel import DeletionJobModel
+from utils.idAllocator import id_allocator
+from utils.uidGenerator import uid_generator, UidSpaceExhausted
+from utils.tokenCache import token_cache
+from utils.expiryScanner import expiry_scanner
+from utils.deletionPurger import deletion_purger
+from utils.passwordHasher import password_hasher
+from utils.readRouter import read_router
+from utils.startup import MODES as APP_MODES, verify_migration_head, prewarm_connections
+from utils.loginResolver import login_resolver, normalize as normalize_login
+from utils.eventLog import event_log
+from utils.metrics import registry as metrics_registry
+from utils.metricsMiddleware import MetricsMiddleware
+from utils.admission import AdmissionMiddleware, settings_from_env as admission_settings
+from utils import queryStats
+from utils.responses import ORJSONResponse, JSONArrayStreamingResponse, conditional_file_response, etag_matches
+from utils.imageStore import image_store, ImageTooLarge, UnsupportedImage
+from utils.barcodeCatalog import barcode_catalog
+from utils.listVersions import CACHE_CONTROL as LIST_CACHE_CONTROL, list_etag, lists_etag, \
+    bump_user_lists, bump_lists, product_lists
+from utils.changeFeed import change_hub, publish_list_event, user_topic, list_topic, encode_sse, \
+    READY, RESYNC
+from utils.listAccess import list_access
+from utils.productSearch import product_search
+from utils.productImporter import ProductImporter, FORMATS as IMPORT_FORMATS
+from utils.listReader import fetch_products_page, fetch_list_names_page, expiring_between, \
+    iter_products, encode_cursor, decode_cursor, fetch_list_version, fetch_lists_version, \
+    fetch_list_version_by_id, fetch_list_products_page, fetch_visible_lists
 
 # 加載 .env 檔案
 load_dotenv()
@@ -45,36 +76,166 @@ SECRET_KEY = os.getenv('JWT_SECRET_KEY')
 ALGORITHM = os.getenv('JWT_ALGORITHM')
 ACCESS_TOKEN_EXPIRE_MINUTES = os.getenv('JWT_ACCESS_TOKEN_EXPIRE_MINUTES')
 
+# 啟動模式：dev 自動建立資料表；prod 只檢查 migration 版本並預熱連線
+APP_MODE = os.getenv('APP_MODE', 'dev')
+if APP_MODE not in APP_MODES:
+    raise ValueError(f"Unknown APP_MODE '{APP_MODE}'")
+
+# debug 模式：回應加上每個請求的 SQL 統計標頭
+DEBUG = os.getenv('DEBUG', 'false').lower() == 'true'
+
+# 背景到期掃描
+EXPIRY_SCAN_ENABLED = os.getenv('EXPIRY_SCAN_ENABLED', 'true').lower() == 'true'
+
+# 背景清除已刪除的清單與帳號
+DELETION_PURGE_ENABLED = os.getenv('DELETION_PURGE_ENABLED', 'true').lower() == 'true'
+
+# 批次匯入
+IMPORT_CHUNK_SIZE = int(os.getenv('IMPORT_CHUNK_SIZE', '500'))
+
+# admission control（每個路由的並行上限、等待佇列與登入 / 註冊頻率限制）
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+
+# change feed 沒有事件時送出 heartbeat 的間隔（秒），讓 proxy 不會切斷閒置連線
+CHANGE_FEED_HEARTBEAT_SECONDS = float(os.getenv('CHANGE_FEED_HEARTBEAT_SECONDS', '15'))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
+_signing_key = None
+
+
+def signing_key():
+    """
+    JWT 的金鑰物件，只建立一次（jose 收到字串時每次簽章 / 驗證都會重新建立）
+    """
+    global _signing_key
+    if _signing_key is None:
+        _signing_key = jwk.construct(SECRET_KEY, ALGORITHM)
+    return _signing_key
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
     創建 JWT Token
     """
     to_encode = data.copy()
-    print(to_encode)
     expire = datetime.now(timezone(timedelta(hours=8))) + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
-    print(expire, datetime.now(timezone(timedelta(hours=8))))
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(to_encode, signing_key(), algorithm=ALGORITHM)
 
 
-def decode_token(token: str = Depends(oauth2_scheme)):
+def verify_token(token: str) -> dict:
     """
-    驗證 JWT Token
+    驗證 JWT Token 並回傳 claims，驗證過的 token 會被快取到 exp
     """
-    # print(token)
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached[0]
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        userid: str = payload.get("sub")
-        if userid is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return userid
+        payload = jwt.decode(token, signing_key(), algorithms=[ALGORITHM])
     except JWTError as e:
-        print(e)
+        event_log.event("token_invalid", error=str(e))
         raise HTTPException(status_code=401, detail=f'Invalid token, {e}')
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    token_cache.put(token, payload)
+    return payload
+
+
+def decode_token(token: str = Depends(oauth2_scheme)):
+    """
+    驗證 JWT Token（讀取用；撤銷只看這個 process 的紀錄，寫入的 endpoint 使用 decode_active_token）
+    """
+    user_uid = verify_token(token)["sub"]
+    if token_cache.is_revoked(user_uid):
+        raise HTTPException(status_code=401, detail="user not found")
+    return user_uid
+
+
+def revoke_user_tokens(user_uid: str):
+    """
+    在這個 process 撤銷使用者已簽發的 token，最晚在 ACCESS_TOKEN_EXPIRE_MINUTES 後到期
+    """
+    token_cache.revoke_user(user_uid, time.time() + int(ACCESS_TOKEN_EXPIRE_MINUTES) * 60)
+
 
-app = FastAPI()
+async def get_active_user(token: str = Depends(oauth2_scheme)) -> UserModel:
+    """
+    驗證 JWT Token 並向資料庫讀取使用者（寫入的 endpoint 使用）
+
+    帳號可能在其他 process 被刪除，快取的使用者不能用來寫入；
+    讀到已刪除的帳號時在這個 process 記錄撤銷，之後的請求不再查詢
+    """
+    claims = verify_token(token)
+    user = None
+    if not token_cache.is_revoked(claims["sub"]):
+        user = await UserModel.get_or_none(user_uid=claims["sub"])
+    if user is not None and user.deleted_at is not None:
+        revoke_user_tokens(user.user_uid)
+        user = None
+    if not user:
+        raise HTTPException(status_code=401, detail="user not found")
+    token_cache.put(token, claims, user)
+    return user
+
+
+async def decode_active_token(token: str = Depends(oauth2_scheme)) -> str:
+    """
+    寫入用的 decode_token：向資料庫確認帳號未被刪除後回傳 user_uid
+    """
+    user = await get_active_user(token)
+    return user.user_uid
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserModel:
+    """
+    驗證 JWT Token 並回傳使用者（讀取用，使用快取）
+    """
+    cached = token_cache.get(token)
+    if cached is not None and cached[1] is not None:
+        if token_cache.is_revoked(cached[1].user_uid):
+            raise HTTPException(status_code=401, detail="user not found")
+        return cached[1]
+    return await get_active_user(token)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    啟動時連接資料庫並開始背景掃描，關閉時依序停止
+    """
+    async with RegisterTortoise(
+        app,
+        config = config.TORTOISE_ORM,
+        generate_schemas = APP_MODE == 'dev',  # 只在開發模式自動生成資料表
+        add_exception_handlers = True,
+    ):
+        queryStats.install()
+        uid_generator.verify_key()
+        if APP_MODE == 'prod':
+            await verify_migration_head()
+            await prewarm_connections(config.TORTOISE_ORM["connections"])
+            # 建立金鑰物件並走過一次簽章 / 驗證，載入 jose 的演算法實作
+            jwt.decode(jwt.encode({"sub": "prewarm"}, signing_key(), algorithm=ALGORITHM),
+                       signing_key(), algorithms=[ALGORITHM])
+        if EXPIRY_SCAN_ENABLED:
+            expiry_scanner.start()
+        if DELETION_PURGE_ENABLED:
+            deletion_purger.start()
+        barcode_catalog.start()
+        yield
+        await barcode_catalog.stop()
+        await deletion_purger.stop()
+        await expiry_scanner.stop()
+        password_hasher.shutdown()
+        image_store.shutdown()
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# 最內層：被拒絕的回應也會經過 CORS，瀏覽器才讀得到 429 / 503 與 Retry-After
+if ADMISSION_ENABLED:
+    app.add_middleware(
+        AdmissionMiddleware, router=app.router, exclude=("/metrics", "/api/changes"), **admission_settings()
+    )
 
 app.add_middleware(
     CORSMiddleware,
@@ -82,8 +243,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # 允許所有 HTTP 方法（如 GET、POST 等）
     allow_headers=["*"],  # 允許所有 HTTP 標頭
+    expose_headers=["Retry-After"],  # 不是 CORS-safelisted 標頭，需要明確開放前端才讀得到
 )
 
+# 最外層量測，CORS 預檢請求也會被計入
+# change feed 是長時間連線，不列入請求延遲
+app.add_middleware(MetricsMiddleware, exclude=("/metrics", "/api/changes"), query_headers=DEBUG)
+
 @app.get("/")
 async def read_root():
     """
@@ -91,26 +257,24 @@ async def read_root():
     """
     return {"Hello": "World"}
 
-@app.post("/api/create_user")
+@app.post("/api/create_user", response_model=RegisterResponse, status_code=201)
 async def register(data :UserRegisterFormData):
     """
     測試資料庫可否正常存值
     """
     try:
-        print("1")
-        last_user = await UserModel.all().order_by('-id').first()
-        table_id = 1
-        if last_user is not None:
-            table_id = int(last_user.id) + 1
+        table_id = await id_allocator.next_id(UserModel)
 
         current_timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
 
         instance = await UserModel.create(
-            id = str(table_id),
-            user_uid = await generate_unique_uid(),
+            id = table_id,
+            user_uid = await uid_generator.next_uid(),
             username = data.username,
             email = data.email,
-            password = data.password,
+            username_key = normalize_login(data.username),
+            email_key = normalize_login(data.email),
+            password = await password_hasher.hash(data.password),
             name = data.name,
             created_at = current_timestamp,
             updated_at = current_timestamp
@@ -118,11 +282,12 @@ async def register(data :UserRegisterFormData):
 
 
         user_profile_instance = await UserProfileModel.create(
-            id = str(table_id),
+            id = table_id,
             f_user_uid = instance,
         )
+        login_resolver.forget(data.username, data.email)
 
-        response = JSONResponse(
+        response = ORJSONResponse(
             status_code=201,
             content={
                 "success": True,
@@ -132,44 +297,48 @@ async def register(data :UserRegisterFormData):
         )
 
         return response
+    except UidSpaceExhausted as e:
+        raise HTTPException(status_code=503, detail="No user_uid available") from e
     except IntegrityError as e:
+        event_log.event("register_conflict", error=str(e))
         if "username" in str(e):
-            print(f"Username '{data.username}' is already exist", e)
             detail = f"Username '{data.username}' is already exist"
             raise HTTPException(status_code=400, detail=detail)  from e
         elif "email" in str(e):
-            print(f"Email '{data.email}' is already exist", e)
             detail = f"Email '{data.email}' is already exist"
             raise HTTPException(status_code=400, detail=detail)  from e
         else:
-            print(e)
+            event_log.warning("register_failed", error=str(e))
             raise HTTPException(status_code=400, detail="Database error") from e
 
-@app.post("/api/login_user")
+@app.post("/api/login_user", response_model=LoginResponse)
 async def login(data :UserLoginFormData):
     """
     測試資料庫可否正常存值
     """
-    print(data.username_or_email)
-    user = await UserModel.get_or_none(
-        Q(username=data.username_or_email) | Q(email=data.username_or_email)
-    )
+    user = await login_resolver.resolve(data.username_or_email)
 
     if not user:
+        event_log.event("login_failed", reason="user_not_found")
         raise HTTPException(status_code=404, detail="User not found")
 
-    password = data.password
-    if not password == user.password:
-        print("password wrong...")
+    if not await password_hasher.verify(data.password, user.password):
+        event_log.event("login_failed", reason="password", user_uid=user.user_uid)
         raise HTTPException(status_code=400, detail="password wrong...")
 
+    # 明文或舊參數的密碼，登入成功時重新雜湊
+    if password_hasher.needs_rehash(user.password):
+        await UserModel.filter(user_uid=user.user_uid)\
+            .update(password=await password_hasher.hash(data.password))
+        token_cache.invalidate_user(user.user_uid)
+
     token_data = {"sub": str(user.user_uid)}  # 使用用戶的 email 作為 JWT 主體
     access_token = create_access_token(
         data=token_data, 
         expires_delta=timedelta(minutes=int(ACCESS_TOKEN_EXPIRE_MINUTES))
         )
 
-    response = JSONResponse(
+    response = ORJSONResponse(
         status_code=200,
         content={
             "success": True,
@@ -180,34 +349,78 @@ async def login(data :UserLoginFormData):
 
     return response
 
-@app.post("/api/create_list")
-async def create_product(data: UserListCreate, userid: str = Depends(decode_token)):
+@app.post("/api/delete_user", response_model=DeletionJobResponse)
+async def delete_user(data: UserDeleteFormData, user_instance: UserModel = Depends(get_active_user)):
     """
-    創建產品的內容
+    刪除帳號（需再次輸入密碼）：帳號立即停用，所有資料由背景工作分批清除（見 utils.deletionPurger）
     """
-    user_instance = await UserModel.get_or_none(user_uid=userid)
+    if not await password_hasher.verify(data.password, user_instance.password):
+        raise HTTPException(status_code=400, detail="password wrong...")
 
-    if not user_instance:
-        print("user not exist")
-        raise HTTPException(status_code=404, detail="user not found")
+    userid = user_instance.user_uid
+    job_id = await id_allocator.next_id(DeletionJobModel)
+    now = datetime.now(timezone.utc)
+    async with in_transaction("default") as conn:
+        marked = await UserModel.filter(user_uid=userid, deleted_at=None).using_db(conn)\
+            .update(deleted_at=now)
+        if marked:
+            # 清單一併標記：其他 process 還沒撤銷這個使用者的 token 時，也讀不到清單與產品
+            await ListModel.filter(f_user_uid_id=userid, deleted_at=None).using_db(conn)\
+                .update(deleted_at=now)
+            await DeletionJobModel.create(
+                id = job_id,
+                user_uid = userid,
+                kind = "user",
+                target_id = userid,
+                target_name = user_instance.username,
+                created_at = now,
+                updated_at = now,
+                using_db = conn,
+            )
+    if not marked:
+        raise HTTPException(status_code=401, detail="user not found")
+    revoke_user_tokens(userid)
+    read_router.mark_write(userid)
+    product_search.user_removed(userid)
+    await change_hub.publish_event((user_topic(userid),), "user_deleted")
+    deletion_purger.wake()
+    event_log.event("user_deleted", user_uid=userid, job_id=job_id)
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "delete user successfully",
+            "job_id": job_id
+        },
+    )
 
-    last_list = await ListModel.all().order_by('-id').first()
+    return response
 
-    table_id = 1
-    if last_list:
-        table_id = int(last_list.id) + 1
-    current_timestamp = datetime.now(timezone.utc).isoformat(timespec='seconds')
-    instance = await ListModel.create(
-        id = str(table_id),
-        f_user_uid = user_instance,
-        list_name = data.list_name,
-        description = data.description,
-        created_at = current_timestamp,
-    )
+@app.post("/api/create_list", response_model=CreateListResponse)
+async def create_product(data: UserListCreate, user_instance: UserModel = Depends(get_active_user)):
+    """
+    創建產品的內容
+    """
+    table_id = await id_allocator.next_id(ListModel)
+    try:
+        instance = await ListModel.create(
+            id = table_id,
+            f_user_uid = user_instance,
+            list_name = data.list_name,
+            description = data.description,
+            created_at = datetime.now(timezone.utc),
+        )
+    except IntegrityError as e:
+        raise HTTPException(status_code=400, detail=f"List '{data.list_name}' is already exist") from e
+    await bump_user_lists(user_instance.user_uid)
+    read_router.mark_write(user_instance.user_uid)
+    await publish_list_event(user_instance.user_uid, instance.id, "list_created", list_name=instance.list_name)
+    product_search.list_created(user_instance.user_uid, instance.id, instance.list_name)
 
 
 
-    response = JSONResponse(
+    response = ORJSONResponse(
         status_code=200,
         content={
             "success": True,
@@ -218,83 +431,307 @@ async def create_product(data: UserListCreate, userid: str = Depends(decode_toke
 
     return response
 
-@app.post("/api/get_lists")
-async def showlist(userid: str = Depends(decode_token)):
+@app.post("/api/get_lists", response_model=ListPageResponse)
+async def showlist(
+    data: Optional[UserListPage] = None,
+    user_instance: UserModel = Depends(get_current_user)
+):
     """
     顯示出使用者目前的 清單分配
     """
-
-    user_instance = await UserModel.get_or_none(user_uid = userid)
-    all_list = await ListModel.\
-        filter(f_user_uid = user_instance).values_list("list_name", flat=True)
+    data = data or UserListPage()
+    try:
+        all_list, next_cursor = await fetch_list_names_page(
+            user_instance.user_uid, data.limit, data.cursor,
+            connection_name=read_router.connection_for(user_instance.user_uid)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
 
 
-    response = JSONResponse(
+    response = ORJSONResponse(
         status_code=200,
         content={
             "success": True,
             "message": "login successfully",
-            "list": all_list
+            "list": all_list,
+            "next_cursor": next_cursor
         },
     )
 
     return response
 
-@app.post("/api/delete_list")
-async def deletelist(data: UserListDelete, userid: str = Depends(decode_token)):
+@app.get("/api/lists", response_model=ListPageResponse)
+async def get_lists(
+    request: Request,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, max_length=512),
+    userid: str = Depends(decode_token)
+):
     """
-    刪除出使用者目前的 清單種類
+    顯示出使用者目前的清單；以清單集合的版本號作為 ETag，未變動時回傳 304
     """
-    user_instance = await UserModel.get_or_none(id=userid)
-    # print(data.list_name)
+    connection_name = read_router.connection_for(userid)
+    version = await fetch_lists_version(userid, connection_name=connection_name)
+    if version is None:
+        raise HTTPException(status_code=401, detail="user not found")
+    headers = {"etag": lists_etag(userid, version), "cache-control": LIST_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        all_list, next_cursor = await fetch_list_names_page(
+            userid, limit, cursor, connection_name=connection_name
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "get lists successfully",
+            "list": all_list,
+            "next_cursor": next_cursor
+        },
+        headers=headers,
+    )
+
+    return response
 
-    list_instance = await ListModel.get_or_none(user=user_instance, list_name=data.list_name)
-    if not list_instance:
+@app.post("/api/share_list", response_model=MessageResponse)
+async def share_list(data: UserListShare, userid: str = Depends(decode_active_token)):
+    """
+    把自己的清單分享給另一位使用者（唯讀）
+    """
+    list_id = await ListModel.filter(f_user_uid_id=userid, list_name=data.list_name)\
+        .first().values_list("id", flat=True)
+    if list_id is None:
         raise HTTPException(status_code=404, detail="List not found")
+    viewer = await login_resolver.resolve(data.viewer)
+    if viewer is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if viewer.user_uid == userid:
+        raise HTTPException(status_code=400, detail="Cannot share a list with yourself")
 
-    # 刪除清單
-    await list_instance.delete()
+    try:
+        await ListPermissionModel.create(
+            id = await id_allocator.next_id(ListPermissionModel),
+            f_owner_id_id = userid,
+            f_viewer_id_id = viewer.user_uid,
+            f_list_id_id = list_id,
+            granted_at = datetime.now(timezone.utc),
+        )
+    except IntegrityError:
+        message = "list already shared"
+    else:
+        message = "share list successfully"
+    list_access.invalidate(viewer.user_uid)
+    # 對方接下來的讀取走主資料庫，replica 還沒同步時也看得到新的權限
+    read_router.mark_write(viewer.user_uid)
+    # 對方的 change feed 重新訂閱看得到的清單
+    await change_hub.publish_event((user_topic(viewer.user_uid),), "access_changed")
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": message,
+        },
+    )
 
-    response = JSONResponse(
+    return response
+
+@app.post("/api/revoke_list", response_model=MessageResponse)
+async def revoke_list(data: UserListRevoke, userid: str = Depends(decode_active_token)):
+    """
+    取消分享清單
+    """
+    viewer = await login_resolver.resolve(data.viewer)
+    if viewer is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    deleted = await ListPermissionModel.filter(
+        f_owner_id_id=userid,
+        f_viewer_id_id=viewer.user_uid,
+        f_list_id_id__in=Subquery(
+            ListModel.filter(f_user_uid_id=userid, list_name=data.list_name).values("id")
+        ),
+    ).delete()
+    # 沒有刪除任何權限時不通知對方，避免任意使用者觸發別人的快取失效與重新訂閱
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Permission not found")
+    list_access.invalidate(viewer.user_uid)
+    read_router.mark_write(viewer.user_uid)
+    await change_hub.publish_event((user_topic(viewer.user_uid),), "access_changed")
+
+    response = ORJSONResponse(
         status_code=200,
         content={
             "success": True,
-            "message": "login successfully",
+            "message": "revoke list successfully",
+        },
+    )
+
+    return response
+
+@app.get("/api/visible_lists", response_model=VisibleListResponse)
+async def visible_lists(userid: str = Depends(decode_token)):
+    """
+    使用者看得到的清單：自己的清單與別人分享的清單
+    """
+    lists = await fetch_visible_lists(userid, connection_name=read_router.connection_for(userid))
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "get visible lists successfully",
+            "list": lists
+        },
+    )
+
+    return response
+
+@app.get("/api/changes")
+async def changes(userid: str = Depends(decode_token)):
+    """
+    以 Server-Sent Events 推送自己的清單與被分享的清單的變動
+
+    收到 resync 時前端應重新讀取清單；收到 access_changed 時可見的清單有變，會自動重新訂閱
+    """
+    async def stream():
+        subscription = None
+        try:
+            yield encode_sse(READY)
+            while True:
+                shared = await list_access.shared_with(userid, read_router.connection_for(userid))
+                previous = subscription
+                subscription = change_hub.subscribe([user_topic(userid), *map(list_topic, shared)])
+                if previous is not None:
+                    # 新的訂閱建立之後才關閉舊的，切換期間沒有空窗；
+                    # 舊的訂閱在查詢權限時收到、還沒送出的事件不逐一轉送，改請前端重新讀取
+                    previous.close()
+                    if previous.pending:
+                        yield encode_sse(RESYNC)
+                while True:
+                    event = await subscription.get(timeout=CHANGE_FEED_HEARTBEAT_SECONDS)
+                    if event is None:
+                        yield b": heartbeat\n\n"
+                        continue
+                    yield encode_sse(event)
+                    if event.type == "access_changed":
+                        break
+        finally:
+            if subscription is not None:
+                subscription.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"cache-control": "no-cache", "x-accel-buffering": "no"},
+    )
+
+@app.post("/api/delete_list", response_model=DeletionJobResponse)
+async def deletelist(data: UserListDelete, userid: str = Depends(decode_active_token)):
+    """
+    刪除使用者的清單：清單立即從讀取中消失，產品與分享權限由背景工作分批清除（見 utils.deletionPurger）
+    """
+    list_id = await ListModel.filter(f_user_uid_id=userid, list_name=data.list_name)\
+        .first().values_list("id", flat=True)
+    if list_id is None:
+        raise HTTPException(status_code=404, detail="List not found")
+
+    job_id = await id_allocator.next_id(DeletionJobModel)
+    now = datetime.now(timezone.utc)
+    async with in_transaction("default") as conn:
+        # 名稱設為 NULL，同名的清單可以馬上重新建立；同時刪除時只有一個請求會標記成功
+        marked = await ListModel.filter(id=list_id, deleted_at=None).using_db(conn)\
+            .update(list_name=None, deleted_at=now)
+        if marked:
+            await DeletionJobModel.create(
+                id = job_id,
+                user_uid = userid,
+                kind = "list",
+                target_id = list_id,
+                target_name = data.list_name,
+                created_at = now,
+                updated_at = now,
+                using_db = conn,
+            )
+            await bump_user_lists(userid, using_db=conn)
+    if not marked:
+        raise HTTPException(status_code=404, detail="List not found")
+    read_router.mark_write(userid)
+    await publish_list_event(userid, list_id, "list_deleted", list_name=data.list_name)
+    product_search.list_removed(userid, list_id)
+    deletion_purger.wake()
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "delete list successfully",
+            "job_id": job_id
         },
     )
 
     return response
 
-@app.post("/api/create_product")
-async def addlist(data: ProductFormData, userid: str = Depends(decode_token)):
+@app.get("/api/deletion_jobs/{job_id}", response_model=DeletionJobStatusResponse)
+async def deletion_job(job_id: str = Path(..., max_length=36), token: str = Depends(oauth2_scheme)):
+    """
+    清單 / 帳號刪除工作的進度；帳號刪除後，刪除前取得的 token 在到期前仍可查詢
+    """
+    userid = verify_token(token)["sub"]
+    job = await DeletionJobModel.filter(id=job_id, user_uid=userid).first().values(
+        "id", "kind", "target_name", "status", "total", "purged", "created_at", "finished_at"
+    )
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "get deletion job successfully",
+            "job": job
+        },
+    )
+
+    return response
+
+@app.post("/api/create_product", response_model=CreateProductResponse)
+async def addlist(data: ProductFormData, user_instance: UserModel = Depends(get_active_user)):
     """
     增加出使用者目前的 清單種類
     """
-    user_instance = await UserModel.get_or_none(user_uid=userid)
     list_instance = await ListModel.get_or_none(
         f_user_uid=user_instance, 
         list_name=data.list_name
     )
-    last_product = await ProductModel.all().order_by('-id').first()
-
-    table_id = 1
-    if last_product:
-        table_id = int(last_product.id) + 1
+    table_id = await id_allocator.next_id(ProductModel)
     try:
         instance = await ProductModel.create(
-            id = str(table_id),
+            id = table_id,
             f_user_uid = user_instance,
             f_list_uid = list_instance,
             product_name = data.product_name,
             product_barcode = data.product_barcode,
             expiry_date = data.expiry_date,
             description = data.description,
-            product_image_url = f'http://domainaname/image/product/{str(table_id)}'
+            product_image_url = f'http://domainaname/image/product/{table_id}'
         )
     except Exception as err:
-        print(f"Error creating product instance: {err}")
+        event_log.warning("create_product_failed", error=str(err))
+    else:
+        await bump_lists([list_instance.id])
+        await publish_list_event(
+            user_instance.user_uid, list_instance.id, "products_created", product_ids=[instance.id]
+        )
+        product_search.products_added(user_instance.user_uid, [instance])
+    read_router.mark_write(user_instance.user_uid)
 
-    response = JSONResponse(
+    response = ORJSONResponse(
         status_code=200,
         content={
             "success": True,
@@ -307,50 +744,320 @@ async def addlist(data: ProductFormData, userid: str = Depends(decode_token)):
 
 
 
-@app.post("/api/get_product")
-async def get_product(data: getProductFormData, userid: str = Depends(decode_token)):
+@app.post("/api/import_products")
+async def import_products(
+    request: Request,
+    chunk_size: int = Query(IMPORT_CHUNK_SIZE, ge=1, le=5000),
+    user_instance: UserModel = Depends(get_active_user)
+):
     """
-    顯示出使用者目前的 清單分配
+    批次匯入產品（NDJSON 或 CSV 串流），回傳每一行的結果（NDJSON）
     """
-    user_instance = await UserModel.get_or_none(user_uid = userid)
-    list_instance = await ListModel.get_or_none(
-        f_user_uid=user_instance,
-        list_name=data.list_name
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    fmt = IMPORT_FORMATS.get(content_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Use application/x-ndjson or text/csv")
+
+    # 結果先寫入暫存檔，超過 1MB 才落地，讀完上傳內容後再串流回傳
+    report = tempfile.SpooledTemporaryFile(max_size=1 << 20)
+    importer = ProductImporter(user_instance, chunk_size, report)
+    inserted, failed = await importer.run(request.stream(), fmt)
+    read_router.mark_write(user_instance.user_uid)
+    report.seek(0)
+
+    def iter_report():
+        with report:
+            yield from iter(lambda: report.read(64 * 1024), b"")
+
+    return StreamingResponse(
+        iter_report(),
+        status_code=200,
+        media_type="application/x-ndjson",
+        headers={"X-Import-Inserted": str(inserted), "X-Import-Failed": str(failed)},
     )
-    all_products = await ProductModel\
-        .filter(f_user_uid = user_instance, f_list_uid = list_instance)\
-        .order_by("expiry_date")\
-        .values_list("id", "product_name", "expiry_date", "product_image_url")
 
-    print(all_products)
 
-    response = JSONResponse(
+@app.post("/api/upload_product_image", response_model=UploadImageResponse)
+async def upload_product_image(
+    request: Request,
+    product_id: str = Query(..., max_length=36),
+    user_instance: UserModel = Depends(get_active_user)
+):
+    """
+    上傳產品圖片（request body 即為圖片），相同的圖片只儲存一份，縮圖在背景產生
+    """
+    product = ProductModel.filter(
+        id=product_id, f_user_uid_id=user_instance.user_uid, f_list_uid__deleted_at=None
+    )
+    list_id = await product.first().values_list("f_list_uid_id", flat=True)
+    if list_id is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+
+    try:
+        filename = await image_store.save(request.stream())
+    except UnsupportedImage as e:
+        raise HTTPException(status_code=415, detail="Use a JPEG, PNG, GIF or WebP image") from e
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e)) from e
+
+    image_url = f"/api/images/{filename}"
+    await product.update(product_image_url=image_url)
+    await bump_lists([list_id])
+    read_router.mark_write(user_instance.user_uid)
+    await publish_list_event(user_instance.user_uid, list_id, "products_updated", product_ids=[product_id])
+    product_search.image_changed(user_instance.user_uid, product_id, image_url)
+    image_store.schedule_thumbnail(filename)
+
+    response = ORJSONResponse(
         status_code=200,
         content={
             "success": True,
-            "message": "login successfully",
-            "product": all_products
+            "message": "upload successfully",
+            "image_url": image_url,
+            "thumbnail_url": f"{image_url}/thumbnail",
         },
     )
 
     return response
 
 
-@app.post("/api/delete_product")
-async def delete_product(data: deleteProductFormData, userid: str = Depends(decode_token)):
+# 檔名就是內容的雜湊，內容永遠不變
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@app.get("/api/images/{filename}")
+async def get_image(filename: str, request: Request):
+    """
+    產品圖片原圖（檔名即 sha256，不需要登入）
+    """
+    media_type = image_store.parse(filename)
+    path = image_store.path(filename) if media_type else None
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return conditional_file_response(request, path, f'"{filename}"', media_type, IMAGE_CACHE_CONTROL)
+
+
+@app.get("/api/images/{filename}/thumbnail")
+async def get_image_thumbnail(filename: str, request: Request):
+    """
+    產品圖片縮圖，尚未產生時當場產生；無法產生縮圖時回傳原圖
+    """
+    media_type = image_store.parse(filename)
+    if media_type is None or not os.path.exists(image_store.path(filename)):
+        raise HTTPException(status_code=404, detail="Image not found")
+    thumbnail = await image_store.thumbnail(filename)
+    if thumbnail is None:
+        # 之後可能產生得出縮圖，不讓瀏覽器長期快取原圖
+        return conditional_file_response(request, image_store.path(filename), f'"{filename}"', media_type, "no-cache")
+    etag = f'"{filename}-{image_store.thumbnail_size}"'
+    return conditional_file_response(request, thumbnail, etag, "image/jpeg", IMAGE_CACHE_CONTROL)
+
+
+@app.get("/api/barcodes/{barcode}", response_model=BarcodeResponse)
+async def get_barcode(barcode: str, userid: str = Depends(decode_token)):
+    """
+    依條碼查詢共用目錄中的產品名稱與說明，用於新增產品時自動帶入
+    """
+    entry = await barcode_catalog.lookup(barcode)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Barcode not found")
+    return ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "Barcode found",
+            "product": entry
+        },
+    )
+
+
+@app.get("/api/search", response_model=SearchResponse)
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    userid: str = Depends(decode_token)
+):
+    """
+    在使用者所有清單中以名稱、條碼或描述搜尋產品，依符合程度排序（見 utils.productSearch）
+    """
+    products = await product_search.search(
+        userid, q, limit, connection_name=read_router.connection_for(userid)
+    )
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "search successfully",
+            "product": products
+        },
+    )
+
+    return response
+
+
+@app.post("/api/get_product", response_model=ProductPageResponse)
+async def get_product(data: getProductFormData, user_instance: UserModel = Depends(get_current_user)):
     """
     顯示出使用者目前的 清單分配
     """
-    
-    products_instance = await ProductModel.get_or_none(id=data.id)
+    try:
+        all_products, next_cursor = await fetch_products_page(
+            user_instance.user_uid, data.list_name, data.limit, data.cursor,
+            connection_name=read_router.connection_for(user_instance.user_uid)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "login successfully",
+            "product": all_products,
+            "next_cursor": next_cursor
+        },
+    )
+
+    return response
+
+
+@app.get("/api/lists/{list_name}/products", response_model=ProductPageResponse)
+async def get_list_products(
+    request: Request,
+    list_name: str = Path(..., max_length=100),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, max_length=512),
+    userid: str = Depends(decode_token)
+):
+    """
+    顯示清單中的產品；以清單的版本號作為 ETag，未變動時只查一次版本號就回傳 304
+    """
+    connection_name = read_router.connection_for(userid)
+    version = await fetch_list_version(userid, list_name, connection_name=connection_name)
+    if version is None:
+        raise HTTPException(status_code=404, detail="List not found")
+    headers = {"etag": list_etag(*version), "cache-control": LIST_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        all_products, next_cursor = await fetch_products_page(
+            userid, list_name, limit, cursor, connection_name=connection_name
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "get products successfully",
+            "product": all_products,
+            "next_cursor": next_cursor
+        },
+        headers=headers,
+    )
+
+    return response
+
+
+@app.get("/api/visible_lists/{list_id}/products", response_model=ProductPageResponse)
+async def get_visible_list_products(
+    request: Request,
+    list_id: str = Path(..., max_length=36),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, max_length=512),
+    userid: str = Depends(decode_token)
+):
+    """
+    以清單 id 顯示產品，自己的清單與被分享的清單都可以讀取；查詢次數與讀取自己的清單相同
+    """
+    connection_name = read_router.connection_for(userid)
+    version = await fetch_list_version_by_id(list_id, connection_name=connection_name)
+    # 沒有權限時也回傳 404，不透露清單是否存在
+    if version is None or not await list_access.can_read(userid, version[2], list_id, connection_name):
+        raise HTTPException(status_code=404, detail="List not found")
+    headers = {"etag": list_etag(list_id, version[1]), "cache-control": LIST_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        all_products, next_cursor = await fetch_list_products_page(
+            version[2], list_id, limit, cursor, connection_name=connection_name
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="Invalid cursor") from e
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "get products successfully",
+            "product": all_products,
+            "next_cursor": next_cursor
+        },
+        headers=headers,
+    )
+
+    return response
+
+
+@app.post("/api/stream_product")
+async def stream_product(data: streamProductFormData, user_instance: UserModel = Depends(get_current_user)):
+    """
+    以串流 JSON 陣列回傳清單中的所有產品，邊從資料庫分頁讀取邊編碼
+    """
+    return JSONArrayStreamingResponse(iter_products(
+        user_instance.user_uid, data.list_name,
+        connection_name=read_router.connection_for(user_instance.user_uid)
+    ))
 
-    if not products_instance:
-        raise HTTPException(status_code=404, detail="not found")
 
-    await products_instance.delete()
+@app.post("/api/get_expiring_products", response_model=ExpiringProductResponse)
+async def get_expiring_products(
+    data: expiringProductFormData,
+    user_instance: UserModel = Depends(get_current_user)
+):
+    """
+    顯示出使用者在指定日期區間內到期的產品
+    """
+    products = await expiring_between(
+        user_instance.user_uid, data.start, data.end, data.limit,
+        connection_name=read_router.connection_for(user_instance.user_uid)
+    )
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "get expiring products successfully",
+            "product": products
+        },
+    )
 
+    return response
 
-    response = JSONResponse(
+
+@app.post("/api/delete_product", response_model=DeleteProductResponse)
+async def delete_product(data: deleteProductFormData, userid: str = Depends(decode_active_token)):
+    """
+    刪除使用者的單一產品
+    """
+    query = ProductModel.filter(id=data.id, f_user_uid_id=userid, f_list_uid__deleted_at=None)
+    async with in_transaction("default") as conn:
+        grouped = await product_lists(query, using_db=conn)
+        await bump_lists(grouped, using_db=conn)
+        deleted = await query.using_db(conn).delete()
+    read_router.mark_write(userid)
+    for list_id, product_ids in grouped.items():
+        await publish_list_event(userid, list_id, "products_deleted", product_ids=product_ids)
+        product_search.products_removed(userid, product_ids)
+
+    if not deleted:
+        raise HTTPException(status_code=404, detail="not found")
+
+    response = ORJSONResponse(
         status_code=200,
         content={
             "success": True,
@@ -362,9 +1069,159 @@ async def delete_product(data: deleteProductFormData, userid: str = Depends(deco
     return response
 
 
-register_tortoise(
-    app,
-    config = config.TORTOISE_ORM,
-    generate_schemas = True,  # 自動生成資料表
-    add_exception_handlers = True,
-)
+@app.post("/api/delete_products", response_model=DeletedCountResponse)
+async def delete_products(data: deleteProductsFormData, userid: str = Depends(decode_active_token)):
+    """
+    批次刪除使用者的產品
+    """
+    query = ProductModel.filter(f_user_uid_id=userid, id__in=data.ids, f_list_uid__deleted_at=None)
+    async with in_transaction("default") as conn:
+        grouped = await product_lists(query, using_db=conn)
+        await bump_lists(grouped, using_db=conn)
+        deleted = await query.using_db(conn).delete()
+    read_router.mark_write(userid)
+    for list_id, product_ids in grouped.items():
+        await publish_list_event(userid, list_id, "products_deleted", product_ids=product_ids)
+        product_search.products_removed(userid, product_ids)
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "delete successfully",
+            "deleted": deleted
+        },
+    )
+
+    return response
+
+
+@app.post("/api/delete_expired_products", response_model=DeletedCountResponse)
+async def delete_expired_products(data: deleteExpiredFormData, userid: str = Depends(decode_active_token)):
+    """
+    刪除使用者在指定日期前到期的產品，可限定單一清單
+    """
+    query = ProductModel.filter(f_user_uid_id=userid, expiry_date__lt=data.before, f_list_uid__deleted_at=None)
+    if data.list_name is not None:
+        query = query.filter(f_list_uid_id__in=Subquery(
+            ListModel.filter(f_user_uid_id=userid, list_name=data.list_name).values("id")
+        ))
+    async with in_transaction("default") as conn:
+        grouped = await product_lists(query, using_db=conn)
+        await bump_lists(grouped, using_db=conn)
+        deleted = await query.using_db(conn).delete()
+    read_router.mark_write(userid)
+    for list_id, product_ids in grouped.items():
+        await publish_list_event(userid, list_id, "products_deleted", product_ids=product_ids)
+        product_search.products_removed(userid, product_ids)
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "delete successfully",
+            "deleted": deleted
+        },
+    )
+
+    return response
+
+
+@app.post("/api/move_products", response_model=MovedCountResponse)
+async def move_products(data: moveProductsFormData, userid: str = Depends(decode_active_token)):
+    """
+    把使用者的產品移到另一個清單
+    """
+    target_list_id = await ListModel.filter(f_user_uid_id=userid, list_name=data.list_name)\
+        .first().values_list("id", flat=True)
+    if target_list_id is None:
+        raise HTTPException(status_code=404, detail="List not found")
+
+    # 已刪除（等待清除）的清單是唯讀的，裡面的產品不能再移出
+    query = ProductModel.filter(f_user_uid_id=userid, id__in=data.ids, f_list_uid__deleted_at=None)
+    async with in_transaction("default") as conn:
+        # 來源清單要在移動前找出來，和移動放在同一個 transaction
+        grouped = await product_lists(query, using_db=conn)
+        await bump_lists({*grouped, target_list_id}, using_db=conn)
+        moved = await query.using_db(conn).update(f_list_uid_id=target_list_id)
+    read_router.mark_write(userid)
+    for list_id, product_ids in grouped.items():
+        if list_id == target_list_id:
+            continue
+        await change_hub.publish_event(
+            (user_topic(userid), list_topic(list_id), list_topic(target_list_id)), "products_moved",
+            list_id=list_id, to_list_id=target_list_id, product_ids=product_ids
+        )
+        product_search.products_moved(userid, product_ids, target_list_id)
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "move successfully",
+            "moved": moved
+        },
+    )
+
+    return response
+
+
+@app.post("/api/get_notifications", response_model=NotificationPageResponse)
+async def get_notifications(
+    data: Optional[getNotificationFormData] = None,
+    userid: str = Depends(decode_token)
+):
+    """
+    顯示出使用者的通知，由新到舊分頁
+    """
+    data = data or getNotificationFormData()
+    query = NotificationModel.filter(f_user_uid_id=userid)\
+        .using_db(connections.get(read_router.connection_for(userid)))
+    if data.unread_only:
+        query = query.filter(is_read=False)
+    if data.cursor is not None:
+        try:
+            created_at, notification_id = decode_cursor(data.cursor)
+            created_at = datetime.fromisoformat(created_at)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail="Invalid cursor") from e
+        query = query.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=notification_id)
+        )
+    rows = await query.order_by("-created_at", "-id").limit(data.limit + 1)\
+        .values_list("id", "kind", "content", "is_read", "created_at")
+
+    next_cursor = None
+    if len(rows) > data.limit:
+        rows = rows[:data.limit]
+        next_cursor = encode_cursor((rows[-1][4].isoformat(), rows[-1][0]))
+
+    response = ORJSONResponse(
+        status_code=200,
+        content={
+            "success": True,
+            "message": "get notifications successfully",
+            "notification": rows,
+            "next_cursor": next_cursor
+        },
+    )
+
+    return response
+
+
+@app.get("/api/expiry_scanner/metrics")
+async def expiry_scanner_metrics():
+    """
+    背景到期掃描的統計
+    """
+    return expiry_scanner.metrics()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """
+    Prometheus text format 的服務指標
+    """
+    return PlainTextResponse(
+        metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
@@ -0,0 +1,18 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    # 既有資料中只差大小寫或空白的帳號會讓這裡失敗，需要先手動合併或改名
+    return """
+        DROP INDEX IF EXISTS "idx_users_usernam_d6f483";
+DROP INDEX IF EXISTS "idx_users_email_k_a1e778";
+ALTER TABLE "users" ADD CONSTRAINT "users_username_key_key" UNIQUE ("username_key");
+ALTER TABLE "users" ADD CONSTRAINT "users_email_key_key" UNIQUE ("email_key");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "users" DROP CONSTRAINT IF EXISTS "users_email_key_key";
+ALTER TABLE "users" DROP CONSTRAINT IF EXISTS "users_username_key_key";
+CREATE INDEX IF NOT EXISTS "idx_users_usernam_d6f483" ON "users" ("username_key");
+CREATE INDEX IF NOT EXISTS "idx_users_email_k_a1e778" ON "users" ("email_key");"""
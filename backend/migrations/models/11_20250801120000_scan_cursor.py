@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "scan_watermarks" ADD "cursor_date" DATE;
+ALTER TABLE "scan_watermarks" ADD "cursor_id" VARCHAR(36);"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "scan_watermarks" DROP COLUMN IF EXISTS "cursor_id";
+ALTER TABLE "scan_watermarks" DROP COLUMN IF EXISTS "cursor_date";"""
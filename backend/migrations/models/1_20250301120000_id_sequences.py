@@ -0,0 +1,24 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "id_sequences" (
+    "name" VARCHAR(50) NOT NULL  PRIMARY KEY,
+    "next_value" BIGINT NOT NULL
+);
+COMMENT ON TABLE "id_sequences" IS '主鍵序號分配';
+INSERT INTO "id_sequences" ("name", "next_value")
+    SELECT 'users', COALESCE(MAX(CAST("id" AS BIGINT)), 0) + 1 FROM "users" WHERE "id" ~ '^[0-9]+$'
+    ON CONFLICT ("name") DO NOTHING;
+INSERT INTO "id_sequences" ("name", "next_value")
+    SELECT 'lists', COALESCE(MAX(CAST("id" AS BIGINT)), 0) + 1 FROM "lists" WHERE "id" ~ '^[0-9]+$'
+    ON CONFLICT ("name") DO NOTHING;
+INSERT INTO "id_sequences" ("name", "next_value")
+    SELECT 'products', COALESCE(MAX(CAST("id" AS BIGINT)), 0) + 1 FROM "products" WHERE "id" ~ '^[0-9]+$'
+    ON CONFLICT ("name") DO NOTHING;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "id_sequences";"""
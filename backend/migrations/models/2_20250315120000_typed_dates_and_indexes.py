@@ -0,0 +1,30 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "products" ALTER COLUMN "expiry_date" TYPE DATE USING "expiry_date"::DATE;
+ALTER TABLE "lists" ALTER COLUMN "created_at" TYPE TIMESTAMPTZ USING "created_at"::TIMESTAMPTZ;
+ALTER TABLE "list_permissions" ALTER COLUMN "granted_at" TYPE TIMESTAMPTZ USING "granted_at"::TIMESTAMPTZ;
+UPDATE "lists" SET "list_name" = LEFT("list_name", 63) || '-' || "id"
+    WHERE "id" IN (
+        SELECT "id" FROM (
+            SELECT "id", ROW_NUMBER() OVER (PARTITION BY "f_user_uid_id", "list_name" ORDER BY "id") AS "rn"
+            FROM "lists"
+        ) AS "ranked" WHERE "rn" > 1
+    );
+ALTER TABLE "lists" ADD CONSTRAINT "uid_lists_f_user__0a8f63" UNIQUE ("f_user_uid_id", "list_name");
+CREATE INDEX IF NOT EXISTS "idx_lists_f_user__3a72ca" ON "lists" ("f_user_uid_id", "created_at", "id");
+CREATE INDEX IF NOT EXISTS "idx_products_f_user__dbe1cb" ON "products" ("f_user_uid_id", "f_list_uid_id", "expiry_date", "id");
+CREATE INDEX IF NOT EXISTS "idx_products_f_user__9b142c" ON "products" ("f_user_uid_id", "expiry_date", "id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_products_f_user__9b142c";
+DROP INDEX IF EXISTS "idx_products_f_user__dbe1cb";
+DROP INDEX IF EXISTS "idx_lists_f_user__3a72ca";
+ALTER TABLE "lists" DROP CONSTRAINT IF EXISTS "uid_lists_f_user__0a8f63";
+ALTER TABLE "list_permissions" ALTER COLUMN "granted_at" TYPE VARCHAR(36) USING "granted_at"::VARCHAR;
+ALTER TABLE "lists" ALTER COLUMN "created_at" TYPE VARCHAR(25) USING TO_CHAR("created_at" AT TIME ZONE 'UTC', 'YYYY-MM-DD"T"HH24:MI:SS"+00:00"');
+ALTER TABLE "products" ALTER COLUMN "expiry_date" TYPE VARCHAR(10) USING TO_CHAR("expiry_date", 'YYYY-MM-DD');"""
@@ -0,0 +1,28 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        CREATE TABLE IF NOT EXISTS "notifications" (
+    "id" VARCHAR(36) NOT NULL  PRIMARY KEY,
+    "kind" VARCHAR(30) NOT NULL,
+    "content" JSONB NOT NULL,
+    "is_read" BOOL NOT NULL  DEFAULT False,
+    "created_at" TIMESTAMPTZ NOT NULL,
+    "f_user_uid_id" VARCHAR(36) NOT NULL REFERENCES "users" ("user_uid") ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS "idx_notificatio_f_user__773db8" ON "notifications" ("f_user_uid_id", "created_at", "id");
+COMMENT ON TABLE "notifications" IS '使用者通知（到期提醒摘要）';
+CREATE TABLE IF NOT EXISTS "scan_watermarks" (
+    "name" VARCHAR(50) NOT NULL  PRIMARY KEY,
+    "watermark" DATE NOT NULL
+);
+COMMENT ON TABLE "scan_watermarks" IS '背景掃描的進度';
+CREATE INDEX IF NOT EXISTS "idx_products_expiry__76b1e4" ON "products" ("expiry_date", "id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_products_expiry__76b1e4";
+DROP TABLE IF EXISTS "scan_watermarks";
+DROP TABLE IF EXISTS "notifications";"""
@@ -0,0 +1,20 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "users" ADD "username_key" VARCHAR(30);
+ALTER TABLE "users" ADD "email_key" VARCHAR(320);
+UPDATE "users" SET "username_key" = LOWER(TRIM("username")), "email_key" = LOWER(TRIM("email"));
+ALTER TABLE "users" ALTER COLUMN "username_key" SET NOT NULL;
+ALTER TABLE "users" ALTER COLUMN "email_key" SET NOT NULL;
+CREATE INDEX IF NOT EXISTS "idx_users_usernam_d6f483" ON "users" ("username_key");
+CREATE INDEX IF NOT EXISTS "idx_users_email_k_a1e778" ON "users" ("email_key");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP INDEX IF EXISTS "idx_users_email_k_a1e778";
+DROP INDEX IF EXISTS "idx_users_usernam_d6f483";
+ALTER TABLE "users" DROP COLUMN "email_key";
+ALTER TABLE "users" DROP COLUMN "username_key";"""
@@ -0,0 +1,21 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "products" DROP CONSTRAINT IF EXISTS "products_product_barcode_key";
+CREATE INDEX IF NOT EXISTS "idx_products_f_user__b69e33" ON "products" ("f_user_uid_id", "product_barcode");
+CREATE TABLE IF NOT EXISTS "barcode_catalog" (
+    "barcode" VARCHAR(14) NOT NULL  PRIMARY KEY,
+    "product_name" VARCHAR(100) NOT NULL,
+    "description" VARCHAR(255),
+    "updated_at" TIMESTAMPTZ NOT NULL  DEFAULT CURRENT_TIMESTAMP
+);
+COMMENT ON TABLE "barcode_catalog" IS '條碼目錄：各使用者共用的商品資料，新增產品時用來自動填入';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "barcode_catalog";
+DROP INDEX IF EXISTS "idx_products_f_user__b69e33";
+ALTER TABLE "products" ADD CONSTRAINT "products_product_barcode_key" UNIQUE ("product_barcode");"""
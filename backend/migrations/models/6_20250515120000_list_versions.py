@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "lists" ADD "version" BIGINT NOT NULL  DEFAULT 0;
+ALTER TABLE "users" ADD "lists_version" BIGINT NOT NULL  DEFAULT 0;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "lists" DROP COLUMN "version";
+ALTER TABLE "users" DROP COLUMN "lists_version";"""
@@ -0,0 +1,11 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "list_permissions" ADD CONSTRAINT "uid_list_permis_f_viewe_476626" UNIQUE ("f_viewer_id_id", "f_list_id_id");"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "list_permissions" DROP CONSTRAINT IF EXISTS "uid_list_permis_f_viewe_476626";"""
@@ -0,0 +1,43 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "lists" ALTER COLUMN "list_name" DROP NOT NULL;
+ALTER TABLE "lists" ADD "deleted_at" TIMESTAMPTZ;
+ALTER TABLE "users" ADD "deleted_at" TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS "idx_products_f_list__54a1ba" ON "products" ("f_list_uid_id", "id");
+CREATE INDEX IF NOT EXISTS "idx_list_permis_f_list__0b3040" ON "list_permissions" ("f_list_id_id");
+CREATE INDEX IF NOT EXISTS "idx_list_permis_f_owner_0e43e0" ON "list_permissions" ("f_owner_id_id");
+CREATE INDEX IF NOT EXISTS "idx_profiles_f_user__23d296" ON "profiles" ("f_user_uid_id");
+CREATE TABLE IF NOT EXISTS "deletion_jobs" (
+    "id" VARCHAR(36) NOT NULL  PRIMARY KEY,
+    "user_uid" VARCHAR(36) NOT NULL,
+    "kind" VARCHAR(10) NOT NULL,
+    "target_id" VARCHAR(36) NOT NULL,
+    "target_name" VARCHAR(100),
+    "status" VARCHAR(10) NOT NULL  DEFAULT 'pending',
+    "attempts" INT NOT NULL  DEFAULT 0,
+    "total" BIGINT,
+    "purged" BIGINT NOT NULL  DEFAULT 0,
+    "error" VARCHAR(255),
+    "created_at" TIMESTAMPTZ NOT NULL,
+    "updated_at" TIMESTAMPTZ NOT NULL,
+    "finished_at" TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS "idx_deletion_jo_status_97e214" ON "deletion_jobs" ("status", "created_at");
+CREATE INDEX IF NOT EXISTS "idx_deletion_jo_user_ui_7fe951" ON "deletion_jobs" ("user_uid", "created_at");
+COMMENT ON TABLE "deletion_jobs" IS '清單 / 帳號的背景刪除工作（見 utils.deletionPurger）';"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        DROP TABLE IF EXISTS "deletion_jobs";
+DROP INDEX IF EXISTS "idx_profiles_f_user__23d296";
+DROP INDEX IF EXISTS "idx_list_permis_f_owner_0e43e0";
+DROP INDEX IF EXISTS "idx_list_permis_f_list__0b3040";
+DROP INDEX IF EXISTS "idx_products_f_list__54a1ba";
+ALTER TABLE "users" DROP COLUMN IF EXISTS "deleted_at";
+ALTER TABLE "lists" DROP COLUMN IF EXISTS "deleted_at";
+DELETE FROM "lists" WHERE "list_name" IS NULL;
+ALTER TABLE "lists" ALTER COLUMN "list_name" SET NOT NULL;"""
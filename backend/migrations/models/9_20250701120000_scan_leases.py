@@ -0,0 +1,13 @@
+from tortoise import BaseDBAsyncClient
+
+
+async def upgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "scan_watermarks" ADD "leased_by" VARCHAR(36);
+ALTER TABLE "scan_watermarks" ADD "lease_until" TIMESTAMPTZ;"""
+
+
+async def downgrade(db: BaseDBAsyncClient) -> str:
+    return """
+        ALTER TABLE "scan_watermarks" DROP COLUMN IF EXISTS "lease_until";
+ALTER TABLE "scan_watermarks" DROP COLUMN IF EXISTS "leased_by";"""
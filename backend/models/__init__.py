@@ -2,4 +2,9 @@ from .userModel import UserModel
 from .userModel import UserProfileModel
 from .listModel import ListPermissionModel
 from .listModel import ListModel
-from .listModel import ProductModel
\ No newline at end of file
+from .listModel import ProductModel
+from .sequenceModel import IdSequenceModel
+from .notificationModel import NotificationModel
+from .notificationModel import ScanWatermarkModel
+from .catalogModel import BarcodeCatalogModel
+from .deletionJobModel import DeletionJobModel
@@ -0,0 +1,17 @@
+from tortoise.models import Model
+from tortoise import fields
+
+class BarcodeCatalogModel(Model):
+    """
+    條碼目錄：各使用者共用的商品資料，新增產品時用來自動填入
+    """
+    barcode = fields.CharField(max_length=14, pk=True)
+    product_name = fields.CharField(max_length=100)
+    description = fields.CharField(max_length=255, null=True)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        """
+        定義資料表名稱
+        """
+        table = "barcode_catalog"
@@ -0,0 +1,29 @@
+from tortoise.models import Model
+from tortoise import fields
+
+class DeletionJobModel(Model):
+    """
+    清單 / 帳號的背景刪除工作（見 utils.deletionPurger）
+    """
+    id = fields.CharField(max_length=36, pk=True)
+    # 不設外鍵：帳號刪除完成後仍要查得到工作狀態
+    user_uid = fields.CharField(max_length=36)
+    kind = fields.CharField(max_length=10)  # list / user
+    target_id = fields.CharField(max_length=36)
+    target_name = fields.CharField(max_length=100, null=True)
+    status = fields.CharField(max_length=10, default="pending")  # pending / running / done
+    # 每次被 worker 取得時加一，用來 compare-and-set
+    attempts = fields.IntField(default=0)
+    total = fields.BigIntField(null=True)
+    purged = fields.BigIntField(default=0)
+    error = fields.CharField(max_length=255, null=True)
+    created_at = fields.DatetimeField()
+    updated_at = fields.DatetimeField()
+    finished_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        """
+        定義資料表名稱
+        """
+        table = "deletion_jobs"
+        indexes = (("status", "created_at"), ("user_uid", "created_at"))
@@ -11,9 +11,14 @@ class ListModel(Model):
         related_name="lists",
         on_delete=fields.CASCADE
     )
-    list_name = fields.CharField(max_length=100)
+    # 刪除中的清單名稱設為 NULL，同名的清單可以馬上重新建立
+    list_name = fields.CharField(max_length=100, null=True)
     description = fields.CharField(max_length=255, null=True)
-    created_at = fields.CharField(max_length=25)
+    created_at = fields.DatetimeField()
+    # 清單內產品的版本號，產品新增 / 刪除 / 移動 / 修改後加一（見 utils.listVersions）
+    version = fields.BigIntField(default=0)
+    # 刪除時先標記，產品等資料由背景工作分批清除（見 utils.deletionPurger）
+    deleted_at = fields.DatetimeField(null=True)
 
     products: fields.ReverseRelation["ProductModel"]
     permissions: fields.ReverseRelation["ListPermissionModel"]
@@ -23,6 +28,8 @@ class ListModel(Model):
         定義資料表名稱
         """
         table = "lists"
+        unique_together = (("f_user_uid", "list_name"),)
+        indexes = (("f_user_uid", "created_at", "id"),)
 
 class ProductModel(Model):
     """
@@ -40,9 +47,9 @@ class ProductModel(Model):
         on_delete=fields.CASCADE
     )
     product_name = fields.CharField(max_length=100)
-    product_barcode = fields.CharField(max_length=13, unique=True)
+    product_barcode = fields.CharField(max_length=13)
     product_image_url = fields.CharField(max_length=255)
-    expiry_date = fields.CharField(max_length=10)
+    expiry_date = fields.DateField()
     description = fields.CharField(max_length=255, null=True)
 
     class Meta:
@@ -50,6 +57,14 @@ class ProductModel(Model):
         定義資料表名稱
         """
         table = "products"
+        indexes = (
+            ("f_user_uid", "f_list_uid", "expiry_date", "id"),
+            ("f_user_uid", "expiry_date", "id"),
+            ("expiry_date", "id"),
+            ("f_user_uid", "product_barcode"),
+            # 刪除清單時分批清除產品，也讓 lists 的 ON DELETE CASCADE 不必掃描整張表
+            ("f_list_uid", "id"),
+        )
 
 
 
@@ -73,10 +88,14 @@ class ListPermissionModel(Model):
         related_name="permissions",
         on_delete=fields.CASCADE
     )
-    granted_at = fields.CharField(max_length=36)
+    granted_at = fields.DatetimeField()
 
     class Meta:
         """
         定義資料表名稱
         """
         table = "list_permissions"
+        # 同一個清單對同一個使用者只分享一次；也是查詢「分享給我的清單」的索引
+        unique_together = (("f_viewer_id", "f_list_id"),)
+        # 刪除清單 / 帳號時依清單與擁有者清除
+        indexes = (("f_list_id",), ("f_owner_id",))
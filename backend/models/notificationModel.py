@@ -0,0 +1,45 @@
+from tortoise.models import Model
+from tortoise import fields
+
+class NotificationModel(Model):
+    """
+    使用者通知（到期提醒摘要）
+    """
+    id = fields.CharField(max_length=36, pk=True)
+    f_user_uid = fields.ForeignKeyField(
+        "models.UserModel",
+        related_name="notifications",
+        on_delete=fields.CASCADE
+    )
+    kind = fields.CharField(max_length=30)
+    content = fields.JSONField()
+    is_read = fields.BooleanField(default=False)
+    created_at = fields.DatetimeField()
+
+    class Meta:
+        """
+        定義資料表名稱
+        """
+        table = "notifications"
+        indexes = (("f_user_uid", "created_at", "id"),)
+
+
+
+class ScanWatermarkModel(Model):
+    """
+    背景掃描的進度
+    """
+    name = fields.CharField(max_length=50, pk=True)
+    watermark = fields.DateField()
+    # 正在掃描的 worker 與租約到期時間；watermark 只在結果寫入後才推進
+    leased_by = fields.CharField(max_length=36, null=True)
+    lease_until = fields.DatetimeField(null=True)
+    # 租約內已提交的進度（產品的 (expiry_date, id) keyset），watermark 推進時清除
+    cursor_date = fields.DateField(null=True)
+    cursor_id = fields.CharField(max_length=36, null=True)
+
+    class Meta:
+        """
+        定義資料表名稱
+        """
+        table = "scan_watermarks"
@@ -0,0 +1,15 @@
+from tortoise.models import Model
+from tortoise import fields
+
+class IdSequenceModel(Model):
+    """
+    主鍵序號分配
+    """
+    name = fields.CharField(max_length=50, pk=True)
+    next_value = fields.BigIntField()
+
+    class Meta:
+        """
+        定義資料表名稱
+        """
+        table = "id_sequences"
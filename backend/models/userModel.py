@@ -9,10 +9,17 @@ class UserModel(Model):
     user_uid = fields.CharField(max_length=36, pk=True)
     username = fields.CharField(max_length=30, unique=True)
     email = fields.CharField(max_length=320, unique=True)
+    # 登入查詢用的正規化（去除空白、轉小寫）欄位；唯一，只差大小寫或空白的帳號無法重複註冊
+    username_key = fields.CharField(max_length=30, unique=True)
+    email_key = fields.CharField(max_length=320, unique=True)
     password = fields.CharField(max_length=255)
     name = fields.CharField(max_length=50, default="user")
     created_at = fields.CharField(max_length=25)
     updated_at = fields.CharField(max_length=36)
+    # 清單集合的版本號，新增 / 刪除清單後加一（見 utils.listVersions）
+    lists_version = fields.BigIntField(default=0)
+    # 刪除帳號時先標記，之後由背景工作分批清除所有資料（見 utils.deletionPurger）
+    deleted_at = fields.DatetimeField(null=True)
 
 
     profiles: fields.ReverseRelation["UserProfileModel"]
@@ -46,3 +53,5 @@ class UserProfileModel(Model):
         定義資料表名稱
         """
         table = "profiles"
+        # 刪除帳號時依使用者清除
+        indexes = (("f_user_uid",),)
@@ -33,6 +33,17 @@ class UserListCreate(UserListBase):
 class UserListDelete(UserListBase):
     pass
 
+class UserListPage(BaseModel):
+    limit: int = Field(100, ge=1, le=500)
+    cursor: Optional[str] = Field(None, max_length=512)
+
+class UserListShare(BaseModel):
+    list_name: str = Field(..., max_length=100)
+    viewer: str = Field(..., max_length=320)  # 對方的 username 或 email
+
+class UserListRevoke(UserListShare):
+    pass
+
 class UserListOut(UserListBase):
     id: int
     user_id: int
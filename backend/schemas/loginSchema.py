@@ -7,3 +7,10 @@ class UserLoginFormData(BaseModel):
     """
     username_or_email: str
     password : str
+
+
+class UserDeleteFormData(BaseModel):
+    """
+    刪除帳號前再次確認密碼
+    """
+    password: str
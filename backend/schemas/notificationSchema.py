@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+
+class getNotificationFormData(BaseModel):
+    """
+    用戶獲取通知
+    """
+    unread_only: bool = False
+    limit: int = Field(50, ge=1, le=200)
+    cursor: Optional[str] = Field(None, max_length=512)
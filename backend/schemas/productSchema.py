@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
+from datetime import date
 
 # 用戶註冊表單數據
 class ProductFormData(BaseModel):
@@ -9,7 +10,7 @@ class ProductFormData(BaseModel):
     list_name: str = Field(..., max_length=100)
     product_name: str = Field(..., max_length=100)
     product_barcode: str = Field(..., max_length=13)
-    expiry_date: str = Field(..., max_length=10)
+    expiry_date: date
     description: Optional[str] = Field(None, max_length=255)
 
 class getProductFormData(BaseModel):
@@ -17,9 +18,45 @@ class getProductFormData(BaseModel):
     用戶獲取產品
     """
     list_name: str = Field(..., max_length=100)
+    limit: int = Field(100, ge=1, le=500)
+    cursor: Optional[str] = Field(None, max_length=512)
+
+class streamProductFormData(BaseModel):
+    """
+    用戶以串流獲取清單中的所有產品
+    """
+    list_name: str = Field(..., max_length=100)
 
 class deleteProductFormData(BaseModel):
     """
     用戶刪除產品
     """
     id: str = Field(..., max_length=100)
+
+class expiringProductFormData(BaseModel):
+    """
+    用戶查詢即將到期的產品
+    """
+    start: date
+    end: date
+    limit: int = Field(100, ge=1, le=500)
+
+class deleteProductsFormData(BaseModel):
+    """
+    用戶批次刪除產品
+    """
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+
+class deleteExpiredFormData(BaseModel):
+    """
+    用戶刪除某日期前到期的產品
+    """
+    before: date
+    list_name: Optional[str] = Field(None, max_length=100)
+
+class moveProductsFormData(BaseModel):
+    """
+    用戶把產品移到另一個清單
+    """
+    ids: List[str] = Field(..., min_length=1, max_length=1000)
+    list_name: str = Field(..., max_length=100)
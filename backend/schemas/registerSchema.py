@@ -6,7 +6,7 @@ class UserRegisterFormData(BaseModel):
     """
     用戶註冊表單
     """
-    username: str = Field(..., max_length=30)
+    username: str = Field(..., max_length=30, pattern=r"^[^@]+$")  # 含 @ 會被當成 email 登入
     email: str = Field(..., max_length=320)
     password: str = Field(..., max_length=255)
     name: Optional[str] = Field(default="user", max_length=50)
@@ -0,0 +1,73 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import date, datetime
+
+# 回應格式，只用於 OpenAPI 文件；handler 直接回傳 Response，FastAPI 不會再驗證一次
+class MessageResponse(BaseModel):
+    """
+    基本回應
+    """
+    success: bool
+    message: str
+
+class RegisterResponse(MessageResponse):
+    data: Dict[str, str]
+
+class LoginResponse(MessageResponse):
+    access_token: str
+
+class CreateListResponse(MessageResponse):
+    id: str
+
+class ListPageResponse(MessageResponse):
+    list: List[str]
+    next_cursor: Optional[str] = None
+
+class VisibleListResponse(MessageResponse):
+    # (id, list_name, owner username, owned)
+    list: List[Tuple[str, str, str, bool]]
+
+class CreateProductResponse(MessageResponse):
+    list: int
+
+class ProductPageResponse(MessageResponse):
+    # (id, product_name, expiry_date, product_image_url)
+    product: List[Tuple[str, str, date, str]]
+    next_cursor: Optional[str] = None
+
+class ExpiringProductResponse(MessageResponse):
+    # (id, product_name, expiry_date, product_image_url, list_name)
+    product: List[Tuple[str, str, date, str, str]]
+
+class SearchResponse(MessageResponse):
+    # (id, product_name, expiry_date, product_image_url, list_name)，依符合程度排序
+    product: List[Tuple[str, str, date, str, str]]
+
+class UploadImageResponse(MessageResponse):
+    image_url: str
+    thumbnail_url: str
+
+class BarcodeResponse(MessageResponse):
+    product: Dict[str, Optional[str]]
+
+class DeleteProductResponse(MessageResponse):
+    product: str
+
+class DeletedCountResponse(MessageResponse):
+    deleted: int
+
+class MovedCountResponse(MessageResponse):
+    moved: int
+
+class NotificationPageResponse(MessageResponse):
+    # (id, kind, content, is_read, created_at)
+    notification: List[Tuple[str, str, Dict[str, Any], bool, datetime]]
+    next_cursor: Optional[str] = None
+
+class DeletionJobResponse(MessageResponse):
+    # 背景刪除工作的 id，以 GET /api/deletion_jobs/{job_id} 查詢進度
+    job_id: str
+
+class DeletionJobStatusResponse(MessageResponse):
+    # id, kind (list / user), target_name, status (pending / running / done), total, purged, created_at, finished_at
+    job: Dict[str, Any]
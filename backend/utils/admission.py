@@ -0,0 +1,309 @@
+"""
+Admission control 與 load shedding
+
+請求在進入 handler（以及資料庫連線池）之前先取得名額：
+- 每個路由樣板有自己的並行上限，額滿時進入有上限的等待佇列
+- 在佇列中等待超過 queue_timeout 秒、或佇列已滿時立即回傳 503 與 Retry-After，
+  不讓所有請求都堆在連線池上一起變慢
+- login_user / create_user 另有每個 IP 與每個帳號的 token bucket，超過時回傳 429
+
+以純 ASGI middleware 實作；IP 取自 ASGI scope 的 client（在 proxy 後面時以 uvicorn --proxy-headers 設定）。
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+
+import orjson
+from starlette.routing import Match
+
+from utils.loginResolver import normalize as normalize_login
+from utils.metrics import Gauge, registry
+from utils.responses import ORJSONResponse
+from utils.ttlCache import TTLCache
+
+
+QUEUE_WAIT = registry.histogram(
+    "admission_queue_wait_seconds", "Time admitted requests spent waiting for a slot", ("route",)
+)
+SHED_TOTAL = registry.counter(
+    "admission_shed_total", "Requests rejected by admission control by route and reason", ("route", "reason")
+)
+
+# 需要 token bucket 的路由：路由樣板 -> request body 中代表帳號的欄位
+AUTH_ROUTES = {
+    "/api/login_user": "username_or_email",
+    "/api/create_user": "username",
+}
+# 只讀取這個大小以內的 body 來找帳號欄位
+MAX_PEEK_BYTES = 64 * 1024
+
+
+class ConcurrencyLimiter:
+    """
+    最多 limit 個請求同時執行，其餘最多 queue_size 個依序等待
+    """
+
+    def __init__(self, limit: int, queue_size: int, queue_timeout: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        """
+        取得名額後回傳 None；被拒絕時回傳原因（"queue_full" / "queue_timeout"）
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            # 逾時與交接名額可能發生在同一輪事件迴圈，已經拿到名額就照常執行
+            if waiter.done() and not waiter.cancelled():
+                return None
+            return "queue_timeout"
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return None
+
+    def release(self):
+        """
+        名額直接交給最早等待的請求，沒有人等待時才歸還
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class TokenBucketLimiter:
+    """
+    每個 key 一個 token bucket：每分鐘補充 rate_per_minute 個，最多累積 burst 個
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, maxsize: int, clock=time.monotonic):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.clock = clock
+        # 閒置到 bucket 補滿後就不需要保留；超過 maxsize 時淘汰最久未使用的 key
+        self._buckets = TTLCache(maxsize, ttl=burst / self.rate, clock=clock)
+
+    def acquire(self, key) -> float:
+        """
+        取得一個 token 時回傳 0，否則回傳需要等待的秒數
+        """
+        now = self.clock()
+        tokens, updated = self._buckets.get(key) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self._buckets.set(key, (tokens - 1, now))
+            return 0.0
+        self._buckets.set(key, (tokens, now))
+        return (1 - tokens) / self.rate
+
+
+def _match_route(routes, scope):
+    """
+    與 Router 相同的選擇方式：第一個完全符合的路由，否則第一個只有 method 不符的路由
+    """
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route
+        if match == Match.PARTIAL and partial is None:
+            partial = route
+    return partial
+
+
+async def _read_body(receive, limit: int):
+    """
+    讀取 request body，回傳 (body, 已讀取的 ASGI 訊息)；超過 limit 時 body 為 None
+    """
+    messages = []
+    size = 0
+    chunks = []
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            return None, messages
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            return None, messages
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            return b"".join(chunks), messages
+
+
+def _replay(messages: list, receive):
+    pending = deque(messages)
+
+    async def replay():
+        if pending:
+            return pending.popleft()
+        return await receive()
+
+    return replay
+
+
+class AdmissionMiddleware:
+    """
+    router 用來在執行前找出路由樣板；exclude 中的路徑（例如長時間連線的 change feed）不受限制。
+    route_limits 可針對個別路由樣板設定並行上限，其餘使用 default_limit。
+    ip_limiter / user_limiter 為 None 時不限制登入與註冊的頻率。
+    """
+
+    def __init__(self, app, router, default_limit: int = 16, route_limits: dict = None,
+                 queue_size: int = 32, queue_timeout: float = 1.0, retry_after: int = 1,
+                 ip_limiter: TokenBucketLimiter = None, user_limiter: TokenBucketLimiter = None,
+                 exclude: tuple = ("/metrics",)):
+        self.app = app
+        self.router = router
+        self.default_limit = default_limit
+        self.route_limits = route_limits or {}
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.ip_limiter = ip_limiter
+        self.user_limiter = user_limiter
+        self.exclude = frozenset(exclude)
+        self._limiters = {}
+        registry.add_collector(self.collect)
+
+    def limiter(self, path: str) -> ConcurrencyLimiter:
+        limiter = self._limiters.get(path)
+        if limiter is None:
+            limiter = ConcurrencyLimiter(
+                self.route_limits.get(path, self.default_limit), self.queue_size, self.queue_timeout
+            )
+            self._limiters[path] = limiter
+        return limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        route = _match_route(self.router.routes, scope)
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        path = route.path
+        # 被拒絕的請求也以路由樣板計入 http_requests_total
+        scope["route"] = route
+
+        if path in AUTH_ROUTES:
+            retry_after, receive = await self._check_rate(scope, receive, path)
+            if retry_after:
+                SHED_TOTAL.inc((path, "rate_limited"))
+                await self._reject(scope, receive, send, 429, "Too many requests", retry_after)
+                return
+
+        limiter = self.limiter(path)
+        waited_from = time.perf_counter()
+        reason = await limiter.acquire()
+        if reason is not None:
+            SHED_TOTAL.inc((path, reason))
+            await self._reject(scope, receive, send, 503, "Server is busy", self.retry_after)
+            return
+        QUEUE_WAIT.observe(time.perf_counter() - waited_from, (path,))
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    def collect(self) -> list:
+        """
+        輸出時才讀取各路由目前的執行中與等待中請求數（/metrics 的 collector）
+        """
+        in_flight = Gauge("admission_in_flight", "Requests holding an admission slot by route", ("route",))
+        queue_depth = Gauge(
+            "admission_queue_depth", "Requests waiting for an admission slot by route", ("route",)
+        )
+        for path, limiter in self._limiters.items():
+            in_flight.set(limiter.active, (path,))
+            queue_depth.set(limiter.waiting, (path,))
+        return [in_flight, queue_depth]
+
+    async def _check_rate(self, scope, receive, path: str):
+        """
+        回傳 (需要等待的秒數, receive)；讀過 body 時 receive 會換成重播已讀訊息的版本
+        """
+        if self.ip_limiter is not None and scope.get("client"):
+            retry_after = self.ip_limiter.acquire((path, scope["client"][0]))
+            if retry_after:
+                return retry_after, receive
+        if self.user_limiter is None:
+            return 0.0, receive
+        body, messages = await _read_body(receive, MAX_PEEK_BYTES)
+        receive = _replay(messages, receive)
+        try:
+            account = orjson.loads(body).get(AUTH_ROUTES[path]) if body else None
+        except (orjson.JSONDecodeError, AttributeError):
+            account = None
+        if not isinstance(account, str):
+            return 0.0, receive
+        return self.user_limiter.acquire((path, normalize_login(account))), receive
+
+    @staticmethod
+    async def _reject(scope, receive, send, status_code: int, detail: str, retry_after: float):
+        response = ORJSONResponse(
+            status_code=status_code,
+            content={"detail": detail},
+            headers={"retry-after": str(max(math.ceil(retry_after), 1))},
+        )
+        await response(scope, receive, send)
+
+
+def parse_route_limits(text: str) -> dict:
+    """
+    "/api/login_user=4,/api/import_products=2" -> {路由樣板: 上限}
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        path, limit = item.rsplit("=", 1)
+        limits[path.strip()] = int(limit)
+    return limits
+
+
+def settings_from_env() -> dict:
+    """
+    由環境變數產生 AdmissionMiddleware 的參數；頻率設為 0 時不限制
+    """
+    cache_size = int(os.getenv('AUTH_RATE_CACHE_SIZE', '100000'))
+    ip_rate = float(os.getenv('AUTH_RATE_IP_PER_MINUTE', '30'))
+    user_rate = float(os.getenv('AUTH_RATE_USER_PER_MINUTE', '10'))
+    return {
+        "default_limit": int(os.getenv('ADMISSION_ROUTE_CONCURRENCY', '16')),
+        "route_limits": parse_route_limits(os.getenv('ADMISSION_ROUTE_LIMITS', '')),
+        "queue_size": int(os.getenv('ADMISSION_QUEUE_SIZE', '32')),
+        "queue_timeout": float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', '1')),
+        "retry_after": int(os.getenv('ADMISSION_RETRY_AFTER_SECONDS', '1')),
+        "ip_limiter": TokenBucketLimiter(
+            ip_rate, int(os.getenv('AUTH_RATE_IP_BURST', '10')), cache_size
+        ) if ip_rate > 0 else None,
+        "user_limiter": TokenBucketLimiter(
+            user_rate, int(os.getenv('AUTH_RATE_USER_BURST', '5')), cache_size
+        ) if user_rate > 0 else None,
+    }
@@ -0,0 +1,179 @@
+"""
+條碼目錄查詢與匯入
+
+查詢順序：Bloom filter → LRU 快取 → 資料庫。Bloom filter 說「不存在」的條碼直接回傳，
+不會查詢資料庫；filter 在啟動後於背景建立，之後每 refresh_interval 秒重建一次，
+建立完成前的查詢都會往下走到快取與資料庫。
+
+從 CSV（欄位 barcode,product_name,description）匯入：
+
+    python -m utils.barcodeCatalog catalog.csv
+"""
+import asyncio
+import csv
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+from models.catalogModel import BarcodeCatalogModel
+from utils.bloomFilter import BloomFilter
+from utils.eventLog import event_log
+from utils.metrics import registry
+from utils.ttlCache import TTLCache
+
+
+LOOKUPS_TOTAL = registry.counter(
+    "barcode_lookups_total", "Barcode lookups by where they were answered", ("source",)
+)
+
+_MISSING = object()
+
+
+def normalize_barcode(barcode: str) -> str:
+    return barcode.strip()
+
+
+class BarcodeCatalog:
+    """
+    條碼目錄的查詢服務
+    """
+
+    def __init__(self, cache_size: int, error_rate: float, refresh_interval: float, page_size: int = 10000):
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        # 目錄可能由其他 process 匯入，快取的結果最多保留一個重建週期
+        self._cache = TTLCache(cache_size, ttl=refresh_interval)
+        self._bloom = None
+        self._built_at = None
+        self._task = None
+
+    async def rebuild(self):
+        """
+        依目前的目錄內容重建 Bloom filter（分頁讀取，建好後才替換）
+        """
+        count = await BarcodeCatalogModel.all().count()
+        bloom = BloomFilter(max(int(count * 1.2), 1000), self.error_rate)
+        last = ""
+        while True:
+            barcodes = await BarcodeCatalogModel.filter(barcode__gt=last)\
+                .order_by("barcode").limit(self.page_size).values_list("barcode", flat=True)
+            for barcode in barcodes:
+                bloom.add(barcode)
+            if len(barcodes) < self.page_size:
+                break
+            last = barcodes[-1]
+        self._bloom = bloom
+        self._built_at = time.monotonic()
+
+    async def _rebuild_safely(self):
+        try:
+            await self.rebuild()
+        except Exception as e:
+            event_log.warning("barcode_bloom_rebuild_failed", error=repr(e))
+
+    def start(self):
+        """
+        在背景建立 Bloom filter
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._rebuild_safely())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def lookup(self, barcode: str):
+        """
+        回傳 {"barcode", "product_name", "description"}，目錄中沒有時回傳 None
+        """
+        barcode = normalize_barcode(barcode)
+        if self._built_at is not None and time.monotonic() - self._built_at > self.refresh_interval:
+            self.start()
+        if self._bloom is not None and barcode not in self._bloom:
+            LOOKUPS_TOTAL.inc(("bloom",))
+            return None
+        cached = self._cache.get(barcode, _MISSING)
+        if cached is not _MISSING:
+            LOOKUPS_TOTAL.inc(("cache",))
+            return cached
+        LOOKUPS_TOTAL.inc(("database",))
+        rows = await BarcodeCatalogModel.filter(barcode=barcode).limit(1)\
+            .values("barcode", "product_name", "description")
+        entry = rows[0] if rows else None
+        # Bloom filter 誤判的條碼也快取起來，下次不再查資料庫
+        self._cache.set(barcode, entry)
+        return entry
+
+    def added(self, barcodes):
+        """
+        同一個 process 內匯入資料後更新 filter 與快取
+        """
+        for barcode in barcodes:
+            if self._bloom is not None:
+                self._bloom.add(barcode)
+            self._cache.pop(barcode)
+
+
+async def load_csv(path: str, chunk_size: int = 5000, catalog: BarcodeCatalog = None):
+    """
+    匯入 CSV，已存在的條碼會被更新；回傳 (匯入筆數, 略過筆數)
+    """
+    loaded = skipped = 0
+    # 同一批中重複的條碼以最後一筆為準（同一條 upsert 不能更新同一列兩次）
+    batch = {}
+
+    async def flush():
+        await BarcodeCatalogModel.bulk_create(
+            batch.values(), on_conflict=["barcode"], update_fields=["product_name", "description", "updated_at"]
+        )
+        if catalog is not None:
+            catalog.added(batch)
+
+    with open(path, newline="", encoding="utf-8") as file:
+        now = datetime.now(timezone.utc)
+        for row in csv.DictReader(file):
+            barcode = normalize_barcode(row.get("barcode") or "")
+            name = (row.get("product_name") or "").strip()
+            description = (row.get("description") or "").strip() or None
+            if not barcode or len(barcode) > 14 or not name or len(name) > 100 \
+                    or (description and len(description) > 255):
+                skipped += 1
+                continue
+            batch[barcode] = BarcodeCatalogModel(
+                barcode=barcode, product_name=name, description=description, updated_at=now
+            )
+            if len(batch) >= chunk_size:
+                await flush()
+                loaded += len(batch)
+                batch = {}
+    if batch:
+        await flush()
+        loaded += len(batch)
+    return loaded, skipped
+
+
+barcode_catalog = BarcodeCatalog(
+    cache_size=int(os.getenv('BARCODE_CACHE_SIZE', '100000')),
+    error_rate=float(os.getenv('BARCODE_BLOOM_ERROR_RATE', '0.01')),
+    refresh_interval=float(os.getenv('BARCODE_BLOOM_REFRESH_SECONDS', '600')),
+)
+
+
+if __name__ == "__main__":
+    from tortoise import Tortoise, run_async
+
+    import config
+
+    async def main(path):
+        await Tortoise.init(config=config.TORTOISE_ORM)
+        loaded, skipped = await load_csv(path)
+        print(f"loaded {loaded} barcodes, skipped {skipped} invalid rows")
+
+    run_async(main(sys.argv[1]))
@@ -0,0 +1,204 @@
+"""
+清單變動通知（pub/sub）
+
+mutation handler 在資料寫入後發布事件，/api/changes 以 Server-Sent Events 推送給訂閱者。
+
+- topic：每個使用者一個（"user:<uid>"，自己的清單與帳號層級的事件），
+  被分享的清單另有 "list:<id>"，閱覽者訂閱自己看得到的清單
+- 事件內容在發布時只編碼一次，所有訂閱者共用同一份 bytes
+- 每個訂閱者的佇列有上限，publisher 不會被慢的訂閱者拖住：佇列滿時丟掉所有待送事件，
+  下一次讀取得到 RESYNC，前端收到後重新讀取清單即可
+
+InProcessHub 只在同一個 process 內傳遞事件，多個 worker 時需要換成外部 broker
+（實作 ChangeHub 的 subscribe / publish，收到訊息後呼叫 Subscription.put）。
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import NamedTuple
+
+import orjson
+
+from utils.metrics import registry
+
+
+SUBSCRIBERS = registry.gauge("change_feed_subscribers", "Open change-feed subscriptions")
+PUBLISHED_TOTAL = registry.counter(
+    "change_feed_events_published_total", "Change-feed events published by type", ("type",)
+)
+RESYNCS_TOTAL = registry.counter(
+    "change_feed_resyncs_total", "Subscriber queues that overflowed and were told to resync"
+)
+
+
+class Event(NamedTuple):
+    type: str
+    data: bytes  # JSON
+
+
+RESYNC = Event("resync", b"{}")
+READY = Event("ready", b"{}")
+
+
+def user_topic(user_uid: str) -> str:
+    return f"user:{user_uid}"
+
+
+def list_topic(list_id: str) -> str:
+    return f"list:{list_id}"
+
+
+class Subscription:
+    """
+    一個訂閱者：有上限的事件佇列
+    """
+
+    def __init__(self, hub, topics, maxsize: int):
+        self.topics = tuple(topics)
+        self.maxsize = maxsize
+        self.closed = False
+        self._hub = hub
+        self._events = deque()
+        self._overflowed = False
+        self._ready = asyncio.Event()
+
+    @property
+    def overflowed(self) -> bool:
+        return self._overflowed
+
+    @property
+    def pending(self) -> bool:
+        """
+        是否還有尚未讀取的事件（或曾經溢出）
+        """
+        return bool(self._events) or self._overflowed
+
+    def put(self, event: Event):
+        """
+        由 hub 呼叫，不會等待；佇列已滿時清空並標記需要 resync
+        """
+        if self.closed:
+            return
+        if self._overflowed:
+            return
+        if len(self._events) >= self.maxsize:
+            self._events.clear()
+            self._overflowed = True
+            RESYNCS_TOTAL.inc()
+        else:
+            self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: float = None):
+        """
+        下一個事件；佇列曾經溢出時回傳 RESYNC，等待超過 timeout 或訂閱已關閉時回傳 None
+        """
+        while not self._events and not self._overflowed:
+            if self.closed:
+                return None
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if self._overflowed:
+            # 溢出之後的事件都不再保留，重新讀取的結果已經包含它們
+            self._overflowed = False
+            return RESYNC
+        return self._events.popleft()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._hub.unsubscribe(self)
+            self._ready.set()
+
+
+class ChangeHub(ABC):
+    """
+    pub/sub 介面
+    """
+
+    @abstractmethod
+    def subscribe(self, topics) -> Subscription:
+        """
+        訂閱多個 topic
+        """
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription):
+        """
+        由 Subscription.close 呼叫
+        """
+
+    @abstractmethod
+    async def publish(self, topic: str, event: Event):
+        """
+        把已編碼的事件送給 topic 的所有訂閱者
+        """
+
+    async def publish_event(self, topics, event_type: str, **payload):
+        """
+        把事件編碼一次後發布到多個 topic
+        """
+        event = Event(event_type, orjson.dumps(payload))
+        PUBLISHED_TOTAL.inc((event_type,))
+        for topic in topics:
+            await self.publish(topic, event)
+
+
+class InProcessHub(ChangeHub):
+    """
+    同一個 process 內的 pub/sub：topic -> 訂閱者集合
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+
+    def subscribe(self, topics) -> Subscription:
+        subscription = Subscription(self, topics, self.queue_size)
+        for topic in subscription.topics:
+            self._subscribers.setdefault(topic, set()).add(subscription)
+        SUBSCRIBERS.inc()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+        SUBSCRIBERS.dec()
+
+    async def publish(self, topic: str, event: Event):
+        for subscription in self._subscribers.get(topic, ()):
+            subscription.put(event)
+
+
+def create_hub() -> ChangeHub:
+    """
+    依環境變數 CHANGE_FEED_BACKEND（目前只有 memory）建立 hub
+    """
+    kind = os.getenv('CHANGE_FEED_BACKEND', 'memory')
+    if kind == 'memory':
+        return InProcessHub(queue_size=int(os.getenv('CHANGE_FEED_QUEUE_SIZE', '100')))
+    raise ValueError(f"Unknown CHANGE_FEED_BACKEND '{kind}'")
+
+
+change_hub = create_hub()
+
+
+async def publish_list_event(owner_uid: str, list_id: str, event_type: str, **payload):
+    """
+    清單相關的事件：送給擁有者，以及正在看這個清單的閱覽者
+    """
+    await change_hub.publish_event(
+        (user_topic(owner_uid), list_topic(list_id)), event_type, list_id=list_id, **payload
+    )
+
+
+def encode_sse(event: Event) -> bytes:
+    return b"event: " + event.type.encode() + b"\ndata: " + event.data + b"\n\n"
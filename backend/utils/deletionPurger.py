@@ -0,0 +1,207 @@
+"""
+背景清除已刪除的清單與帳號
+
+刪除清單 / 帳號的 API 只標記 deleted_at 並建立一筆 deletion_jobs，讀取路徑立即看不到資料；
+實際的資料列由這個 worker 分批刪除：每批最多 chunk_size 列、一個 transaction，
+批次之間暫停 pause 秒，不會長時間持有鎖。子資料清除後才刪除清單 / 使用者本身，
+最後的 ON DELETE CASCADE 不再有資料可以連帶刪除。
+
+工作以 attempts 做 compare-and-set：取得工作與每一批刪除都要求 attempts 沒有變，
+worker 中斷時，超過 stale_after 秒沒有進度的工作會被其他 worker 接手，舊的 worker 在下一批時停止。
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from tortoise.expressions import F, Q
+from tortoise.transactions import in_transaction
+
+from models.deletionJobModel import DeletionJobModel
+from models.listModel import ListModel, ProductModel, ListPermissionModel
+from models.notificationModel import NotificationModel
+from models.userModel import UserModel, UserProfileModel
+from utils.eventLog import event_log
+from utils.listAccess import list_access
+from utils.metrics import registry
+
+
+JOBS_TOTAL = registry.counter(
+    "deletion_jobs_total", "Deletion jobs processed by kind and result", ("kind", "result")
+)
+PURGED_ROWS = registry.counter("deletion_purged_rows_total", "Rows deleted by the purge worker", ("table",))
+CHUNK_SECONDS = registry.histogram("deletion_purge_chunk_seconds", "Time to delete one chunk in a transaction")
+
+
+class JobLost(Exception):
+    """
+    工作已被其他 worker 接手
+    """
+
+
+def _steps(job: DeletionJobModel) -> list:
+    """
+    依序要清除的資料：[(model, 篩選條件)]，子資料在前
+    """
+    if job.kind == "list":
+        return [
+            (ProductModel, Q(f_list_uid_id=job.target_id)),
+            (ListPermissionModel, Q(f_list_id_id=job.target_id)),
+            (ListModel, Q(id=job.target_id)),
+        ]
+    return [
+        (ProductModel, Q(f_user_uid_id=job.target_id)),
+        (ListPermissionModel, Q(f_owner_id_id=job.target_id) | Q(f_viewer_id_id=job.target_id)),
+        (NotificationModel, Q(f_user_uid_id=job.target_id)),
+        (ListModel, Q(f_user_uid_id=job.target_id)),
+        (UserProfileModel, Q(f_user_uid_id=job.target_id)),
+        (UserModel, Q(user_uid=job.target_id)),
+    ]
+
+
+class DeletionPurger:
+    """
+    在 FastAPI lifespan 中啟動的 asyncio 背景工作
+    """
+
+    def __init__(self, interval: float, chunk_size: int, pause: float, stale_after: float):
+        self.interval = interval
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.stale_after = stale_after
+        self._task = None
+        self._wake = asyncio.Event()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def wake(self):
+        """
+        有新的工作時立即開始處理，不等到下一次輪詢
+        """
+        self._wake.set()
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            try:
+                while await self.run_once():
+                    pass
+            except Exception as e:
+                event_log.warning("deletion_purge_failed", error=repr(e))
+            # 不用 wait_for：Python 3.11 的 wait_for 在 wake() 與 stop() 同時發生時會吞掉取消
+            waiter = asyncio.ensure_future(self._wake.wait())
+            try:
+                await asyncio.wait((waiter,), timeout=self.interval)
+            finally:
+                waiter.cancel()
+
+    async def _claim(self):
+        """
+        取得最早的待處理工作（或已經停滯的執行中工作），沒有工作時回傳 None
+        """
+        now = datetime.now(timezone.utc)
+        candidates = await DeletionJobModel.filter(
+            Q(status="pending") | Q(status="running", updated_at__lt=now - timedelta(seconds=self.stale_after))
+        ).order_by("created_at").limit(10)
+        for job in candidates:
+            claimed = await DeletionJobModel.filter(id=job.id, attempts=job.attempts)\
+                .update(status="running", attempts=job.attempts + 1, updated_at=now)
+            if claimed:
+                job.attempts += 1
+                return job
+        return None
+
+    async def run_once(self) -> bool:
+        """
+        處理一個工作，回傳是否有工作可處理
+        """
+        job = await self._claim()
+        if job is None:
+            return False
+        started = time.monotonic()
+        try:
+            await self.purge(job)
+        except JobLost:
+            event_log.event("deletion_job_lost", job_id=job.id)
+            return True
+        except Exception as e:
+            JOBS_TOTAL.inc((job.kind, "failed"))
+            await DeletionJobModel.filter(id=job.id, attempts=job.attempts).update(
+                status="pending", error=repr(e)[:255], updated_at=datetime.now(timezone.utc)
+            )
+            raise
+        JOBS_TOTAL.inc((job.kind, "done"))
+        event_log.event(
+            "deletion_job_done", job_id=job.id, kind=job.kind, rows=job.purged,
+            duration_s=round(time.monotonic() - started, 1)
+        )
+        return True
+
+    async def purge(self, job: DeletionJobModel):
+        steps = _steps(job)
+        if job.total is None:
+            job.total = job.purged
+            for model, condition in steps:
+                job.total += await model.filter(condition).count()
+            await self._update(job, total=job.total)
+        for model, condition in steps:
+            while await self._purge_chunk(job, model, condition):
+                await asyncio.sleep(self.pause)
+        now = datetime.now(timezone.utc)
+        await self._update(job, status="done", error=None, updated_at=now, finished_at=now)
+
+    async def _purge_chunk(self, job: DeletionJobModel, model, condition: Q) -> int:
+        """
+        在一個 transaction 中刪除最多 chunk_size 列並記錄進度，回傳刪除的列數
+        """
+        started = time.perf_counter()
+        viewers = set()
+        async with in_transaction("default") as conn:
+            query = model.filter(condition).using_db(conn).limit(self.chunk_size)
+            if model is ListPermissionModel:
+                rows = await query.values_list("id", "f_viewer_id_id")
+                viewers.update(viewer for _, viewer in rows)
+                ids = [row[0] for row in rows]
+            else:
+                ids = await query.values_list(model._meta.pk_attr, flat=True)
+            if not ids:
+                return 0
+            deleted = await model.filter(**{f"{model._meta.pk_attr}__in": ids}).using_db(conn).delete()
+            await self._update(job, conn, purged=F("purged") + deleted, updated_at=datetime.now(timezone.utc))
+        job.purged += deleted
+        PURGED_ROWS.inc((model._meta.db_table,), deleted)
+        CHUNK_SECONDS.observe(time.perf_counter() - started)
+        # 權限已經刪除，被分享的使用者不再看得到這個清單
+        for viewer in viewers:
+            list_access.invalidate(viewer)
+        return deleted
+
+    @staticmethod
+    async def _update(job: DeletionJobModel, conn=None, **values):
+        """
+        更新工作；工作已被其他 worker 接手時拋出 JobLost（在 transaction 中時會一併 rollback）
+        """
+        query = DeletionJobModel.filter(id=job.id, attempts=job.attempts)
+        if conn is not None:
+            query = query.using_db(conn)
+        if not await query.update(**values):
+            raise JobLost(job.id)
+
+
+deletion_purger = DeletionPurger(
+    interval=float(os.getenv('DELETION_PURGE_INTERVAL_SECONDS', '60')),
+    chunk_size=int(os.getenv('DELETION_PURGE_CHUNK_SIZE', '1000')),
+    pause=float(os.getenv('DELETION_PURGE_PAUSE_SECONDS', '0.05')),
+    stale_after=float(os.getenv('DELETION_PURGE_STALE_SECONDS', '300')),
+)
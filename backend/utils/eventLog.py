@@ -0,0 +1,66 @@
+"""
+抽樣的結構化日誌
+
+每筆事件輸出成一行 JSON。一般事件依 LOG_SAMPLE_RATE 抽樣，設為 0 時 event() 只做一次數值比較就返回；
+錯誤與警告以 warning() 輸出，不抽樣。
+"""
+import logging
+import os
+import random
+import sys
+from datetime import datetime, timezone
+
+import orjson
+
+
+class EventLogger:
+    """
+    以 logging 輸出 JSON 事件
+    """
+
+    def __init__(self, name: str, sample_rate: float, level: str = "INFO"):
+        self.sample_rate = min(max(sample_rate, 0.0), 1.0)
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(level)
+        if not self.logger.handlers:
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.propagate = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def sampled(self) -> bool:
+        """
+        這次是否要記錄（呼叫端可先判斷，避免組出不會輸出的欄位）
+        """
+        return self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    def _emit(self, level: int, event: str, fields: dict):
+        if not self.logger.isEnabledFor(level):
+            return
+        record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "event": event}
+        record.update(fields)
+        self.logger.log(level, orjson.dumps(record, default=str).decode())
+
+    def event(self, event: str, **fields):
+        """
+        抽樣記錄一般事件
+        """
+        if self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate):
+            self._emit(logging.INFO, event, fields)
+
+    def warning(self, event: str, **fields):
+        """
+        記錄錯誤或異常狀況，不抽樣
+        """
+        self._emit(logging.WARNING, event, fields)
+
+
+event_log = EventLogger(
+    "app",
+    sample_rate=float(os.getenv('LOG_SAMPLE_RATE', '0')),
+    level=os.getenv('LOG_LEVEL', 'INFO'),
+)
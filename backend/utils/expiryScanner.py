@@ -0,0 +1,266 @@
+"""
+背景到期掃描
+
+定期找出「進入即將到期視窗」的產品，為每位使用者寫入一筆摘要通知。
+掃描以 scan_watermarks 記錄已處理到的到期日，每次只讀取 (watermark, today + window]
+之間的產品，不會重新掃描整張表。新增時已經在視窗內的產品由使用者自行得知，不另行通知。
+
+同一時間只有取得租約（scan_watermarks.leased_by）的 worker 會掃描。產品依 (expiry_date, id)
+分頁讀取，每頁（batch_size 筆）的摘要通知與租約內的進度（cursor_date, cursor_id）在同一個
+transaction 中寫入；最多預先讀取 concurrency 頁，記憶體與 transaction 大小都只和 batch_size 有關。
+掃描失敗時從上次提交的進度繼續，不會跳過也不會重複通知；全部寫入後的最後一次提交才把 watermark
+推進到 high。產品分散在多頁的使用者會收到多筆摘要。每次提交都會延長租約，租約在 lease_seconds
+沒有進度後到期，掃描中斷的 worker 不會永久佔住租約。
+"""
+import asyncio
+import os
+import time
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from tortoise.expressions import Q
+from tortoise.transactions import in_transaction
+
+from models.notificationModel import NotificationModel, ScanWatermarkModel
+from utils.eventLog import event_log
+from utils.idAllocator import id_allocator
+from utils.listReader import fetch_rows
+from utils.metrics import Counter, Gauge, registry
+
+
+EXPIRING_SCAN_PAGE = """
+SELECT p."id", p."product_name", p."expiry_date", p."f_user_uid_id", p."f_list_uid_id"
+FROM "products" p
+JOIN "lists" l ON l."id" = p."f_list_uid_id"
+WHERE p."expiry_date" > $1 AND p."expiry_date" <= $2 AND (p."expiry_date", p."id") > ($3, $4)
+    AND l."deleted_at" IS NULL
+ORDER BY p."expiry_date", p."id"
+LIMIT $5
+"""
+
+
+class LeaseLost(Exception):
+    """
+    掃描期間租約到期並被其他 worker 取得
+    """
+
+
+class ExpiryScanner:
+    """
+    在 FastAPI lifespan 中啟動的 asyncio 背景工作
+    """
+    WATERMARK_NAME = "expiry_soon"
+    KIND = "expiry_digest"
+
+    def __init__(self, interval: float, window_days: int, batch_size: int, concurrency: int,
+                 lease_seconds: float):
+        self.interval = interval
+        self.window = timedelta(days=window_days)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self._task = None
+        self.scans_total = 0
+        self.rows_processed_total = 0
+        self.notifications_total = 0
+        self.last_scan_duration = 0.0
+        self.last_scan_rows = 0
+        self.last_scan_at = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.scan_once()
+            except Exception as e:
+                event_log.warning("expiry_scan_failed", error=repr(e))
+            elapsed = time.monotonic() - started
+            if elapsed > self.interval / 2:
+                event_log.warning("expiry_scan_slow", duration_s=round(elapsed, 1), interval_s=self.interval)
+            await asyncio.sleep(max(self.interval - elapsed, 0))
+
+    async def _claim(self, today: date):
+        """
+        取得掃描租約，回傳這次要處理的 (low, high, 租約 token, 起始 keyset)；
+        已經處理到 high 或其他 worker 正在掃描時回傳 None
+
+        watermark 不在這裡推進：掃描或寫入失敗時，下一次掃描從上次提交的 keyset 繼續
+        """
+        high = today + self.window
+        state, _ = await ScanWatermarkModel.get_or_create(
+            name=self.WATERMARK_NAME, defaults={"watermark": today - timedelta(days=1)}
+        )
+        low = state.watermark
+        if low >= high:
+            return None
+        token = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        claimed = await ScanWatermarkModel\
+            .filter(Q(lease_until=None) | Q(lease_until__lt=now), name=self.WATERMARK_NAME, watermark=low,
+                    cursor_date=state.cursor_date, cursor_id=state.cursor_id)\
+            .update(leased_by=token, lease_until=now + timedelta(seconds=self.lease_seconds))
+        if not claimed:
+            return None
+        key = (state.cursor_date, state.cursor_id) if state.cursor_date is not None else (low, "")
+        return low, high, token, key
+
+    async def _release(self, token: str):
+        """
+        提早釋放租約；釋放失敗時租約仍會在 lease_seconds 後到期
+        """
+        try:
+            await ScanWatermarkModel.filter(name=self.WATERMARK_NAME, leased_by=token)\
+                .update(leased_by=None, lease_until=None)
+        except Exception as e:
+            event_log.warning("expiry_scan_release_failed", error=repr(e))
+
+    async def _iter_pages(self, low: date, high: date, key: tuple):
+        while True:
+            rows = await fetch_rows(EXPIRING_SCAN_PAGE, [low, high, key[0], key[1], self.batch_size])
+            if not rows:
+                return
+            yield rows
+            key = (rows[-1][2], rows[-1][0])
+            if len(rows) < self.batch_size:
+                return
+
+    async def _read_ahead(self, low: date, high: date, key: tuple, queue: asyncio.Queue):
+        """
+        依序把每一頁放進 queue（最多 concurrency 頁），結束時放入 None，失敗時放入例外
+        """
+        try:
+            async for rows in self._iter_pages(low, high, key):
+                await queue.put(rows)
+        except Exception as e:
+            await queue.put(e)
+            return
+        await queue.put(None)
+
+    async def _commit(self, digests: dict, low: date, high: date, token: str, key: tuple = None):
+        """
+        在同一個 transaction 中寫入一頁的摘要通知並記錄進度（key）、延長租約；
+        key 為 None 時是最後一次提交：推進 watermark 並釋放租約。
+        租約已被其他 worker 取得時整批 rollback，通知不會重複寫入
+        """
+        users = list(digests)
+        ids = await id_allocator.reserve(NotificationModel, len(users)) if users else []
+        now = datetime.now(timezone.utc)
+        if key is None:
+            progress = dict(watermark=high, cursor_date=None, cursor_id=None, leased_by=None, lease_until=None)
+        else:
+            progress = dict(cursor_date=key[0], cursor_id=key[1],
+                            lease_until=now + timedelta(seconds=self.lease_seconds))
+        async with in_transaction("default") as conn:
+            await NotificationModel.bulk_create([
+                NotificationModel(
+                    id=notification_id,
+                    f_user_uid_id=user_uid,
+                    kind=self.KIND,
+                    content={"until": high.isoformat(), "products": digests[user_uid]},
+                    created_at=now,
+                )
+                for notification_id, user_uid in zip(ids, users)
+            ], batch_size=self.batch_size, using_db=conn)
+            advanced = await ScanWatermarkModel\
+                .filter(name=self.WATERMARK_NAME, watermark=low, leased_by=token)\
+                .using_db(conn)\
+                .update(**progress)
+            if not advanced:
+                raise LeaseLost(self.WATERMARK_NAME)
+
+    async def scan_once(self, today: date = None):
+        """
+        執行一次掃描，回傳處理的產品筆數
+        """
+        started = time.monotonic()
+        window = await self._claim(today or date.today())
+        rows_processed = 0
+        if window is not None:
+            low, high, token, key = window
+            queue = asyncio.Queue(maxsize=self.concurrency)
+            reader = asyncio.create_task(self._read_ahead(low, high, key, queue))
+            try:
+                while (rows := await queue.get()) is not None:
+                    if isinstance(rows, Exception):
+                        raise rows
+                    rows_processed += len(rows)
+                    digests = {}
+                    for product_id, name, expiry_date, user_uid, list_id in rows:
+                        expiry = expiry_date if isinstance(expiry_date, str) else expiry_date.isoformat()
+                        digests.setdefault(user_uid, []).append([product_id, name, expiry, list_id])
+                    last_expiry = rows[-1][2]
+                    if isinstance(last_expiry, str):
+                        last_expiry = date.fromisoformat(last_expiry)
+                    await self._commit(digests, low, high, token, (last_expiry, rows[-1][0]))
+                    self.notifications_total += len(digests)
+                await self._commit({}, low, high, token)
+            except BaseException:
+                # 失敗或被取消時立即釋放租約，下一次掃描從已提交的進度繼續
+                await asyncio.shield(self._release(token))
+                raise
+            finally:
+                reader.cancel()
+
+        self.scans_total += 1
+        self.rows_processed_total += rows_processed
+        self.last_scan_rows = rows_processed
+        self.last_scan_duration = time.monotonic() - started
+        self.last_scan_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        return rows_processed
+
+    def metrics(self) -> dict:
+        return {
+            "scans_total": self.scans_total,
+            "rows_processed_total": self.rows_processed_total,
+            "notifications_total": self.notifications_total,
+            "last_scan_duration_seconds": self.last_scan_duration,
+            "last_scan_rows": self.last_scan_rows,
+            "last_scan_at": self.last_scan_at,
+        }
+
+    def collect(self) -> list:
+        """
+        以 Prometheus 指標輸出統計（/metrics 的 collector）
+        """
+        counters = (
+            ("expiry_scans_total", "Completed expiry scans", self.scans_total),
+            ("expiry_scan_rows_processed_total", "Products read by expiry scans", self.rows_processed_total),
+            ("expiry_scan_notifications_total", "Digest notifications written", self.notifications_total),
+        )
+        gauges = (
+            ("expiry_scan_last_duration_seconds", "Duration of the last expiry scan", self.last_scan_duration),
+            ("expiry_scan_last_rows", "Products read by the last expiry scan", self.last_scan_rows),
+        )
+        metrics = []
+        for name, documentation, value in counters:
+            metric = Counter(name, documentation)
+            metric.inc(amount=value)
+            metrics.append(metric)
+        for name, documentation, value in gauges:
+            metric = Gauge(name, documentation)
+            metric.set(value)
+            metrics.append(metric)
+        return metrics
+
+
+expiry_scanner = ExpiryScanner(
+    interval=float(os.getenv('EXPIRY_SCAN_INTERVAL_SECONDS', '3600')),
+    window_days=int(os.getenv('EXPIRY_WINDOW_DAYS', '3')),
+    batch_size=int(os.getenv('EXPIRY_SCAN_BATCH_SIZE', '500')),
+    concurrency=int(os.getenv('EXPIRY_SCAN_CONCURRENCY', '4')),
+    lease_seconds=float(os.getenv('EXPIRY_SCAN_LEASE_SECONDS', '1800')),
+)
+registry.add_collector(expiry_scanner.collect)
@@ -0,0 +1,157 @@
+"""
+主鍵分配器
+
+UserModel、ListModel、ProductModel 共用，新增資料時不再需要
+`order_by('-id').first()` 查詢目前最大的 id。
+"""
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+
+from tortoise import connections
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import F
+from tortoise.transactions import in_transaction
+
+from models.sequenceModel import IdSequenceModel
+
+
+class IdAllocator(ABC):
+    """
+    主鍵分配器介面
+    """
+
+    @abstractmethod
+    async def reserve(self, model, count: int) -> list:
+        """
+        一次分配 count 個 model 的主鍵
+        """
+
+    async def next_id(self, model) -> str:
+        """
+        分配單一主鍵
+        """
+        ids = await self.reserve(model, 1)
+        return ids[0]
+
+
+class BlockSequenceAllocator(IdAllocator):
+    """
+    向 id_sequences 表一次預留一整段序號，段內的分配只在記憶體中進行
+
+    預留時以 UPDATE 先鎖住該列再讀回，多個 worker 同時預留也不會拿到重疊的區段。
+    """
+
+    def __init__(self, block_size: int = 100, connection_name: str = "default"):
+        self.block_size = block_size
+        self.connection_name = connection_name
+        self._blocks = {}
+        self._locks = {}
+
+    async def reserve_values(self, name: str, count: int, model=None) -> list:
+        """
+        從序列 name 取得 count 個整數，model 用於序列不存在時推算起始值
+        """
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        values = []
+        async with lock:
+            while len(values) < count:
+                start, end = self._blocks.get(name, (0, 0))
+                if start >= end:
+                    size = max(self.block_size, count - len(values))
+                    start = await self._claim(name, size, model)
+                    end = start + size
+                take = min(end - start, count - len(values))
+                values.extend(range(start, start + take))
+                self._blocks[name] = (start + take, end)
+        return values
+
+    async def reserve(self, model, count: int) -> list:
+        values = await self.reserve_values(model._meta.db_table, count, model)
+        return [str(value) for value in values]
+
+    async def _claim(self, name: str, size: int, model=None) -> int:
+        """
+        向資料庫預留 size 個序號，回傳區段起始值
+        """
+        while True:
+            async with in_transaction(self.connection_name) as conn:
+                updated = await IdSequenceModel.filter(name=name)\
+                    .using_db(conn)\
+                    .update(next_value=F("next_value") + size)
+                if updated:
+                    row = await IdSequenceModel.get(name=name).using_db(conn)
+                    return row.next_value - size
+            # 尚未執行 migration 的資料庫，依現有資料建立序列
+            start = await self._seed(model, self.connection_name)
+            try:
+                await IdSequenceModel.create(name=name, next_value=start + size)
+                return start
+            except IntegrityError:
+                # 其他 worker 已經建立，重新預留
+                continue
+
+    @staticmethod
+    async def _seed(model, connection_name: str = "default") -> int:
+        """
+        推算序列起始值（只在序列不存在時執行一次）
+
+        在資料庫中取純數字 id（不超過 BIGINT）的最大值，不把整個表讀進記憶體
+        """
+        if model is None:
+            return 1
+        conn = connections.get(connection_name)
+        table = model._meta.db_table
+        if conn.capabilities.dialect == "postgres":
+            sql = f'SELECT MAX(CAST("id" AS BIGINT)) AS "max_id" FROM "{table}" WHERE "id" ~ \'^[0-9]{{1,18}}$\''
+        else:
+            sql = f'SELECT MAX(CAST("id" AS INTEGER)) AS "max_id" FROM "{table}" ' \
+                  f'WHERE LENGTH("id") BETWEEN 1 AND 18 AND "id" NOT GLOB \'*[^0-9]*\''
+        rows = await conn.execute_query_dict(sql)
+        return (rows[0]["max_id"] or 0) + 1
+
+
+class TimeOrderedAllocator(IdAllocator):
+    """
+    依時間排序的 64-bit id：41 bits 毫秒 / 10 bits worker / 12 bits 序號
+
+    完全不需要存取資料庫，不同 worker 必須設定不同的 ID_WORKER_ID。
+    """
+    EPOCH_MS = 1735689600000  # 2025-01-01T00:00:00Z
+
+    def __init__(self, worker_id: int = 0):
+        self.worker_id = worker_id & 0x3FF
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _next(self) -> int:
+        now = int(time.time() * 1000)
+        if now <= self._last_ms:
+            # 同一毫秒或時鐘倒退：沿用上一個時間戳，序號用完就借用下一毫秒
+            now = self._last_ms
+            self._sequence = (self._sequence + 1) & 0xFFF
+            if self._sequence == 0:
+                now += 1
+        else:
+            self._sequence = 0
+        self._last_ms = now
+        return ((now - self.EPOCH_MS) << 22) | (self.worker_id << 12) | self._sequence
+
+    async def reserve(self, model, count: int) -> list:
+        return [str(self._next()) for _ in range(count)]
+
+
+def create_allocator() -> IdAllocator:
+    """
+    依環境變數 ID_ALLOCATOR（block / time）建立分配器
+    """
+    kind = os.getenv('ID_ALLOCATOR', 'block')
+    if kind == 'time':
+        return TimeOrderedAllocator(worker_id=int(os.getenv('ID_WORKER_ID', '0')))
+    if kind == 'block':
+        return BlockSequenceAllocator(block_size=int(os.getenv('ID_BLOCK_SIZE', '100')))
+    raise ValueError(f"Unknown ID_ALLOCATOR '{kind}'")
+
+
+id_allocator = create_allocator()
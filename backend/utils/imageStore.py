@@ -0,0 +1,223 @@
+"""
+產品圖片儲存
+
+上傳內容邊接收邊寫入暫存檔並計算 sha256，完成後以雜湊值命名（content-addressed），
+相同的照片只存一份。檔名為 "<sha256>.<副檔名>"，內容不會改變，因此可以直接當成強 ETag。
+檔案操作都在 thread 中執行，不會卡住 event loop。
+
+縮圖在 process pool 中以 Pillow 產生（只有 worker process 會 import Pillow）；
+沒有安裝 Pillow 時縮圖請求直接回傳原圖。像素數超過 max_pixels 的圖片（例如 decompression bomb）
+只讀取檔頭就拒絕，不會解碼。
+"""
+import asyncio
+import hashlib
+import os
+import re
+import tempfile
+
+from utils.eventLog import event_log
+
+
+# 允許的格式：以檔頭判斷，不相信 Content-Type
+SIGNATURES = (
+    (b"\xff\xd8\xff", "jpg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+    (b"GIF87a", "gif", "image/gif"),
+    (b"GIF89a", "gif", "image/gif"),
+)
+MEDIA_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+FILENAME = re.compile(r"^([0-9a-f]{64})\.(jpg|png|gif|webp)$")
+
+
+class ImageTooLarge(Exception):
+    """
+    上傳內容超過大小上限
+    """
+
+
+class UnsupportedImage(Exception):
+    """
+    不是支援的圖片格式
+    """
+
+
+def sniff(head: bytes):
+    """
+    依檔頭回傳 (副檔名, media type)，無法辨識時回傳 None
+    """
+    for signature, extension, media_type in SIGNATURES:
+        if head.startswith(signature):
+            return extension, media_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp", "image/webp"
+    return None
+
+
+def make_thumbnail(source: str, target: str, size: int, max_pixels: int) -> bool:
+    """
+    在 worker process 中執行：產生長邊為 size 的 JPEG 縮圖，沒有 Pillow 時回傳 False；
+    像素數超過 max_pixels 時拋出 ImageTooLarge
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+    # Image.open 只讀取檔頭；超過兩倍時 Pillow 本身也會拋出 DecompressionBombError
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    with Image.open(source) as image:
+        width, height = image.size
+        if width * height > max_pixels:
+            raise ImageTooLarge(f"image has {width}x{height} pixels, more than {max_pixels}")
+        image.thumbnail((size, size))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f"{target}.{os.getpid()}.tmp"
+        image.convert("RGB").save(partial, "JPEG", quality=80, optimize=True)
+    os.replace(partial, target)
+    return True
+
+
+class ImageStore:
+    """
+    本機檔案系統上的圖片儲存
+    """
+
+    def __init__(self, root: str, max_bytes: int, max_pixels: int, thumbnail_size: int, workers: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+        self.thumbnail_size = thumbnail_size
+        self.workers = workers
+        self._executor = None
+        self._pending = {}
+        self._tasks = set()
+        self._pillow_missing = False
+
+    def path(self, filename: str) -> str:
+        return os.path.join(self.root, filename[:2], filename)
+
+    def thumbnail_path(self, filename: str) -> str:
+        digest = filename.split(".", 1)[0]
+        return os.path.join(self.root, "thumbnails", digest[:2], f"{digest}-{self.thumbnail_size}.jpg")
+
+    @staticmethod
+    def parse(filename: str):
+        """
+        檢查檔名格式，回傳 media type；格式錯誤時回傳 None（避免路徑穿越）
+        """
+        match = FILENAME.match(filename)
+        return MEDIA_TYPES[match.group(2)] if match else None
+
+    def _create_partial(self):
+        os.makedirs(self.root, exist_ok=True)
+        fd, partial = tempfile.mkstemp(dir=self.root, suffix=".upload")
+        return os.fdopen(fd, "wb"), partial
+
+    @staticmethod
+    def _store(partial: str, target: str):
+        """
+        把暫存檔移到最終位置；相同內容已存在時丟棄暫存檔
+        """
+        if os.path.exists(target):
+            os.remove(partial)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(partial, target)
+
+    @staticmethod
+    def _discard(file, partial: str):
+        file.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+
+    async def save(self, stream) -> str:
+        """
+        把上傳串流存成檔案，回傳檔名；內容已存在時直接沿用
+        """
+        digest = hashlib.sha256()
+        size = 0
+        head = b""
+        file, partial = await asyncio.to_thread(self._create_partial)
+        try:
+            async for chunk in stream:
+                if len(head) < 16:
+                    # 收到足夠的檔頭就先檢查格式，不是圖片時不必讀完整個上傳
+                    head += chunk[:16 - len(head)]
+                    if len(head) == 16 and sniff(head) is None:
+                        raise UnsupportedImage("unsupported image format")
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ImageTooLarge(f"image larger than {self.max_bytes} bytes")
+                digest.update(chunk)
+                await asyncio.to_thread(file.write, chunk)
+            await asyncio.to_thread(file.close)
+            kind = sniff(head)
+            if kind is None:
+                raise UnsupportedImage("unsupported image format")
+            filename = f"{digest.hexdigest()}.{kind[0]}"
+            await asyncio.to_thread(self._store, partial, self.path(filename))
+        except BaseException:
+            # 被取消時也要清除暫存檔
+            await asyncio.shield(asyncio.to_thread(self._discard, file, partial))
+            raise
+        return filename
+
+    def _get_executor(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def thumbnail(self, filename: str):
+        """
+        回傳縮圖路徑，尚未產生時在 process pool 中產生；無法產生時回傳 None
+        同一張圖同時只會產生一次，其他請求等待同一個結果
+        """
+        target = self.thumbnail_path(filename)
+        if os.path.exists(target):
+            return target
+        if self._pillow_missing:
+            return None
+        future = self._pending.get(filename)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._get_executor(), make_thumbnail, self.path(filename), target, self.thumbnail_size,
+                self.max_pixels
+            )
+            self._pending[filename] = future
+            future.add_done_callback(lambda _: self._pending.pop(filename, None))
+        try:
+            created = await asyncio.shield(future)
+        except Exception as e:
+            event_log.warning("thumbnail_failed", filename=filename, error=repr(e))
+            return None
+        if not created:
+            if not self._pillow_missing:
+                self._pillow_missing = True
+                event_log.warning("thumbnail_disabled", reason="Pillow is not installed")
+            return None
+        return target
+
+    def schedule_thumbnail(self, filename: str):
+        """
+        上傳後在背景產生縮圖，不等待結果
+        """
+        task = asyncio.ensure_future(self.thumbnail(filename))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+image_store = ImageStore(
+    root=os.getenv('IMAGE_STORAGE_DIR') or os.path.join(BASE_DIR, "storage", "images"),
+    max_bytes=int(os.getenv('IMAGE_MAX_BYTES', str(10 * 1024 * 1024))),
+    max_pixels=int(os.getenv('IMAGE_MAX_PIXELS', '40000000')),
+    thumbnail_size=int(os.getenv('IMAGE_THUMBNAIL_SIZE', '256')),
+    workers=int(os.getenv('IMAGE_THUMBNAIL_WORKERS', '2')),
+)
@@ -0,0 +1,58 @@
+"""
+分享清單的存取檢查
+
+每個使用者被分享的清單 id 快取成 frozenset，檢查權限時不必查詢 list_permissions；
+分享或取消分享時主動失效。快取只存在於單一 process，其他 process 最多在 ttl 秒後看到變更。
+"""
+import os
+
+from utils.listReader import fetch_shared_list_ids
+from utils.metrics import registry
+from utils.ttlCache import TTLCache
+
+
+CACHE_TOTAL = registry.counter(
+    "list_access_cache_total", "Shared-list permission lookups by cache result", ("result",)
+)
+
+
+class ListAccess:
+    """
+    viewer user_uid -> 分享給他的清單 id
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._shared = TTLCache(maxsize, ttl=ttl)
+        # 失效次數；載入期間有失效發生時不寫回快取，避免把舊的權限放回去
+        self._invalidations = 0
+
+    async def shared_with(self, user_uid: str, connection_name: str = "default") -> frozenset:
+        list_ids = self._shared.get(user_uid)
+        if list_ids is not None:
+            CACHE_TOTAL.inc(("hit",))
+            return list_ids
+        CACHE_TOTAL.inc(("miss",))
+        invalidations = self._invalidations
+        list_ids = frozenset(await fetch_shared_list_ids(user_uid, connection_name))
+        if invalidations == self._invalidations:
+            self._shared.set(user_uid, list_ids)
+        return list_ids
+
+    async def can_read(self, user_uid: str, owner_uid: str, list_id: str,
+                       connection_name: str = "default") -> bool:
+        """
+        使用者是否可以閱覽清單：自己的清單不需要查快取
+        """
+        if owner_uid == user_uid:
+            return True
+        return list_id in await self.shared_with(user_uid, connection_name)
+
+    def invalidate(self, user_uid: str):
+        self._invalidations += 1
+        self._shared.pop(user_uid)
+
+
+list_access = ListAccess(
+    maxsize=int(os.getenv('LIST_ACCESS_CACHE_SIZE', '100000')),
+    ttl=float(os.getenv('LIST_ACCESS_CACHE_TTL_SECONDS', '60')),
+)
@@ -0,0 +1,307 @@
+"""
+清單 / 產品的唯讀查詢
+
+直接執行單一條 SQL 並回傳 tuple，不建立 Tortoise model。SQL 以 asyncpg 的 $n 寫成，
+其他方言在第一次使用時轉換一次；asyncpg 會在每條連線上快取 prepared statement。
+各函式的 connection_name 可指定唯讀 replica（見 utils.readRouter）。
+已標記刪除（deleted_at 不為 NULL）的清單在背景清除完成前仍在資料表中，查詢都要排除。
+"""
+import base64
+import json
+import re
+from datetime import date, datetime
+
+from tortoise import connections
+
+
+PRODUCTS_PAGE = """
+SELECT p."id", p."product_name", p."expiry_date", p."product_image_url"
+FROM "products" p
+JOIN "lists" l ON l."id" = p."f_list_uid_id"
+WHERE l."f_user_uid_id" = $1 AND l."list_name" = $2 AND l."deleted_at" IS NULL AND p."f_user_uid_id" = $1
+ORDER BY p."expiry_date", p."id"
+LIMIT $3
+"""
+
+PRODUCTS_PAGE_AFTER = """
+SELECT p."id", p."product_name", p."expiry_date", p."product_image_url"
+FROM "products" p
+JOIN "lists" l ON l."id" = p."f_list_uid_id"
+WHERE l."f_user_uid_id" = $1 AND l."list_name" = $2 AND l."deleted_at" IS NULL AND p."f_user_uid_id" = $1
+    AND (p."expiry_date", p."id") > ($3, $4)
+ORDER BY p."expiry_date", p."id"
+LIMIT $5
+"""
+
+LISTS_PAGE = """
+SELECT "list_name", "created_at", "id" FROM "lists"
+WHERE "f_user_uid_id" = $1 AND "deleted_at" IS NULL
+ORDER BY "created_at", "id"
+LIMIT $2
+"""
+
+LISTS_PAGE_AFTER = """
+SELECT "list_name", "created_at", "id" FROM "lists"
+WHERE "f_user_uid_id" = $1 AND "deleted_at" IS NULL AND ("created_at", "id") > ($2, $3)
+ORDER BY "created_at", "id"
+LIMIT $4
+"""
+
+EXPIRING_BETWEEN = """
+SELECT p."id", p."product_name", p."expiry_date", p."product_image_url", l."list_name"
+FROM "products" p
+JOIN "lists" l ON l."id" = p."f_list_uid_id"
+WHERE p."f_user_uid_id" = $1 AND p."expiry_date" >= $2 AND p."expiry_date" <= $3
+    AND l."deleted_at" IS NULL
+ORDER BY p."expiry_date", p."id"
+LIMIT $4
+"""
+
+LIST_VERSION = """
+SELECT "id", "version" FROM "lists"
+WHERE "f_user_uid_id" = $1 AND "list_name" = $2 AND "deleted_at" IS NULL
+"""
+
+LIST_VERSION_BY_ID = """
+SELECT "id", "version", "f_user_uid_id" FROM "lists"
+WHERE "id" = $1 AND "deleted_at" IS NULL
+"""
+
+# 以 (擁有者, 清單 id) 走 products 的複合索引，不需要 JOIN lists
+LIST_PRODUCTS_PAGE = """
+SELECT "id", "product_name", "expiry_date", "product_image_url"
+FROM "products"
+WHERE "f_user_uid_id" = $1 AND "f_list_uid_id" = $2
+ORDER BY "expiry_date", "id"
+LIMIT $3
+"""
+
+LIST_PRODUCTS_PAGE_AFTER = """
+SELECT "id", "product_name", "expiry_date", "product_image_url"
+FROM "products"
+WHERE "f_user_uid_id" = $1 AND "f_list_uid_id" = $2 AND ("expiry_date", "id") > ($3, $4)
+ORDER BY "expiry_date", "id"
+LIMIT $5
+"""
+
+# 自己的清單與被分享的清單：(id, list_name, 擁有者 username, 是否為自己的清單)
+# 兩邊各自走 lists / list_permissions 的索引，再合併排序
+VISIBLE_LISTS = """
+SELECT v."id", v."list_name", u."username", v."owned"
+FROM (
+    SELECT "id", "list_name", "created_at", "f_user_uid_id", 1 AS "owned"
+    FROM "lists" WHERE "f_user_uid_id" = $1 AND "deleted_at" IS NULL
+    UNION ALL
+    SELECT l."id", l."list_name", l."created_at", l."f_user_uid_id", 0
+    FROM "list_permissions" p JOIN "lists" l ON l."id" = p."f_list_id_id"
+    WHERE p."f_viewer_id_id" = $1 AND l."deleted_at" IS NULL
+) v
+JOIN "users" u ON u."user_uid" = v."f_user_uid_id"
+ORDER BY v."created_at", v."id"
+"""
+
+SHARED_LIST_IDS = """
+SELECT "f_list_id_id" FROM "list_permissions"
+WHERE "f_viewer_id_id" = $1
+"""
+
+USER_LISTS_VERSION = """
+SELECT "lists_version" FROM "users"
+WHERE "user_uid" = $1
+"""
+
+# 建立搜尋索引時讀取使用者的所有產品與清單名稱（見 utils.productSearch）
+USER_PRODUCTS = """
+SELECT "id", "f_list_uid_id", "product_name", "product_barcode", "description", "expiry_date",
+    "product_image_url"
+FROM "products"
+WHERE "f_user_uid_id" = $1
+"""
+
+USER_LIST_NAMES = """
+SELECT "id", "list_name" FROM "lists"
+WHERE "f_user_uid_id" = $1 AND "deleted_at" IS NULL
+"""
+
+_prepared = {}
+
+
+def _prepare(conn, sql: str) -> str:
+    """
+    依連線方言轉換 placeholder（結果會被快取）
+    """
+    dialect = conn.capabilities.dialect
+    key = (dialect, sql)
+    if key not in _prepared:
+        _prepared[key] = sql if dialect == "postgres" else re.sub(r"\$(\d+)", r"?\1", sql)
+    return _prepared[key]
+
+
+async def fetch_rows(sql: str, values: list, connection_name: str = "default") -> list:
+    """
+    執行查詢並回傳 tuple 列表
+    """
+    conn = connections.get(connection_name)
+    _, rows = await conn.execute_query(_prepare(conn, sql), values)
+    return [tuple(row) for row in rows]
+
+
+def _iso(value):
+    """
+    date / datetime 轉成 ISO 字串（SQLite 取回的已經是字串）
+    """
+    return value if isinstance(value, str) else value.isoformat()
+
+
+def encode_cursor(key: tuple) -> str:
+    """
+    把排序鍵編碼成不透明的 cursor
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    """
+    還原 cursor，格式錯誤時拋出 ValueError
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(key, list) or len(key) != 2 or not all(isinstance(part, str) for part in key):
+        raise ValueError("invalid cursor")
+    return key
+
+
+async def fetch_products_page(user_uid: str, list_name: str, limit: int, cursor: str = None,
+                              connection_name: str = "default"):
+    """
+    使用者 user_uid 的清單 list_name 中的產品，依 (到期日, id) 排序分頁
+
+    回傳 (rows, next_cursor)，沒有下一頁時 next_cursor 為 None
+    """
+    return await _products_page(
+        PRODUCTS_PAGE, PRODUCTS_PAGE_AFTER, [user_uid, list_name], limit, cursor, connection_name
+    )
+
+
+async def fetch_list_products_page(owner_uid: str, list_id: str, limit: int, cursor: str = None,
+                                   connection_name: str = "default"):
+    """
+    以清單 id 查詢產品（擁有者 owner_uid），排序與 cursor 格式和 fetch_products_page 相同
+    """
+    return await _products_page(
+        LIST_PRODUCTS_PAGE, LIST_PRODUCTS_PAGE_AFTER, [owner_uid, list_id], limit, cursor, connection_name
+    )
+
+
+async def _products_page(first_sql: str, after_sql: str, values: list, limit: int, cursor: str,
+                         connection_name: str):
+    if cursor is None:
+        rows = await fetch_rows(first_sql, [*values, limit + 1], connection_name)
+    else:
+        expiry_date, product_id = decode_cursor(cursor)
+        rows = await fetch_rows(
+            after_sql, [*values, date.fromisoformat(expiry_date), product_id, limit + 1], connection_name
+        )
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor((_iso(rows[-1][2]), rows[-1][0]))
+
+
+async def fetch_list_names_page(user_uid: str, limit: int, cursor: str = None,
+                                connection_name: str = "default"):
+    """
+    使用者 user_uid 的清單名稱，依 (建立時間, id) 排序分頁
+
+    回傳 (names, next_cursor)，沒有下一頁時 next_cursor 為 None
+    """
+    if cursor is None:
+        rows = await fetch_rows(LISTS_PAGE, [user_uid, limit + 1], connection_name)
+    else:
+        created_at, list_id = decode_cursor(cursor)
+        rows = await fetch_rows(
+            LISTS_PAGE_AFTER, [user_uid, datetime.fromisoformat(created_at), list_id, limit + 1],
+            connection_name
+        )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor((_iso(rows[-1][1]), rows[-1][2]))
+    return [row[0] for row in rows], next_cursor
+
+
+async def expiring_between(user_uid: str, start: date, end: date, limit: int,
+                           connection_name: str = "default") -> list:
+    """
+    使用者 user_uid 在 [start, end] 之間到期的產品（含清單名稱），依到期日排序
+    """
+    return await fetch_rows(EXPIRING_BETWEEN, [user_uid, start, end, limit], connection_name)
+
+
+async def fetch_list_version(user_uid: str, list_name: str, connection_name: str = "default"):
+    """
+    清單的 (id, version)，清單不存在時回傳 None
+    """
+    rows = await fetch_rows(LIST_VERSION, [user_uid, list_name], connection_name)
+    return rows[0] if rows else None
+
+
+async def fetch_list_version_by_id(list_id: str, connection_name: str = "default"):
+    """
+    清單的 (id, version, 擁有者 user_uid)，清單不存在時回傳 None
+    """
+    rows = await fetch_rows(LIST_VERSION_BY_ID, [list_id], connection_name)
+    return rows[0] if rows else None
+
+
+async def fetch_visible_lists(user_uid: str, connection_name: str = "default") -> list:
+    """
+    使用者看得到的所有清單（自己的與被分享的），一次查詢
+    """
+    rows = await fetch_rows(VISIBLE_LISTS, [user_uid], connection_name)
+    return [(list_id, name, owner, bool(owned)) for list_id, name, owner, owned in rows]
+
+
+async def fetch_shared_list_ids(user_uid: str, connection_name: str = "default") -> list:
+    """
+    分享給使用者的清單 id
+    """
+    rows = await fetch_rows(SHARED_LIST_IDS, [user_uid], connection_name)
+    return [row[0] for row in rows]
+
+
+async def fetch_lists_version(user_uid: str, connection_name: str = "default"):
+    """
+    使用者清單集合的版本號，使用者不存在時回傳 None
+    """
+    rows = await fetch_rows(USER_LISTS_VERSION, [user_uid], connection_name)
+    return rows[0][0] if rows else None
+
+
+async def fetch_user_products(user_uid: str, connection_name: str = "default") -> list:
+    """
+    使用者的所有產品：(id, 清單 id, 名稱, 條碼, 描述, 到期日, 圖片網址)
+    """
+    return await fetch_rows(USER_PRODUCTS, [user_uid], connection_name)
+
+
+async def fetch_list_names(user_uid: str, connection_name: str = "default") -> dict:
+    """
+    使用者的清單 {清單 id: 名稱}
+    """
+    return dict(await fetch_rows(USER_LIST_NAMES, [user_uid], connection_name))
+
+
+async def iter_products(user_uid: str, list_name: str, page_size: int = 1000,
+                        connection_name: str = "default"):
+    """
+    逐頁產生清單中的所有產品
+    """
+    cursor = None
+    while True:
+        rows, cursor = await fetch_products_page(user_uid, list_name, page_size, cursor, connection_name)
+        yield rows
+        if cursor is None:
+            return
@@ -0,0 +1,49 @@
+"""
+清單的版本號
+
+每個清單有 version（清單內的產品），每個使用者有 lists_version（清單集合），內容變動後加一。
+GET 端點以版本號當作 ETag，If-None-Match 符合時只查一次版本號就回傳 304。
+
+版本號必須在資料變動之後、或在同一個 transaction 內加一，讀取時則先讀版本號再讀資料：
+讀到新版本號時一定也讀得到新資料，舊內容不會被快取在新的 ETag 底下。
+"""
+from tortoise.expressions import F
+
+from models.listModel import ListModel
+from models.userModel import UserModel
+
+
+# 每次都要向伺服器確認（帶 If-None-Match），且只能存在使用者自己的瀏覽器快取
+CACHE_CONTROL = "private, no-cache"
+
+
+def list_etag(list_id: str, version: int) -> str:
+    # 清單刪除後以相同名稱重建時版本號會從 0 開始，因此帶上清單 id
+    return f'"{list_id}.{version}"'
+
+
+def lists_etag(user_uid: str, version: int) -> str:
+    return f'"{user_uid}.{version}"'
+
+
+async def bump_user_lists(user_uid: str, using_db=None):
+    await UserModel.filter(user_uid=user_uid).using_db(using_db)\
+        .update(lists_version=F("lists_version") + 1)
+
+
+async def bump_lists(list_ids, using_db=None):
+    list_ids = list(list_ids)
+    if list_ids:
+        await ListModel.filter(id__in=list_ids).using_db(using_db).update(version=F("version") + 1)
+
+
+async def product_lists(products, using_db=None) -> dict:
+    """
+    產品查詢 products 涵蓋的產品，依清單分組：{list_id: [product_id, ...]}
+
+    刪除 / 移動時需與變動在同一個 transaction 內、變動之前呼叫
+    """
+    grouped = {}
+    for product_id, list_id in await products.using_db(using_db).values_list("id", "f_list_uid_id"):
+        grouped.setdefault(list_id, []).append(product_id)
+    return grouped
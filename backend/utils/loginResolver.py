@@ -0,0 +1,57 @@
+"""
+登入帳號解析
+
+依輸入格式（含 @ 視為 email）只查詢一個正規化欄位的索引，
+查不到的帳號放進有上限、有 TTL 的負向快取，重複嘗試不再存取資料庫。
+"""
+import os
+
+from models.userModel import UserModel
+from utils.ttlCache import TTLCache
+
+
+def normalize(value: str) -> str:
+    """
+    去除前後空白並轉小寫，與 migration 中的 LOWER(TRIM(...)) 一致
+    """
+    return value.strip().lower()
+
+
+class LoginResolver:
+    """
+    username_or_email -> UserModel
+    """
+
+    def __init__(self, negative_cache_size: int, negative_ttl: float):
+        self._unknown = TTLCache(negative_cache_size, ttl=negative_ttl)
+
+    @staticmethod
+    def _lookup(identifier: str):
+        key = normalize(identifier)
+        return ("email_key", key) if "@" in key else ("username_key", key)
+
+    async def resolve(self, identifier: str):
+        """
+        回傳對應的使用者，找不到時回傳 None
+        """
+        field, key = self._lookup(identifier)
+        if self._unknown.get((field, key)):
+            return None
+        # username_key / email_key 是唯一欄位，最多一筆
+        user = await UserModel.get_or_none(**{field: key}, deleted_at=None)
+        if user is None:
+            self._unknown.set((field, key), True)
+        return user
+
+    def forget(self, username: str, email: str):
+        """
+        註冊新帳號時移除負向快取
+        """
+        self._unknown.pop(("username_key", normalize(username)))
+        self._unknown.pop(("email_key", normalize(email)))
+
+
+login_resolver = LoginResolver(
+    negative_cache_size=int(os.getenv('LOGIN_NEGATIVE_CACHE_SIZE', '100000')),
+    negative_ttl=float(os.getenv('LOGIN_NEGATIVE_CACHE_TTL_SECONDS', '30')),
+)
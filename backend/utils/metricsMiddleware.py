@@ -0,0 +1,87 @@
+"""
+請求量測 middleware
+
+以純 ASGI middleware 實作（不經過 BaseHTTPMiddleware 的額外 task 與 queue），
+依路由樣板與狀態碼記錄請求數、處理中請求數與延遲 histogram，以及每個請求執行的 SQL 次數。
+路由以 "/api/get_product" 這類樣板計算，未匹配的路徑一律記為 "unmatched"，避免 label 數量失控。
+"""
+import time
+
+from utils.eventLog import event_log
+from utils.metrics import registry
+from utils.queryStats import track as track_queries
+
+
+REQUESTS_TOTAL = registry.counter(
+    "http_requests_total", "HTTP requests by route, method and status", ("route", "method", "status")
+)
+REQUESTS_IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled"
+)
+REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route, method and status",
+    ("route", "method", "status")
+)
+REQUEST_DB_QUERIES = registry.histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request", ("route", "method"),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_DURATION = registry.histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL per HTTP request", ("route", "method")
+)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    """
+    串流回應以最後一個 body chunk 送出的時間計算延遲。
+    query_headers 開啟時在回應加上 X-DB-Query-Count / X-DB-Query-Time-Ms（送出標頭當下的累計）。
+    """
+
+    def __init__(self, app, exclude: tuple = ("/metrics",), query_headers: bool = False):
+        self.app = app
+        self.exclude = frozenset(exclude)
+        self.query_headers = query_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.query_headers:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(queries.count).encode()),
+                        (b"x-db-query-time-ms", f"{queries.duration * 1000:.3f}".encode()),
+                    ]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        try:
+            with track_queries() as queries:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            elapsed = time.perf_counter() - started
+            route = _route_template(scope)
+            labels = (route, scope["method"], str(status))
+            REQUESTS_TOTAL.inc(labels)
+            REQUEST_DURATION.observe(elapsed, labels)
+            REQUEST_DB_QUERIES.observe(queries.count, labels[:2])
+            REQUEST_DB_DURATION.observe(queries.duration, labels[:2])
+            if event_log.enabled:
+                event_log.event(
+                    "request", route=route, method=labels[1], status=status,
+                    duration_ms=round(elapsed * 1000, 3), db_queries=queries.count,
+                    db_ms=round(queries.duration * 1000, 3)
+                )
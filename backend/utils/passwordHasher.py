@@ -0,0 +1,110 @@
+"""
+密碼雜湊
+
+使用標準函式庫的 scrypt，雜湊與驗證都在有上限的 thread / process pool 中執行，
+不會卡住 event loop。登入時若雜湊參數已過時、或資料庫中仍是明文，會順便重新雜湊。
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+PREFIX = "scrypt"
+
+
+def _b64encode(value: bytes) -> str:
+    return base64.b64encode(value).decode().rstrip("=")
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(
+        password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p + (1 << 20), dklen=32
+    )
+
+
+def hash_password(password: str, n: int, r: int, p: int) -> str:
+    """
+    回傳 scrypt$n$r$p$salt$hash 格式的雜湊
+    """
+    salt = os.urandom(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"{PREFIX}${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(password: str, stored: str) -> bool:
+    """
+    驗證密碼；尚未雜湊的明文資料以固定時間比較
+    """
+    if not stored.startswith(PREFIX + "$"):
+        return hmac.compare_digest(password.encode(), stored.encode())
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        expected = _b64decode(digest)
+        actual = _scrypt(password, _b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+class PasswordHasher:
+    """
+    在 worker pool 中執行的雜湊服務，同時等待中的工作最多 max_pending 個
+    """
+
+    def __init__(self, n: int, r: int, p: int, workers: int, max_pending: int, use_processes: bool = False):
+        self.n = n
+        self.r = r
+        self.p = p
+        self.workers = workers
+        self.use_processes = use_processes
+        self._slots = asyncio.Semaphore(max_pending)
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.use_processes:
+                # process pool 只在設定時才載入
+                from concurrent.futures import ProcessPoolExecutor
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+        return self._executor
+
+    async def _run(self, func, *args):
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password, self.n, self.r, self.p)
+
+    async def verify(self, password: str, stored: str) -> bool:
+        return await self._run(verify_password, password, stored)
+
+    def needs_rehash(self, stored: str) -> bool:
+        """
+        明文或雜湊參數與目前設定不同時需要重新雜湊
+        """
+        return not stored.startswith(f"{PREFIX}${self.n}${self.r}${self.p}$")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    n=int(os.getenv('PASSWORD_SCRYPT_N', str(2 ** 14))),
+    r=int(os.getenv('PASSWORD_SCRYPT_R', '8')),
+    p=int(os.getenv('PASSWORD_SCRYPT_P', '1')),
+    workers=int(os.getenv('PASSWORD_HASH_WORKERS', '2')),
+    max_pending=int(os.getenv('PASSWORD_HASH_MAX_PENDING', '64')),
+    use_processes=os.getenv('PASSWORD_HASH_POOL', 'thread') == 'process',
+)
@@ -0,0 +1,282 @@
+"""
+批次匯入產品
+
+逐行解析串流上傳的 NDJSON / CSV，以 ProductFormData 驗證，每 chunk_size 筆
+在同一個 transaction 內 bulk_create。記憶體用量只和 chunk_size 有關，與上傳大小無關。
+CSV 以同一個 csv.reader 解析整個串流，引號內的換行屬於同一筆資料。
+"""
+import csv
+import json
+import os
+from collections import deque
+
+from pydantic import ValidationError
+from tortoise.exceptions import IntegrityError
+from tortoise.transactions import in_transaction
+
+from models.listModel import ListModel, ProductModel
+from schemas.productSchema import ProductFormData
+from utils.idAllocator import id_allocator
+from utils.listVersions import bump_lists
+from utils.changeFeed import publish_list_event
+from utils.productSearch import product_search
+
+
+FORMATS = {
+    "application/x-ndjson": "ndjson",
+    "application/json": "ndjson",
+    "text/csv": "csv",
+}
+
+# 單行（CSV 為單筆資料）的長度上限：沒有換行的超大上傳不會讓緩衝區無限成長
+MAX_LINE_BYTES = int(os.getenv('IMPORT_MAX_LINE_BYTES', '65536'))
+
+
+async def iter_lines(stream, max_line: int = None, skip_blank: bool = True):
+    """
+    把 bytes 串流切成 (行號, bytes)，skip_blank 時略過空白行
+
+    超過 max_line bytes 的行回傳 (行號, None)，其餘內容丟棄到下一個換行為止，緩衝區不會超過 max_line
+    """
+    max_line = max_line or MAX_LINE_BYTES
+    buffer = bytearray()
+    too_long = False
+    line_no = 0
+    async for chunk in stream:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                if not too_long:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line:
+                        too_long = True
+                        buffer.clear()
+                break
+            line_no += 1
+            if not too_long:
+                buffer += chunk[start:end]
+            if too_long or len(buffer) > max_line:
+                yield line_no, None
+            elif not skip_blank or buffer.strip():
+                yield line_no, bytes(buffer)
+            buffer.clear()
+            too_long = False
+            start = end + 1
+    if too_long:
+        yield line_no + 1, None
+    elif buffer.strip():
+        yield line_no + 1, bytes(buffer)
+
+
+def decode_line(line_no: int, line: bytes) -> str:
+    """
+    以 UTF-8 解碼一行；第一行去除 Excel 等工具加上的 BOM。無法解碼時拋出 UnicodeDecodeError
+    """
+    return line.decode("utf-8-sig" if line_no == 1 else "utf-8").rstrip("\r")
+
+
+class _LineFeed:
+    """
+    csv.reader 的輸入：只在累積到完整的一筆資料後才讓 reader 讀取
+    """
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_csv_records(stream):
+    """
+    解析 CSV，產生 (起始行號, dict 或 錯誤訊息)；一筆資料可以跨越多行
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    header = None
+    start, size, quotes = None, 0, 0
+    async for line_no, raw in iter_lines(stream, skip_blank=False):
+        if start is None:
+            if raw is not None and not raw.strip():
+                continue
+            start = line_no
+        error = None
+        if raw is None or size + len(raw) > MAX_LINE_BYTES:
+            error = f"record longer than {MAX_LINE_BYTES} bytes"
+        else:
+            try:
+                line = decode_line(line_no, raw)
+            except UnicodeDecodeError:
+                error = "line is not valid UTF-8"
+        if error is not None:
+            if header is None:
+                # 沒有可用的標題列，之後每一行都會回報缺少欄位
+                header = []
+            feed.lines.clear()
+            yield start, error
+            start, size, quotes = None, 0, 0
+            continue
+        feed.lines.append(line + "\n")
+        size += len(raw) + 1
+        quotes += line.count('"')
+        if quotes % 2:
+            # 引號還沒結束，這筆資料延續到下一行
+            continue
+        values = next(reader)
+        if header is None:
+            header = values
+        else:
+            # 空白欄位視為未填
+            yield start, {key: value for key, value in zip(header, values) if value != ""}
+        start, size, quotes = None, 0, 0
+    if start is not None:
+        yield start, "unterminated quoted field"
+
+
+async def iter_records(stream, fmt: str):
+    """
+    解析每一行，產生 (行號, dict 或 錯誤訊息)
+    """
+    if fmt == "csv":
+        async for item in iter_csv_records(stream):
+            yield item
+        return
+    async for line_no, raw in iter_lines(stream):
+        if raw is None:
+            yield line_no, f"line longer than {MAX_LINE_BYTES} bytes"
+            continue
+        try:
+            line = decode_line(line_no, raw)
+        except UnicodeDecodeError:
+            yield line_no, "line is not valid UTF-8"
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, "invalid JSON"
+            continue
+        yield line_no, record if isinstance(record, dict) else "row must be a JSON object"
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" for item in error.errors()
+    )
+
+
+class ProductImporter:
+    """
+    單次上傳的匯入流程，結果逐行寫入 out（NDJSON）
+    """
+
+    def __init__(self, user, chunk_size: int, out):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.out = out
+        self.inserted = 0
+        self.failed = 0
+        self._list_ids = {}
+
+    def _report(self, line_no: int, error: str = None, product_id: str = None):
+        if error is None:
+            self.inserted += 1
+            result = {"line": line_no, "success": True, "id": product_id}
+        else:
+            self.failed += 1
+            result = {"line": line_no, "success": False, "error": error}
+        self.out.write(json.dumps(result, ensure_ascii=False).encode() + b"\n")
+
+    async def _resolve_lists(self, names: set):
+        """
+        一次查出這批資料中尚未解析過的清單
+        """
+        missing = names - self._list_ids.keys()
+        if not missing:
+            return
+        rows = await ListModel.filter(f_user_uid=self.user, list_name__in=missing)\
+            .values_list("list_name", "id")
+        self._list_ids.update(dict(rows))
+        for name in missing - self._list_ids.keys():
+            self._list_ids[name] = None
+
+    async def _flush(self, batch: list):
+        await self._resolve_lists({data.list_name for _, data in batch})
+        rows = []
+        for line_no, data in batch:
+            if self._list_ids[data.list_name] is None:
+                self._report(line_no, error=f"List '{data.list_name}' not found")
+            else:
+                rows.append((line_no, data))
+        if not rows:
+            return
+
+        ids = await id_allocator.reserve(ProductModel, len(rows))
+        instances = [
+            ProductModel(
+                id=table_id,
+                f_user_uid_id=self.user.user_uid,
+                f_list_uid_id=self._list_ids[data.list_name],
+                product_name=data.product_name,
+                product_barcode=data.product_barcode,
+                expiry_date=data.expiry_date,
+                description=data.description,
+                product_image_url=f'http://domainaname/image/product/{table_id}',
+            )
+            for table_id, (_, data) in zip(ids, rows)
+        ]
+        try:
+            async with in_transaction("default") as conn:
+                await ProductModel.bulk_create(instances, using_db=conn)
+                await bump_lists({instance.f_list_uid_id for instance in instances}, using_db=conn)
+        except IntegrityError:
+            # 整批失敗時逐筆重試，找出衝突的資料列
+            created = []
+            for instance, (line_no, _) in zip(instances, rows):
+                try:
+                    await instance.save(force_create=True)
+                except IntegrityError as e:
+                    self._report(line_no, error=f"Database error: {e}")
+                else:
+                    self._report(line_no, product_id=instance.id)
+                    created.append(instance)
+            await bump_lists({instance.f_list_uid_id for instance in instances})
+            await self._publish(created)
+            return
+        for instance, (line_no, _) in zip(instances, rows):
+            self._report(line_no, product_id=instance.id)
+        await self._publish(instances)
+
+    async def _publish(self, instances: list):
+        grouped = {}
+        for instance in instances:
+            grouped.setdefault(instance.f_list_uid_id, []).append(instance.id)
+        for list_id, product_ids in grouped.items():
+            await publish_list_event(self.user.user_uid, list_id, "products_created", product_ids=product_ids)
+        product_search.products_added(self.user.user_uid, instances)
+
+    async def run(self, stream, fmt: str):
+        """
+        匯入整個串流，回傳 (成功筆數, 失敗筆數)
+        """
+        batch = []
+        async for line_no, record in iter_records(stream, fmt):
+            if isinstance(record, str):
+                self._report(line_no, error=record)
+                continue
+            try:
+                batch.append((line_no, ProductFormData(**record)))
+            except ValidationError as e:
+                self._report(line_no, error=_validation_message(e))
+                continue
+            if len(batch) >= self.chunk_size:
+                await self._flush(batch)
+                batch = []
+        if batch:
+            await self._flush(batch)
+        return self.inserted, self.failed
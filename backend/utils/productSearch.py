@@ -0,0 +1,446 @@
+"""
+產品搜尋
+
+每個使用者一份記憶體內的倒排索引（名稱、條碼、描述）。第一次搜尋時讀取使用者的所有產品建立，
+之後由新增 / 匯入 / 刪除 / 移動等寫入路徑在資料寫入後增量更新，搜尋本身不查詢資料庫。
+
+- 文字以 NFKC + casefold 正規化後切成詞；中日韓文字沒有空白分詞，以單字與相鄰兩字作為詞
+- 查詢詞可以完全符合、前綴符合（至少 MIN_PREFIX 個字元），英數詞另可依 trigram 相似度容忍拼錯
+- 符合越多查詢詞的產品排越前面，其次是欄位權重與符合方式的分數；只取前 limit 筆
+
+前綴與模糊比對展開的詞數、以及計算分數的產品數都有上限，搜尋成本不隨使用者的產品總數增加；
+符合的產品超過上限時結果只取其中一部分排序，輸入更多字即可縮小範圍。
+索引只存在於單一 process，其他 process 的寫入在索引過期（ttl 秒）重建後才看得到。
+"""
+import asyncio
+import bisect
+import heapq
+import os
+import re
+import time
+import unicodedata
+from collections import Counter
+
+from utils.listReader import fetch_user_products, fetch_list_names
+from utils.metrics import registry
+from utils.ttlCache import TTLCache
+
+
+INDEX_TOTAL = registry.counter(
+    "product_search_index_total", "Search index lookups by result (hit, wait, build)", ("result",)
+)
+BUILD_SECONDS = registry.histogram("product_search_build_seconds", "Time to build a user's search index")
+
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_WORDS = re.compile(f"[{_CJK}]+|[^\\W_{_CJK}]+")
+_CJK_CHAR = re.compile(f"[{_CJK}]")
+
+# 符合方式的權重
+EXACT = 1.0
+PREFIX = 0.7
+FUZZY = 0.5
+
+MIN_PREFIX = 2
+MIN_FUZZY = 4
+FUZZY_SIMILARITY = 0.5
+# 一個查詢詞最多展開成幾個前綴 / 模糊符合的詞
+MAX_EXPANSIONS = 64
+# 最多為幾個產品計算分數；查詢詞符合的產品更多時，只保留權重較高的符合中先遇到的產品
+MAX_CANDIDATES = 2000
+
+# 產品資料列：(id, 清單 id, 名稱, 條碼, 描述, 到期日, 圖片網址)
+ID, LIST_ID, NAME, BARCODE, DESCRIPTION, EXPIRY_DATE, IMAGE_URL = range(7)
+
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFKC", text or "").casefold()
+
+
+def _is_cjk(word: str) -> bool:
+    return _CJK_CHAR.match(word) is not None
+
+
+def _bigrams(word: str) -> list:
+    return [word[index:index + 2] for index in range(len(word) - 1)]
+
+
+def text_terms(text: str) -> set:
+    """
+    索引用的詞：英數詞整個保留，中日韓文字取單字與相鄰兩字
+    """
+    terms = set()
+    for word in _WORDS.findall(normalize(text)):
+        if _is_cjk(word):
+            terms.update(word)
+            terms.update(_bigrams(word))
+        else:
+            terms.add(word)
+    return terms
+
+
+def barcode_terms(barcode: str) -> set:
+    barcode = normalize(barcode).strip()
+    return {barcode} if barcode else set()
+
+
+def query_terms(text: str) -> list:
+    """
+    查詢詞（去除重複並保持順序）；兩個字以上的中日韓文字以相鄰兩字查詢
+    """
+    terms = []
+    for word in _WORDS.findall(normalize(text)):
+        if _is_cjk(word) and len(word) > 1:
+            terms.extend(_bigrams(word))
+        else:
+            terms.append(word)
+    return list(dict.fromkeys(terms))
+
+
+def trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class _Field:
+    """
+    一個欄位的倒排索引：詞 -> 產品 id 集合；另有排序過的英數詞表（前綴）與詞的 trigram（模糊比對）
+    """
+
+    def __init__(self, column: int, weight: float, analyzer, fuzzy: bool):
+        self.column = column
+        self.weight = weight
+        self.analyzer = analyzer
+        self.fuzzy = fuzzy
+        self.postings = {}
+        self._vocabulary = []
+        # trigram -> 詞集合，以及每個詞的 trigram 數
+        self._grams = {}
+        self._gram_counts = {}
+
+    def add(self, product_id: str, text: str):
+        for term in self.analyzer(text):
+            product_ids = self.postings.get(term)
+            if product_ids is None:
+                product_ids = self.postings[term] = set()
+                self._add_term(term)
+            product_ids.add(product_id)
+
+    def remove(self, product_id: str, text: str):
+        for term in self.analyzer(text):
+            product_ids = self.postings.get(term)
+            if product_ids is None:
+                continue
+            product_ids.discard(product_id)
+            if not product_ids:
+                del self.postings[term]
+                self._remove_term(term)
+
+    def _add_term(self, term: str):
+        if _is_cjk(term):
+            return
+        bisect.insort(self._vocabulary, term)
+        if self.fuzzy and len(term) >= MIN_FUZZY:
+            grams = trigrams(term)
+            self._gram_counts[term] = len(grams)
+            for gram in grams:
+                self._grams.setdefault(gram, set()).add(term)
+
+    def _remove_term(self, term: str):
+        if _is_cjk(term):
+            return
+        del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+        if self.fuzzy and len(term) >= MIN_FUZZY:
+            del self._gram_counts[term]
+            for gram in trigrams(term):
+                terms = self._grams[gram]
+                terms.discard(term)
+                if not terms:
+                    del self._grams[gram]
+
+    def matches(self, term: str) -> list:
+        """
+        完全符合與前綴符合的 (索引詞, 權重)
+        """
+        found = [(term, EXACT)] if term in self.postings else []
+        if _is_cjk(term) or len(term) < MIN_PREFIX:
+            return found
+        start = bisect.bisect_left(self._vocabulary, term)
+        for candidate in self._vocabulary[start:start + MAX_EXPANSIONS + 1]:
+            if not candidate.startswith(term):
+                break
+            if candidate != term:
+                found.append((candidate, PREFIX))
+        return found
+
+    def similar(self, term: str) -> list:
+        """
+        trigram 相似度夠高、但不是以 term 開頭的 (索引詞, 權重)
+        """
+        if not self.fuzzy or _is_cjk(term) or len(term) < MIN_FUZZY:
+            return []
+        grams = trigrams(term)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        similar = []
+        # Jaccard 相似度不會超過 count / len(grams)，共同 trigram 太少的詞不必計算
+        least = FUZZY_SIMILARITY * len(grams)
+        for candidate, count in shared.items():
+            if count < least or candidate.startswith(term):
+                continue
+            similarity = count / (len(grams) + self._gram_counts[candidate] - count)
+            if similarity >= FUZZY_SIMILARITY:
+                similar.append((similarity, candidate))
+        return [
+            (candidate, FUZZY * similarity)
+            for similarity, candidate in heapq.nlargest(MAX_EXPANSIONS, similar)
+        ]
+
+
+class StaleIndex(Exception):
+    """
+    增量更新需要索引中沒有的資料（例如其他 process 建立的清單），索引需要重建
+    """
+
+
+class UserIndex:
+    """
+    單一使用者的產品索引
+    """
+
+    def __init__(self, list_names: dict, rows=()):
+        self.list_names = dict(list_names)
+        self.products = {}
+        self.by_list = {}
+        self.fields = (
+            _Field(NAME, 3.0, text_terms, fuzzy=True),
+            _Field(BARCODE, 3.0, barcode_terms, fuzzy=False),
+            _Field(DESCRIPTION, 1.0, text_terms, fuzzy=True),
+        )
+        # 讀取清單名稱前被刪除的清單，其中的產品也已經被刪除
+        self.add([row for row in rows if row[LIST_ID] in self.list_names])
+
+    def __len__(self):
+        return len(self.products)
+
+    def add(self, rows):
+        for row in rows:
+            if row[LIST_ID] not in self.list_names:
+                raise StaleIndex(row[LIST_ID])
+            row = tuple(row)
+            self.remove([row[ID]])
+            self.products[row[ID]] = row
+            self.by_list.setdefault(row[LIST_ID], set()).add(row[ID])
+            for field in self.fields:
+                field.add(row[ID], row[field.column])
+
+    def remove(self, product_ids):
+        for product_id in product_ids:
+            row = self.products.pop(product_id, None)
+            if row is None:
+                continue
+            self.by_list[row[LIST_ID]].discard(product_id)
+            for field in self.fields:
+                field.remove(product_id, row[field.column])
+
+    def move(self, product_ids, list_id: str):
+        if list_id not in self.list_names:
+            raise StaleIndex(list_id)
+        for product_id in product_ids:
+            row = self.products.get(product_id)
+            if row is None:
+                continue
+            self.by_list[row[LIST_ID]].discard(product_id)
+            self.by_list.setdefault(list_id, set()).add(product_id)
+            self.products[product_id] = (*row[:LIST_ID], list_id, *row[LIST_ID + 1:])
+
+    def set_image(self, product_id: str, image_url: str):
+        row = self.products.get(product_id)
+        if row is not None:
+            self.products[product_id] = (*row[:IMAGE_URL], image_url)
+
+    def add_list(self, list_id: str, list_name: str):
+        self.list_names[list_id] = list_name
+
+    def remove_list(self, list_id: str):
+        self.remove(list(self.by_list.get(list_id, ())))
+        self.by_list.pop(list_id, None)
+        self.list_names.pop(list_id, None)
+
+    def search(self, text: str, limit: int) -> list:
+        """
+        前 limit 筆符合的產品：(id, 名稱, 到期日, 圖片網址, 清單名稱)
+        """
+        hits = {}
+        scores = {}
+        # 先處理符合產品最少的查詢詞，候選產品額滿後其他詞只用來替候選產品加分
+        for matched in sorted(
+            (self._term_matches(term, limit) for term in query_terms(text)),
+            key=lambda matched: sum(len(product_ids) for _, product_ids in matched),
+        ):
+            # 同一個查詢詞只取每個產品最好的一次符合
+            best = {}
+            room = MAX_CANDIDATES - len(scores)
+            for weight, product_ids in matched:
+                room = _collect(best, weight, product_ids, scores, room)
+            for product_id, weight in best.items():
+                hits[product_id] = hits.get(product_id, 0) + 1
+                scores[product_id] = scores.get(product_id, 0.0) + weight
+        # 同分時名稱較短（多出的字較少）的排前面
+        top = heapq.nlargest(limit, scores, key=lambda product_id: (
+            hits[product_id], scores[product_id], -len(self.products[product_id][NAME])
+        ))
+        return [self._result(self.products[product_id]) for product_id in top]
+
+    def _term_matches(self, term: str, limit: int) -> list:
+        """
+        查詢詞符合的 (權重, 產品 id 集合)，權重高的在前；完全與前綴符合不到 limit 個產品時才做模糊比對
+        """
+        matched = [
+            (weight * field.weight, field.postings[index_term])
+            for field in self.fields for index_term, weight in field.matches(term)
+        ]
+        if sum(len(product_ids) for _, product_ids in matched) < limit:
+            matched.extend(
+                (weight * field.weight, field.postings[index_term])
+                for field in self.fields for index_term, weight in field.similar(term)
+            )
+        matched.sort(key=lambda item: item[0], reverse=True)
+        return matched
+
+    def _result(self, row: tuple) -> tuple:
+        return row[ID], row[NAME], row[EXPIRY_DATE], row[IMAGE_URL], self.list_names[row[LIST_ID]]
+
+
+def _collect(best: dict, weight: float, product_ids: set, scores: dict, room: int) -> int:
+    """
+    把 product_ids 以 weight 計入 best；不是候選的產品最多再加入 room 個，回傳剩下的 room
+    """
+    if len(product_ids) <= room:
+        for product_id in product_ids:
+            if product_id not in best and product_id not in scores:
+                room -= 1
+            if best.get(product_id, 0.0) < weight:
+                best[product_id] = weight
+        return room
+    # 已經是候選的產品照常計分，從較小的一邊逐一檢查
+    candidates = scores.keys() | best.keys()
+    if len(candidates) < len(product_ids):
+        hits = [product_id for product_id in candidates if product_id in product_ids]
+    else:
+        hits = [product_id for product_id in product_ids if product_id in candidates]
+    for product_id in hits:
+        if best.get(product_id, 0.0) < weight:
+            best[product_id] = weight
+    for product_id in product_ids:
+        if room <= 0:
+            break
+        if product_id not in candidates:
+            best[product_id] = weight
+            room -= 1
+    return room
+
+
+def product_row(instance) -> tuple:
+    return (
+        instance.id, instance.f_list_uid_id, instance.product_name, instance.product_barcode,
+        instance.description, instance.expiry_date, instance.product_image_url,
+    )
+
+
+class ProductSearch:
+    """
+    user_uid -> UserIndex；超過 maxsize 個使用者時淘汰最久未搜尋的索引
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._indexes = TTLCache(maxsize, ttl=ttl)
+        # 建立中的索引：user_uid -> (等待建立完成的 future, 建立期間發生的變更)
+        self._building = {}
+
+    async def search(self, user_uid: str, text: str, limit: int, connection_name: str = "default") -> list:
+        index = await self.index(user_uid, connection_name)
+        return index.search(text, limit)
+
+    async def index(self, user_uid: str, connection_name: str = "default") -> UserIndex:
+        index = self._indexes.get(user_uid)
+        if index is not None:
+            INDEX_TOTAL.inc(("hit",))
+            return index
+        building = self._building.get(user_uid)
+        if building is not None:
+            INDEX_TOTAL.inc(("wait",))
+            return await asyncio.shield(building[0])
+
+        INDEX_TOTAL.inc(("build",))
+        future = asyncio.get_running_loop().create_future()
+        changes = []
+        self._building[user_uid] = (future, changes)
+        started = time.perf_counter()
+        try:
+            # 先讀產品再讀清單：讀取期間刪除的清單，其中的產品會在建立索引時略過
+            rows = await fetch_user_products(user_uid, connection_name)
+            index = UserIndex(await fetch_list_names(user_uid, connection_name), rows)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 沒有其他請求在等待時不要留下未讀取的例外
+            future.exception()
+            raise
+        finally:
+            del self._building[user_uid]
+        BUILD_SECONDS.observe(time.perf_counter() - started)
+
+        # 讀取期間的變更可能已經包含在讀到的資料中，重新套用一次的結果相同
+        try:
+            for change, args in changes:
+                change(index, *args)
+        except StaleIndex:
+            pass
+        else:
+            self._indexes.set(user_uid, index)
+        future.set_result(index)
+        return index
+
+    def _apply(self, user_uid: str, change, *args):
+        building = self._building.get(user_uid)
+        if building is not None:
+            building[1].append((change, args))
+        index = self._indexes.get(user_uid)
+        if index is None:
+            return
+        try:
+            change(index, *args)
+        except StaleIndex:
+            self._indexes.pop(user_uid)
+
+    # 以下由寫入路徑在資料寫入（commit）之後呼叫
+
+    def products_added(self, user_uid: str, instances):
+        self._apply(user_uid, UserIndex.add, [product_row(instance) for instance in instances])
+
+    def products_removed(self, user_uid: str, product_ids):
+        self._apply(user_uid, UserIndex.remove, list(product_ids))
+
+    def products_moved(self, user_uid: str, product_ids, list_id: str):
+        self._apply(user_uid, UserIndex.move, list(product_ids), list_id)
+
+    def image_changed(self, user_uid: str, product_id: str, image_url: str):
+        self._apply(user_uid, UserIndex.set_image, product_id, image_url)
+
+    def list_created(self, user_uid: str, list_id: str, list_name: str):
+        self._apply(user_uid, UserIndex.add_list, list_id, list_name)
+
+    def list_removed(self, user_uid: str, list_id: str):
+        self._apply(user_uid, UserIndex.remove_list, list_id)
+
+    def user_removed(self, user_uid: str):
+        self._indexes.pop(user_uid)
+
+
+product_search = ProductSearch(
+    maxsize=int(os.getenv('PRODUCT_SEARCH_CACHE_SIZE', '256')),
+    ttl=float(os.getenv('PRODUCT_SEARCH_TTL_SECONDS', '300')),
+)
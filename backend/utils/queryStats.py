@@ -0,0 +1,147 @@
+"""
+SQL 查詢統計
+
+install() 包裝 Tortoise 各資料庫 client 的 execute_* 方法，計算每個 SQL 的次數與耗時：
+- 全域：db_queries_total / db_query_duration_seconds 指標
+- 超過 SLOW_QUERY_MS 的查詢以正規化後的 SQL 寫入日誌
+- track() 範圍內（例如單一請求）的累計，供 debug 標頭與 assert_max_queries 使用
+
+範圍以 contextvar 傳遞，同一請求中以 asyncio.gather 建立的子工作也會計入。
+"""
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+from utils.eventLog import event_log
+from utils.metrics import registry
+
+
+EXECUTE_METHODS = ("execute_query", "execute_query_dict", "execute_insert", "execute_many", "execute_script")
+
+QUERIES_TOTAL = registry.counter("db_queries_total", "SQL statements executed", ("operation",))
+QUERY_DURATION = registry.histogram(
+    "db_query_duration_seconds", "SQL statement latency", ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+SLOW_QUERY_SECONDS = float(os.getenv('SLOW_QUERY_MS', '200')) / 1000
+
+_scopes = ContextVar("query_scopes", default=())
+# 避免同一個呼叫內部再呼叫其他 execute_* 時重複計算
+_executing = ContextVar("query_executing", default=False)
+
+_LITERALS = re.compile(r'"(?:[^"]|"")*"|\'(?:[^\']|\'\')*\'|\$\d+|\?\d*|\b\d+(?:\.\d+)?\b')
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_sql(query: str) -> str:
+    """
+    把常數與參數換成 ?（保留雙引號內的識別字），IN 清單縮成 (?...)，讓同一種查詢得到相同字串
+    """
+    query = _LITERALS.sub(lambda match: match.group() if match.group()[0] == '"' else "?", query)
+    query = _IN_LIST.sub("(?...)", query)
+    return _SPACES.sub(" ", query).strip()
+
+
+def _operation(query: str) -> str:
+    head = query.lstrip()[:6].upper()
+    for name in ("SELECT", "INSERT", "UPDATE", "DELETE"):
+        if head == name:
+            return name.lower()
+    return "other"
+
+
+class QueryStats:
+    """
+    一個統計範圍內的查詢次數與總耗時
+    """
+
+    def __init__(self, keep_statements: bool = False):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = [] if keep_statements else None
+
+    def record(self, query: str, elapsed: float):
+        self.count += 1
+        self.duration += elapsed
+        if self.statements is not None:
+            self.statements.append(normalize_sql(query))
+
+
+@contextmanager
+def track(keep_statements: bool = False):
+    """
+    在範圍內統計查詢，可巢狀使用，外層範圍也會計入內層的查詢
+    """
+    stats = QueryStats(keep_statements)
+    token = _scopes.set(_scopes.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _scopes.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int):
+    """
+    範圍內的查詢次數超過 limit 時丟出 AssertionError，並列出執行過的 SQL
+
+        with assert_max_queries(2):
+            await client.post("/api/create_product", ...)
+    """
+    with track(keep_statements=True) as stats:
+        yield stats
+    if stats.count > limit:
+        listing = "\n".join(f"  {index}. {sql}" for index, sql in enumerate(stats.statements, 1))
+        raise AssertionError(f"expected at most {limit} queries, executed {stats.count}:\n{listing}")
+
+
+def _record(query: str, elapsed: float):
+    operation = _operation(query)
+    QUERIES_TOTAL.inc((operation,))
+    QUERY_DURATION.observe(elapsed, (operation,))
+    for stats in _scopes.get():
+        stats.record(query, elapsed)
+    if elapsed >= SLOW_QUERY_SECONDS:
+        event_log.warning("slow_query", sql=normalize_sql(query), duration_ms=round(elapsed * 1000, 3))
+
+
+def _wrap(method):
+    async def wrapper(self, query, *args, **kwargs):
+        if _executing.get():
+            return await method(self, query, *args, **kwargs)
+        token = _executing.set(True)
+        started = time.perf_counter()
+        try:
+            return await method(self, query, *args, **kwargs)
+        finally:
+            _executing.reset(token)
+            _record(query, time.perf_counter() - started)
+
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    wrapper.__wrapped__ = method
+    wrapper._query_stats = True
+    return wrapper
+
+
+def _subclasses(cls):
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def install():
+    """
+    包裝目前已載入的所有 client 類別（在 Tortoise 初始化連線之後呼叫），重複呼叫不會重複包裝
+    """
+    for cls in (BaseDBAsyncClient, *_subclasses(BaseDBAsyncClient)):
+        for name in EXECUTE_METHODS:
+            method = cls.__dict__.get(name)
+            if method is not None and not getattr(method, "_query_stats", False):
+                setattr(cls, name, _wrap(method))
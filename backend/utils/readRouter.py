@@ -0,0 +1,56 @@
+"""
+讀寫分離
+
+唯讀查詢預設走 replica；使用者剛寫入資料後的一段時間內（STICKY_SECONDS），
+他的讀取改走主資料庫，避免因 replication lag 看不到自己剛新增或刪除的資料。
+
+寫入紀錄只存在各 worker 的記憶體中，多 worker 部署時視窗應大於 replica 的延遲，
+且同一使用者的請求最好由同一個 worker 處理（sticky session）。
+"""
+import os
+
+import config
+from utils.metrics import registry
+from utils.ttlCache import TTLCache
+
+
+READS_TOTAL = registry.counter(
+    "db_read_routing_total", "Read queries routed to each connection", ("connection",)
+)
+
+
+class ReadRouter:
+    """
+    決定唯讀查詢使用的連線名稱
+    """
+
+    def __init__(self, read_connection: str = None, write_connection: str = "default",
+                 sticky_seconds: float = 5, maxsize: int = 100000):
+        self.read_connection = read_connection
+        self.write_connection = write_connection
+        self._recent_writes = TTLCache(maxsize, ttl=sticky_seconds)
+
+    def mark_write(self, user_uid: str):
+        """
+        記錄使用者剛寫入資料
+        """
+        if self.read_connection is not None:
+            self._recent_writes.set(user_uid, True)
+
+    def connection_for(self, user_uid: str) -> str:
+        """
+        使用者 user_uid 這次讀取要使用的連線
+        """
+        if self.read_connection is None or self._recent_writes.get(user_uid):
+            name = self.write_connection
+        else:
+            name = self.read_connection
+        READS_TOTAL.inc((name,))
+        return name
+
+
+read_router = ReadRouter(
+    read_connection=config.READ_CONNECTION,
+    sticky_seconds=float(os.getenv('DB_READ_STICKY_SECONDS', '5')),
+    maxsize=int(os.getenv('DB_READ_STICKY_CACHE_SIZE', '100000')),
+)
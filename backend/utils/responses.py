@@ -0,0 +1,63 @@
+"""
+以 orjson 編碼的回應類別
+
+orjson 可直接處理 tuple、date、datetime，handler 不需要先轉成 Python list / 字串。
+"""
+import orjson
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    預設的回應類別
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+class JSONArrayStreamingResponse(StreamingResponse):
+    """
+    把非同步產生的每一頁資料列依序編碼成同一個 JSON 陣列，不需要整份結果都在記憶體中
+    """
+
+    def __init__(self, pages, status_code: int = 200, headers: dict = None):
+        super().__init__(
+            self._encode(pages), status_code=status_code, headers=headers, media_type="application/json"
+        )
+
+    @staticmethod
+    async def _encode(pages):
+        yield b"["
+        first = True
+        async for rows in pages:
+            if not rows:
+                continue
+            body = orjson.dumps(rows)[1:-1]
+            yield body if first else b"," + body
+            first = False
+        yield b"]"
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    If-None-Match 是否符合 etag（弱比較，忽略 W/ 前綴）
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == target for tag in if_none_match.split(","))
+
+
+def conditional_file_response(request, path: str, etag: str, media_type: str, cache_control: str) -> Response:
+    """
+    If-None-Match 符合時回傳 304，否則回傳 FileResponse
+
+    FileResponse 會處理 Range / If-Range，伺服器支援 http.response.pathsend 時以 sendfile 傳送。
+    """
+    headers = {"etag": etag, "cache-control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -0,0 +1,65 @@
+"""
+啟動模式
+
+APP_MODE=dev  啟動時以 generate_schemas 建立缺少的資料表（本機開發）
+APP_MODE=prod 不產生 schema，只確認資料庫已套用到最新的 aerich migration，
+              並在開始服務前先建立連線池，讓第一個請求不需要等待連線
+"""
+import os
+
+from tortoise import connections
+
+from utils.listReader import fetch_rows
+
+
+MODES = ("dev", "prod")
+LATEST_APPLIED = 'SELECT "version" FROM "aerich" WHERE "app" = $1 ORDER BY "id" DESC LIMIT 1'
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations", "models")
+
+
+class MigrationMismatch(RuntimeError):
+    """
+    資料庫的 migration 版本與程式碼不一致
+    """
+
+
+def _version_key(name: str):
+    stem = os.path.splitext(os.path.basename(name))[0]
+    prefix = stem.split("_", 1)[0]
+    return (int(prefix) if prefix.isdigit() else -1, stem)
+
+
+def latest_migration(directory: str = MIGRATIONS_DIR) -> str:
+    """
+    目錄中編號最大的 migration（不含副檔名）
+    """
+    names = [name for name in os.listdir(directory) if name.endswith(".py") and name[0].isdigit()]
+    if not names:
+        raise MigrationMismatch(f"No migrations found in {directory}")
+    return _version_key(max(names, key=_version_key))[1]
+
+
+async def verify_migration_head(app: str = "models", connection_name: str = "default",
+                                directory: str = MIGRATIONS_DIR):
+    """
+    確認 aerich 表中最後套用的版本就是最新的 migration，否則拋出 MigrationMismatch
+    """
+    expected = latest_migration(directory)
+    try:
+        rows = await fetch_rows(LATEST_APPLIED, [app], connection_name)
+    except Exception as e:
+        raise MigrationMismatch(f"Cannot read aerich migration table: {e}; run `aerich upgrade` first") from e
+    applied = _version_key(rows[0][0])[1] if rows else None
+    if applied != expected:
+        raise MigrationMismatch(
+            f"Database is at migration {applied!r} but the code expects {expected!r}; run `aerich upgrade`"
+        )
+    return applied
+
+
+async def prewarm_connections(names):
+    """
+    每個連線執行一次查詢，建立連線池
+    """
+    for name in names:
+        await connections.get(name).execute_query("SELECT 1")
@@ -0,0 +1,93 @@
+"""
+已驗證 JWT 與對應使用者的快取
+
+以 token 的 sha256 為 key，保存驗證過的 claims 與 UserModel，
+在 token 的 exp 到期；使用者被修改或刪除時主動失效。
+刪除帳號後，該使用者已簽發的 token 在到期前都視為撤銷。撤銷紀錄不受 maxsize 限制，
+到期前不會被淘汰；其他 process 在寫入前向資料庫確認 deleted_at 時得知並記錄撤銷（見 main.get_active_user）。
+"""
+import hashlib
+import os
+import time
+
+from tortoise.signals import post_delete, post_save
+
+from models.userModel import UserModel
+from utils.ttlCache import TTLCache
+
+
+class TokenCache:
+    """
+    token digest -> (claims, user)
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self._entries = TTLCache(maxsize, clock=time.time, on_evict=self._forget)
+        self._by_user = {}
+        # user_uid -> 撤銷到期時間（epoch 秒）
+        self._revoked = {}
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        """
+        回傳 (claims, user)，不存在或已過期時回傳 None
+        """
+        return self._entries.get(self.digest(token))
+
+    def put(self, token: str, claims: dict, user=None):
+        """
+        快取驗證結果，user 可以稍後再補上
+        """
+        key = self.digest(token)
+        self._entries.set(key, (claims, user), expires_at=claims.get("exp"))
+        self._by_user.setdefault(claims["sub"], set()).add(key)
+
+    def invalidate_user(self, user_uid: str):
+        """
+        移除某個使用者的所有快取
+        """
+        for key in list(self._by_user.get(user_uid, ())):
+            self._entries.pop(key)
+
+    def revoke_user(self, user_uid: str, until: float):
+        """
+        在 until（epoch 秒）之前拒絕這個使用者的所有 token
+        """
+        self.invalidate_user(user_uid)
+        now = time.time()
+        for expired in [uid for uid, expires_at in self._revoked.items() if expires_at <= now]:
+            del self._revoked[expired]
+        self._revoked[user_uid] = max(until, self._revoked.get(user_uid, 0))
+
+    def is_revoked(self, user_uid: str) -> bool:
+        until = self._revoked.get(user_uid)
+        if until is None:
+            return False
+        if until <= time.time():
+            del self._revoked[user_uid]
+            return False
+        return True
+
+    def _forget(self, key, value):
+        user_uid = value[0]["sub"]
+        keys = self._by_user.get(user_uid)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_uid]
+
+
+token_cache = TokenCache(maxsize=int(os.getenv('TOKEN_CACHE_SIZE', '10000')))
+
+
+@post_save(UserModel)
+async def _user_saved(sender, instance, created, using_db, update_fields):
+    token_cache.invalidate_user(instance.user_uid)
+
+
+@post_delete(UserModel)
+async def _user_deleted(sender, instance, using_db):
+    token_cache.invalidate_user(instance.user_uid)
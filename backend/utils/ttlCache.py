@@ -0,0 +1,70 @@
+"""
+有上限的 LRU 快取，每筆資料可設定到期時間
+"""
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    超過 maxsize 時淘汰最久未使用的資料；到期的資料在讀取時移除
+    """
+    _MISSING = object()
+
+    def __init__(self, maxsize: int, ttl: float = None, clock=time.monotonic, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, self._MISSING) is not self._MISSING
+
+    def get(self, key, default=None):
+        """
+        取得資料並標記為最近使用
+        """
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at is not None and expires_at <= self.clock():
+            self.pop(key)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, expires_at: float = None):
+        """
+        寫入資料，未指定 expires_at 時使用預設的 ttl
+        """
+        if expires_at is None and self.ttl is not None:
+            expires_at = self.clock() + self.ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            old_key, (old_value, _) = self._data.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(old_key, old_value)
+
+    def pop(self, key, default=None):
+        """
+        移除資料
+        """
+        item = self._data.pop(key, None)
+        if item is None:
+            return default
+        if self.on_evict is not None:
+            self.on_evict(key, item[0])
+        return item[0]
+
+    def clear(self):
+        """
+        清空快取
+        """
+        for key in list(self._data):
+            self.pop(key)
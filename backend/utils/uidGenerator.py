@@ -0,0 +1,129 @@
+"""
+user_uid 產生器
+
+以金鑰打亂的 Feistel 排列把遞增計數器映射到 6 位數 UID（100000 ~ 999999），
+排列是一對一的，不同計數器值必定得到不同 UID，註冊時不需要查詢資料庫確認是否重複。
+
+金鑰 USER_UID_KEY 必須設定，且所有 worker 相同、之後不能更換：沒有金鑰時排列是公開的，
+UID 可以被列舉；不同的金鑰會讓共用的計數器映射到已經分配過的 UID。
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+
+from models.userModel import UserModel
+from utils.idAllocator import BlockSequenceAllocator
+
+
+class MissingUidKey(RuntimeError):
+    """
+    沒有設定 USER_UID_KEY
+    """
+
+
+class UidSpaceExhausted(Exception):
+    """
+    6 位數 UID 已全部分配完畢
+    """
+
+
+class UidGenerator:
+    """
+    計數器 -> 6 位數 UID 的排列
+
+    舊版隨機產生的 UID 在第一次分配時一次載入成 bitmap，排列結果落在舊 UID 上就跳過。
+    """
+    LOW = 100000
+    SPACE = 900000
+    HALF_BITS = 10  # 2 ** 20 >= SPACE
+    ROUNDS = 4
+    SEQUENCE_NAME = "user_uid"
+
+    def __init__(self, key: bytes, sequence: BlockSequenceAllocator):
+        self.key = key
+        self.sequence = sequence
+        self._rounds = None
+        self._taken = None
+        self._load_lock = asyncio.Lock()
+
+    def verify_key(self):
+        """
+        啟動時確認已設定金鑰，否則拋出 MissingUidKey
+        """
+        if not self.key:
+            raise MissingUidKey("USER_UID_KEY is not set; use the same random secret on every worker")
+
+    def _build_rounds(self) -> list:
+        """
+        每輪的 round function 預先算成查表（第一次使用時才計算，不拖慢 import）
+        """
+        mask = (1 << self.HALF_BITS) - 1
+        return [
+            [
+                int.from_bytes(
+                    hmac.new(self.key, bytes([index]) + half.to_bytes(2, "big"), hashlib.sha256).digest()[:2],
+                    "big",
+                ) & mask
+                for half in range(1 << self.HALF_BITS)
+            ]
+            for index in range(self.ROUNDS)
+        ]
+
+    def _feistel(self, value: int) -> int:
+        if self._rounds is None:
+            self.verify_key()
+            self._rounds = self._build_rounds()
+        mask = (1 << self.HALF_BITS) - 1
+        left, right = value >> self.HALF_BITS, value & mask
+        for table in self._rounds:
+            left, right = right, left ^ table[right]
+        return (left << self.HALF_BITS) | right
+
+    def permute(self, index: int) -> int:
+        """
+        把 0 ~ SPACE-1 的計數器映射成 UID 數值（cycle walking 保持在範圍內）
+        """
+        value = self._feistel(index)
+        while value >= self.SPACE:
+            value = self._feistel(value)
+        return value + self.LOW
+
+    def _is_taken(self, uid: int) -> bool:
+        offset = uid - self.LOW
+        return bool(self._taken[offset >> 3] & (1 << (offset & 7)))
+
+    async def _load_taken(self):
+        """
+        載入現有的 UID（每個 process 只執行一次）
+        """
+        async with self._load_lock:
+            if self._taken is not None:
+                return
+            taken = bytearray((self.SPACE + 7) // 8)
+            for user_uid in await UserModel.all().values_list("user_uid", flat=True):
+                if user_uid.isdigit() and self.LOW <= int(user_uid) < self.LOW + self.SPACE:
+                    offset = int(user_uid) - self.LOW
+                    taken[offset >> 3] |= 1 << (offset & 7)
+            self._taken = taken
+
+    async def next_uid(self) -> str:
+        """
+        分配新的 user_uid
+        """
+        if self._taken is None:
+            await self._load_taken()
+        while True:
+            values = await self.sequence.reserve_values(self.SEQUENCE_NAME, 1)
+            index = values[0] - 1
+            if index >= self.SPACE:
+                raise UidSpaceExhausted("user_uid space exhausted")
+            uid = self.permute(index)
+            if not self._is_taken(uid):
+                return str(uid)
+
+
+uid_generator = UidGenerator(
+    key=os.getenv('USER_UID_KEY', '').encode(),
+    sequence=BlockSequenceAllocator(block_size=int(os.getenv('ID_BLOCK_SIZE', '100'))),
+)
@@ -22,6 +22,34 @@ export default function AddProduct() {
     });
   };
 
+  // 離開條碼欄位時查詢共用條碼目錄，自動帶入尚未填寫的名稱與描述
+  const handleBarcodeBlur = async () => {
+    const barcode = formData.product_barcode.trim();
+    if (!barcode) return;
+
+    const protocol = process.env.NEXT_PUBLIC_API_PROTOCOL;
+    const domain = process.env.NEXT_PUBLIC_BACKEND_DOMAIN_NAME;
+    const port = process.env.NEXT_PUBLIC_BACKEND_PORT;
+    const apiUrl = `${protocol}://${domain}:${port}/api/barcodes/${encodeURIComponent(barcode)}`;
+
+    try {
+      const access_token = localStorage.getItem("access_token");
+      const response = await fetch(apiUrl, {
+        headers: { Authorization: `Bearer ${access_token}` },
+      });
+      if (!response.ok) return;
+
+      const { product } = await response.json();
+      setFormData((current) => ({
+        ...current,
+        product_name: current.product_name || product.product_name,
+        description: current.description || product.description || "",
+      }));
+    } catch (error) {
+      console.error("Error looking up barcode:", error);
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
 
@@ -87,6 +115,7 @@ export default function AddProduct() {
             placeholder="輸入品項條碼"
             value={formData.product_barcode}
             onChange={handleChange}
+            onBlur={handleBarcodeBlur}
             className="px-4 py-2 bg-gray-700 bg-opacity-80 border border-gray-600 text-white rounded focus:outline-none focus:ring-2 focus:ring-blue-400"
           />
           <input
@@ -1,15 +1,21 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useParams, useRouter } from "next/navigation";
 
 const protocol = process.env.NEXT_PUBLIC_API_PROTOCOL;
 const domain = process.env.NEXT_PUBLIC_BACKEND_DOMAIN_NAME;
 const port = process.env.NEXT_PUBLIC_BACKEND_PORT;
-const apiPath = "/api/get_product";
-const apiUrl = `${protocol}://${domain}:${port}${apiPath}`;
+const apiUrl = `${protocol}://${domain}:${port}/api/lists`;
 const deleteApiPath = "/api/delete_product";
 const deleteApiUrl = `${protocol}://${domain}:${port}${deleteApiPath}`;
+const uploadApiPath = "/api/upload_product_image";
+const uploadApiUrl = `${protocol}://${domain}:${port}${uploadApiPath}`;
+const backendUrl = `${protocol}://${domain}:${port}`;
+const changesApiUrl = `${backendUrl}/api/changes`;
+const pageSize = 50;
+// 後端單次請求的上限
+const maxPageSize = 500;
 
 export default function ListDetail() {
   const params = useParams();
@@ -20,20 +26,105 @@ export default function ListDetail() {
 
   // 狀態管理
   const [products, setProducts] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
+  // change feed 的 callback 只在掛載時建立一次，以 ref 讀取目前已載入的筆數
+  const loadedCount = useRef(0);
+  const refreshState = useRef({ running: false, again: false });
 
-  // API 請求函數
-  const fetchProducts = async () => {
+  useEffect(() => {
+    loadedCount.current = products.length;
+  }, [products]);
+
+  // 讀取一頁，cursor 為 null 時從頭開始
+  const fetchPage = async (cursor, limit) => {
+    const accessToken = localStorage.getItem('access_token');
+    // GET 回應帶 ETag，清單未變動時瀏覽器會收到 304 並沿用快取
+    const query = new URLSearchParams({ limit });
+    if (cursor) query.set("cursor", cursor);
+    const response = await fetch(`${apiUrl}/${encodeURIComponent(listName)}/products?${query}`, {
+      headers: {
+        Authorization: `Bearer ${accessToken}`,
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`Error: ${response.status}`);
+    }
+
+    const data = await response.json();
+    if (!data.success) {
+      throw new Error(data.message || "Failed to fetch products.");
+    }
+    return data;
+  };
+
+  // API 請求函數，cursor 為 null 時載入第一頁
+  const fetchProducts = async (cursor = null) => {
+    try {
+      const data = await fetchPage(cursor, pageSize);
+      setProducts((prevProducts) => (cursor ? [...prevProducts, ...data.product] : data.product));
+      setNextCursor(data.next_cursor);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      setLoading(false);
+      setLoadingMore(false);
+    }
+  };
+
+  // 重新讀取目前已載入的範圍（至少一頁），保留「載入更多」的進度
+  const reloadLoaded = async () => {
+    const wanted = Math.max(loadedCount.current, pageSize);
+    const loaded = [];
+    let cursor = null;
+    do {
+      const data = await fetchPage(cursor, Math.min(wanted - loaded.length, maxPageSize));
+      loaded.push(...data.product);
+      cursor = data.next_cursor;
+    } while (cursor && loaded.length < wanted);
+    setProducts(loaded);
+    setNextCursor(cursor);
+  };
+
+  // 連續的變動只保留一次重新讀取，進行中收到的事件在結束後再讀一次
+  const refreshProducts = async () => {
+    const state = refreshState.current;
+    if (state.running) {
+      state.again = true;
+      return;
+    }
+    state.running = true;
+    try {
+      do {
+        state.again = false;
+        await reloadLoaded();
+      } while (state.again);
+    } catch (err) {
+      setError(err.message);
+    } finally {
+      state.running = false;
+    }
+  };
+
+  // 載入下一頁
+  const handleLoadMore = () => {
+    setLoadingMore(true);
+    fetchProducts(nextCursor);
+  };
+
+  const handleDeleteProduct = async (id) => {
     try {
       const accessToken = localStorage.getItem('access_token');
-      const response = await fetch(apiUrl, {
+      const response = await fetch(deleteApiUrl, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
           Authorization: `Bearer ${accessToken}`,
         },
-        body: JSON.stringify({ list_name: listName }), // 傳遞 listName 給後端
+        body: JSON.stringify({ id }),
       });
 
       if (!response.ok) {
@@ -42,27 +133,27 @@ export default function ListDetail() {
 
       const data = await response.json();
       if (data.success) {
-        setProducts(data.product);
+        setProducts((prevProducts) => prevProducts.filter((product) => product[0] !== id));
       } else {
-        setError(data.message || "Failed to fetch products.");
+        setError(data.message || "Failed to delete product.");
       }
     } catch (err) {
       setError(err.message);
-    } finally {
-      setLoading(false);
     }
   };
 
-  const handleDeleteProduct = async (id) => {
+  // 上傳圖片：直接以檔案內容作為 request body
+  const handleUploadImage = async (id, file) => {
+    if (!file) return;
     try {
       const accessToken = localStorage.getItem('access_token');
-      const response = await fetch(deleteApiUrl, {
+      const response = await fetch(`${uploadApiUrl}?product_id=${encodeURIComponent(id)}`, {
         method: "POST",
         headers: {
-          "Content-Type": "application/json",
+          "Content-Type": file.type || "application/octet-stream",
           Authorization: `Bearer ${accessToken}`,
         },
-        body: JSON.stringify({ id }),
+        body: file,
       });
 
       if (!response.ok) {
@@ -70,11 +161,11 @@ export default function ListDetail() {
       }
 
       const data = await response.json();
-      if (data.success) {
-        setProducts((prevProducts) => prevProducts.filter((product) => product[0] !== id));
-      } else {
-        setError(data.message || "Failed to delete product.");
-      }
+      setProducts((prevProducts) =>
+        prevProducts.map((product) =>
+          product[0] === id ? [product[0], product[1], product[2], data.image_url] : product
+        )
+      );
     } catch (err) {
       setError(err.message);
     }
@@ -85,6 +176,38 @@ export default function ListDetail() {
     fetchProducts();
   }, []);
 
+  // 訂閱 change feed（SSE）：有產品變動或需要 resync 時重新讀取已載入的範圍，
+  // 其他清單的變動只會讓這頁收到 304，不需要輪詢
+  useEffect(() => {
+    const controller = new AbortController();
+    const listen = async () => {
+      const accessToken = localStorage.getItem("access_token");
+      const response = await fetch(changesApiUrl, {
+        headers: { Authorization: `Bearer ${accessToken}` },
+        signal: controller.signal,
+      });
+      const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+      let buffer = "";
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += value;
+        const frames = buffer.split("\n\n");
+        buffer = frames.pop();
+        for (const frame of frames) {
+          const type = frame.match(/^event: (.*)$/m)?.[1];
+          if (type === "resync" || type?.startsWith("products_") || type === "list_deleted") {
+            refreshProducts();
+          }
+        }
+      }
+    };
+    listen().catch((err) => {
+      if (err.name !== "AbortError") console.error("Change feed error:", err);
+    });
+    return () => controller.abort();
+  }, []);
+
   // 處理跳轉到新增品項頁面
   const handleAddProduct = () => {
     router.push(`/list/${encodeURIComponent(listName)}/addproduct`);
@@ -108,21 +231,56 @@ export default function ListDetail() {
                 key={product[0]}
                 className="py-4 px-4 text-gray-300 hover:text-white hover:bg-gray-700 rounded transition-colors flex justify-between items-center"
               >
-                <div>
-                  <div className="text-lg font-semibold">{product[1]}</div>
-                  <div className="text-sm text-gray-400">{product[2]}</div>
+                <div className="flex items-center gap-3">
+                  {product[3]?.startsWith("/api/images/") && (
+                    // 清單只載入縮圖，原圖在 product[3]
+                    <img
+                      src={`${backendUrl}${product[3]}/thumbnail`}
+                      alt={product[1]}
+                      width={48}
+                      height={48}
+                      loading="lazy"
+                      className="w-12 h-12 object-cover rounded"
+                    />
+                  )}
+                  <div>
+                    <div className="text-lg font-semibold">{product[1]}</div>
+                    <div className="text-sm text-gray-400">{product[2]}</div>
+                  </div>
+                </div>
+                <div className="flex items-center gap-2">
+                  <label className="px-3 py-1 bg-gray-600 text-white text-sm rounded hover:bg-gray-500 transition-colors cursor-pointer">
+                    圖片
+                    <input
+                      type="file"
+                      accept="image/jpeg,image/png,image/gif,image/webp"
+                      className="hidden"
+                      onChange={(e) => handleUploadImage(product[0], e.target.files[0])}
+                    />
+                  </label>
+                  <button
+                    onClick={() => handleDeleteProduct(product[0])}
+                    className="px-3 py-1 bg-red-600 text-white text-sm rounded hover:bg-red-500 transition-colors"
+                  >
+                    刪除
+                  </button>
                 </div>
-                <button
-                  onClick={() => handleDeleteProduct(product[0])}
-                  className="px-3 py-1 bg-red-600 text-white text-sm rounded hover:bg-red-500 transition-colors"
-                >
-                  刪除
-                </button>
               </li>
             ))
           ) : (
             <p className="text-gray-400 text-center">尚未添加任何產品。</p>
           )}
+          {nextCursor && (
+            <li className="pt-4 text-center">
+              <button
+                onClick={handleLoadMore}
+                disabled={loadingMore}
+                className="px-4 py-2 bg-gray-700 text-white text-sm rounded hover:bg-gray-600 transition-colors disabled:opacity-50"
+              >
+                {loadingMore ? "載入中..." : "載入更多"}
+              </button>
+            </li>
+          )}
         </ul>
       )}
 
@@ -8,6 +8,8 @@ export default function UserList() {
   const [newListItem, setNewListItem] = useState("");
   const [message, setMessage] = useState("");
   const [isLoading, setIsLoading] = useState(false);
+  const [searchQuery, setSearchQuery] = useState("");
+  const [searchResults, setSearchResults] = useState([]);
 
   const fetchList = async () => {
     setIsLoading(true);
@@ -24,25 +26,31 @@ export default function UserList() {
       const protocol = process.env.NEXT_PUBLIC_API_PROTOCOL;
       const domain = process.env.NEXT_PUBLIC_BACKEND_DOMAIN_NAME;
       const port = process.env.NEXT_PUBLIC_BACKEND_PORT;
-      const apiPath = "/api/get_lists";
+      const apiPath = "/api/lists";
       const apiUrl = `${protocol}://${domain}:${port}${apiPath}`;
-      const response = await fetch(apiUrl, {
-        method: "POST",
-        headers: {
-          "Content-Type": "application/json",
-          Authorization: `Bearer ${accessToken}`,
-        },
-        body: JSON.stringify({}),
-      });
+      // 依 next_cursor 逐頁載入所有清單；GET 回應帶 ETag，清單未變動時瀏覽器會收到 304 並沿用快取
+      let items = [];
+      let cursor = null;
+      do {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : "";
+        const response = await fetch(`${apiUrl}${query}`, {
+          headers: {
+            Authorization: `Bearer ${accessToken}`,
+          },
+        });
 
-      if (response.ok) {
+        if (!response.ok) {
+          const errorResult = await response.json();
+          setMessage(`加載失敗：${errorResult.detail || "未知錯誤"}`);
+          return;
+        }
         const result = await response.json();
-        setList(result.list || []);
-        setMessage("清單加載成功");
-      } else {
-        const errorResult = await response.json();
-        setMessage(`加載失敗：${errorResult.detail || "未知錯誤"}`);
-      }
+        items = [...items, ...(result.list || [])];
+        cursor = result.next_cursor;
+      } while (cursor);
+
+      setList(items);
+      setMessage("清單加載成功");
     } catch (error) {
       console.error("加載清單時發生錯誤：", error);
       setMessage(`伺服器錯誤：${error.message}`);
@@ -132,6 +140,40 @@ export default function UserList() {
     fetchList();
   }, []);
 
+  // 停止輸入 200ms 後才搜尋所有清單中的產品
+  useEffect(() => {
+    const query = searchQuery.trim();
+    if (!query) {
+      setSearchResults([]);
+      return;
+    }
+    const controller = new AbortController();
+    const timer = setTimeout(async () => {
+      try {
+        const accessToken = localStorage.getItem("access_token");
+        const protocol = process.env.NEXT_PUBLIC_API_PROTOCOL;
+        const domain = process.env.NEXT_PUBLIC_BACKEND_DOMAIN_NAME;
+        const port = process.env.NEXT_PUBLIC_BACKEND_PORT;
+        const apiUrl = `${protocol}://${domain}:${port}/api/search?q=${encodeURIComponent(query)}`;
+        const response = await fetch(apiUrl, {
+          headers: { Authorization: `Bearer ${accessToken}` },
+          signal: controller.signal,
+        });
+        if (!response.ok) return;
+        const result = await response.json();
+        setSearchResults(result.product || []);
+      } catch (error) {
+        if (error.name !== "AbortError") {
+          console.error("搜尋產品時發生錯誤：", error);
+        }
+      }
+    }, 200);
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [searchQuery]);
+
   return (
     <div className="min-h-screen flex flex-col items-center justify-center bg-gradient-to-r from-gray-800 via-gray-600 to-gray-800 p-6">
       <h1 className="text-2xl font-bold text-gray-100 mb-6">使用者清單</h1>
@@ -150,6 +192,28 @@ export default function UserList() {
             </p>
           )}
 
+          <div className="mt-6 w-full max-w-md bg-gray-900 bg-opacity-80 p-4 rounded-lg shadow-lg">
+            <input
+              type="search"
+              value={searchQuery}
+              onChange={(e) => setSearchQuery(e.target.value)}
+              placeholder="搜尋所有清單中的產品（名稱、條碼、描述）"
+              className="w-full p-2 rounded-md border-gray-700 bg-gray-800 text-gray-200 focus:ring-purple-500 focus:border-purple-500"
+            />
+            {searchResults.map(([id, name, expiryDate, , listName]) => (
+              <Link
+                key={id}
+                href={`/list/${encodeURIComponent(listName)}`}
+                className="mt-2 flex justify-between text-gray-200 hover:text-purple-400"
+              >
+                <span>{name}</span>
+                <span className="text-gray-400 text-sm">
+                  {listName}・{expiryDate}
+                </span>
+              </Link>
+            ))}
+          </div>
+
           <div className="mt-6 w-full max-w-md bg-gray-900 bg-opacity-80 p-4 rounded-lg shadow-lg">
             <p className="text-gray-300">新增清單項目</p>
             <div className="mt-4 flex items-center">